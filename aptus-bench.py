@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import aptus
+import aptus_fake
+
+#
+# Setup args parser
+#
+
+arg_parser = argparse.ArgumentParser(description='Aptus Benchmark, dumps from a local fake Aptus')
+
+arg_parser.add_argument(
+    'parts',
+    type=str,
+    nargs='*',
+    help='Parts to dump (agera, authorities, customers, bookings), all if none given'
+)
+
+arg_parser.add_argument(
+    '--browser',
+    type=str,
+    nargs='+',
+    default=['http'],
+    help='Browsers to compare (chrome, firefox, safari, http)'
+)
+
+arg_parser.add_argument(
+    '--profile',
+    type=str,
+    nargs='+',
+    default=['default'],
+    help='Browser profiles to compare (default, lean)'
+)
+
+arg_parser.add_argument(
+    '--workers',
+    type=int,
+    nargs='+',
+    default=[1],
+    help='Numbers of workers to compare'
+)
+
+arg_parser.add_argument(
+    '--pipeline',
+    type=int,
+    nargs='+',
+    default=[1],
+    help='Pages in flight of the customer pipeline to compare, without a browser only'
+)
+
+arg_parser.add_argument(
+    '--customers',
+    type=int,
+    default=100,
+    help='Number of customers'
+)
+
+arg_parser.add_argument(
+    '--latency',
+    type=float,
+    default=0.0,
+    help='Seconds added to every request'
+)
+
+arg_parser.add_argument(
+    '--output',
+    type=str,
+    action='store',
+    help='JSON file to write the results to'
+)
+
+args = arg_parser.parse_args()
+
+for part in args.parts:
+    if part not in aptus.DUMP_FILE_NAMES:
+        arg_parser.error('unknown part: {}'.format(part))
+
+
+#
+# Benchmark
+#
+
+def count_entities(data: aptus_fake.FakeAptusData, parts) -> int:
+    # Entities dumped for the parts, every customer, key, contract, entry phone, authority, agera and agera article,
+    # template and area
+    entities = 0
+
+    if 'customers' in parts:
+        entities += len(data.customers) + len(data.keys) + len(data.contracts) + len(data.entry_phones)
+    if 'authorities' in parts:
+        entities += len(data.authorities)
+    if 'agera' in parts:
+        entities += len(data.ageras) + len(data.articles) + len(data.agera_templates) + len(data.agera_areas)
+
+    return entities
+
+
+def run_benchmark(browser, profile, workers, pipeline, customers, latency, parts) -> dict:
+    server = aptus_fake.FakeAptusServer(customers=customers, latency=latency).start()
+    work_dir_path = Path.cwd()
+
+    try:
+        apt = aptus.Aptus(browser, server.base_url, aptus_fake.USERNAME, aptus_fake.PASSWORD, 0,
+                          server.max_customer_id, workers=workers, browser_profile=profile,
+                          pipeline_concurrency=pipeline)
+
+        # Dump to a temporary directory, without the output of the dump
+        with tempfile.TemporaryDirectory() as dump_work_dir:
+            os.chdir(dump_work_dir)
+
+            try:
+                start_time = time.perf_counter()
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    apt.dump_all(parts)
+
+                seconds = time.perf_counter() - start_time
+            finally:
+                os.chdir(work_dir_path)
+                apt.quit()
+    finally:
+        server.stop()
+
+    entities = count_entities(server.data, parts)
+    round_trips = apt.metrics.counter('round_trips')
+    page_loads = apt.metrics.count('page_load')
+
+    return {
+        'browser': browser,
+        'profile': profile,
+        'workers': workers,
+        'pipeline': pipeline,
+        'customers': customers,
+        'latency': latency,
+        'parts': parts,
+        'seconds': seconds,
+        'pages': server.requests,
+        'pagesPerSecond': server.requests / seconds if seconds > 0 else 0.0,
+        'staticRequests': server.static_requests,
+        'secondsPerPage': apt.metrics.seconds('page_load') / page_loads if page_loads > 0 else None,
+        'roundTrips': round_trips,
+        'roundTripsPerCustomer': round_trips / customers if 'customers' in parts and customers > 0 else None,
+        'roundTripsPerEntity': round_trips / entities if entities > 0 else None,
+        'logins': apt.metrics.counter('logins')
+    }
+
+
+def format_ratio(value, precision=1):
+    return '{:.{}f}'.format(value, precision) if value is not None else '-'
+
+
+# Defined what parts to dump
+parts_to_dump = args.parts
+if len(parts_to_dump) == 0:
+    # Set defaults
+    parts_to_dump = ['agera', 'authorities', 'customers', 'bookings']
+
+print('Benchmarking {} customers, {} s latency, parts: {}'.format(args.customers, args.latency,
+                                                                  ', '.join(parts_to_dump)))
+print('{:<10} {:<8} {:>7} {:>8} {:>9} {:>7} {:>9} {:>10} {:>7} {:>11} {:>14} {:>12}'.format(
+    'browser', 'profile', 'workers', 'pipeline', 'seconds', 'pages', 'pages/s', 's/page', 'static', 'round-trips',
+    'per customer', 'per entity'))
+
+results = []
+
+for benchmark_browser in args.browser:
+    for benchmark_profile in args.profile:
+        for benchmark_workers in args.workers:
+            for benchmark_pipeline in args.pipeline:
+                result = run_benchmark(benchmark_browser, benchmark_profile, benchmark_workers, benchmark_pipeline,
+                                       args.customers, args.latency, parts_to_dump)
+                results.append(result)
+
+                print('{:<10} {:<8} {:>7} {:>8} {:>9.2f} {:>7} {:>9.1f} {:>10} {:>7} {:>11} {:>14} {:>12}'.format(
+                    result.get('browser'), result.get('profile'), result.get('workers'), result.get('pipeline'),
+                    result.get('seconds'), result.get('pages'), result.get('pagesPerSecond'),
+                    format_ratio(result.get('secondsPerPage'), 4), result.get('staticRequests'),
+                    result.get('roundTrips'), format_ratio(result.get('roundTripsPerCustomer')),
+                    format_ratio(result.get('roundTripsPerEntity'))))
+
+if args.output is not None:
+    with open(args.output, 'w', encoding='utf-8') as outfile:
+        json.dump(results, outfile, indent=2)
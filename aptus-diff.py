@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import aptus
+import aptus_diff
+import aptus_snapshots
+
+#
+# Setup args parser
+#
+
+arg_parser = argparse.ArgumentParser(description='Aptus Diff, changes between two dumps')
+
+arg_parser.add_argument(
+    'old_dump',
+    type=str,
+    help='Dump directory to compare from, or a dump in the snapshot store'
+)
+
+arg_parser.add_argument(
+    'new_dump',
+    type=str,
+    help='Dump directory to compare to, or a dump in the snapshot store'
+)
+
+arg_parser.add_argument(
+    '--output',
+    type=str,
+    action='store',
+    help='JSON Lines file to write the changes to, standard output if not given'
+)
+
+arg_parser.add_argument(
+    '--store',
+    type=str,
+    action='store',
+    default=str(Path('dumps').joinpath(aptus.SNAPSHOT_STORE_DIR_NAME)),
+    help='Snapshot store directory of dumps whose files are pruned'
+)
+
+args = arg_parser.parse_args()
+
+snapshot_store = aptus_snapshots.SnapshotStore(Path(args.store))
+old_source = aptus_diff.DumpSource(Path(args.old_dump), snapshot_store)
+new_source = aptus_diff.DumpSource(Path(args.new_dump), snapshot_store)
+
+for source in [old_source, new_source]:
+    if not source.exists():
+        arg_parser.error('dump does not exist: {}'.format(source.dump_dir))
+
+#
+# Diff
+#
+
+outfile = open(args.output, 'w', encoding='utf-8') if args.output is not None else sys.stdout
+
+try:
+    dump_diff = aptus_diff.DumpDiff(lambda change: outfile.write(json.dumps(change, ensure_ascii=False) + '\n'))
+    compared_parts = dump_diff.diff(old_source, new_source, aptus.DUMP_FILE_NAMES)
+finally:
+    if outfile is not sys.stdout:
+        outfile.close()
+
+# Summary, on standard error when the changes are written to standard output
+summary_file = sys.stderr if args.output is None else sys.stdout
+
+print('Compared: {}'.format(', '.join(compared_parts)), file=summary_file)
+for (entity, change), count in sorted(dump_diff.counts.items()):
+    print('{:<16} {:<8} {:>8}'.format(entity, change, count), file=summary_file)
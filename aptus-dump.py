@@ -1,25 +1,120 @@
 #!/usr/bin/env python3
+import argparse
 import sys
+from datetime import date
+from pathlib import Path
 
 import aptus
 import config
 
+#
+# Setup args parser
+#
+
+arg_parser = argparse.ArgumentParser(description='Aptus Dump')
+
+arg_parser.add_argument(
+    'parts',
+    type=str,
+    nargs='*',
+    help='Parts to dump (agera, authorities, customers, bookings), all if none given'
+)
+
+arg_parser.add_argument(
+    '--resume',
+    type=str,
+    action='store',
+    help='Dump directory of an interrupted dump to finish'
+)
+
+arg_parser.add_argument(
+    '--sections',
+    type=str,
+    action='store',
+    help='Comma separated sections of the customers to dump ({}), all if not given'.format(
+        ', '.join(aptus.CUSTOMER_SECTIONS))
+)
+
+arg_parser.add_argument(
+    '--bookings-start',
+    type=date.fromisoformat,
+    action='store',
+    help='First date of the bookings to dump (YYYY-MM-DD), BOOKINGS_START if not given'
+)
+
+arg_parser.add_argument(
+    '--bookings-stop',
+    type=date.fromisoformat,
+    action='store',
+    help='Last date of the bookings to dump (YYYY-MM-DD), BOOKINGS_STOP if not given'
+)
+
+arg_parser.add_argument(
+    '--bookings-since',
+    type=date.fromisoformat,
+    action='store',
+    help='Only fetch bookings from this date (YYYY-MM-DD), earlier bookings are taken from the previous dump'
+)
+
+arg_parser.add_argument(
+    '--incremental',
+    action='store_true',
+    help='Reuse the details of keys and contracts unchanged in their lists since the previous dump, '
+         'INCREMENTAL_DUMPS if not given'
+)
+
+arg_parser.add_argument(
+    '--page-cache',
+    choices=aptus.PAGE_CACHE_MODES,
+    action='store',
+    help='Record every page loaded to the page cache, or replay the pages from it without the network, '
+         'PAGE_CACHE_MODE if not given'
+)
+
+args = arg_parser.parse_args()
+
+for part in args.parts:
+    if part not in aptus.DUMP_FILE_NAMES:
+        arg_parser.error('unknown part: {}'.format(part))
+
+customer_sections = None
+if args.sections is not None:
+    customer_sections = list(filter(lambda section: section != '', map(str.strip, args.sections.split(','))))
+
+    for section in customer_sections:
+        if section not in aptus.CUSTOMER_SECTIONS:
+            arg_parser.error('unknown section: {}'.format(section))
+
 #
 # Dump
 #
 
-apt = aptus.Aptus(config.BROWSER,
-                  config.APTUS_BASE_URL,
-                  config.APTUS_USERNAME,
-                  config.APTUS_PASSWORD,
-                  config.APTUS_MIN_CUSTOMER_ID,
-                  config.APTUS_MAX_CUSTOMER_ID)
+dump_options = {}
+if args.bookings_start is not None:
+    dump_options['bookings_start'] = args.bookings_start
+if args.bookings_stop is not None:
+    dump_options['bookings_stop'] = args.bookings_stop
+if args.incremental:
+    dump_options['incremental'] = True
+if args.page_cache is not None:
+    dump_options['page_cache_mode'] = args.page_cache
+
+apt = aptus.Aptus.from_config(config, customer_sections=customer_sections, bookings_since=args.bookings_since,
+                              **dump_options)
 
 # Defined what parts to dump
-parts_to_dump = sys.argv[1:]
+parts_to_dump = args.parts
 if len(parts_to_dump) == 0:
     # Set defaults
     parts_to_dump = ['agera', 'authorities', 'customers', 'bookings']
 
-apt.dump_all(parts_to_dump)
-apt.quit()
+try:
+    apt.dump_all(parts_to_dump, Path(args.resume) if args.resume is not None else None)
+finally:
+    # Browser closed when the dump stops on an error too
+    apt.quit()
+
+# Failing entities were skipped, only fail the run when there were too many of them
+if apt.too_many_failures():
+    print('More than {} entities failed!'.format(apt.max_dump_failures))
+    sys.exit(1)
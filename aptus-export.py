@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import argparse
+from pathlib import Path
+
+import aptus
+import aptus_sqlite
+
+#
+# Setup args parser
+#
+
+arg_parser = argparse.ArgumentParser(description='Aptus Export, loads a dump into an indexed SQLite database')
+
+arg_parser.add_argument(
+    'dump_dir',
+    type=str,
+    help='Dump directory to export'
+)
+
+arg_parser.add_argument(
+    '--database',
+    type=str,
+    action='store',
+    help='SQLite database file to write, dump.sqlite in the dump directory if not given'
+)
+
+args = arg_parser.parse_args()
+
+dump_dir = Path(args.dump_dir)
+if not dump_dir.is_dir():
+    arg_parser.error('dump directory does not exist: {}'.format(dump_dir))
+
+#
+# Export
+#
+
+database_path = Path(args.database) if args.database is not None else dump_dir.joinpath('dump.sqlite')
+
+table_counts = aptus_sqlite.export_dump(dump_dir, database_path, aptus.DUMP_FILE_NAMES)
+
+for table, count in table_counts.items():
+    print('{:<20} {:>8}'.format(table, count))
+
+print('Exported to {}'.format(database_path))
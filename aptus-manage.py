@@ -64,6 +64,36 @@ arg_parser.add_argument(
     help=''
 )
 
+arg_parser.add_argument(
+    '--baseline',
+    type=str,
+    action='store',
+    help='Recent customer dump, only keys differing from it are updated'
+)
+
+arg_parser.add_argument(
+    '--workers',
+    type=int,
+    action='store',
+    default=getattr(config, 'UPDATE_WORKERS', 1),
+    help='Number of parallel sessions'
+)
+
+arg_parser.add_argument(
+    '--rate',
+    type=float,
+    action='store',
+    default=getattr(config, 'REQUEST_RATE', None),
+    help='Maximum requests per second, for all sessions together'
+)
+
+arg_parser.add_argument(
+    '--results',
+    type=str,
+    action='store',
+    help='Result file with the status of every key, defaults to <file>_results.json'
+)
+
 args = arg_parser.parse_args()
 
 if args.action == 'keys':
@@ -78,21 +108,55 @@ if args.action == 'keys':
         print('Provided files does not exist!')
         quit()
 
+    baseline_keys = None
+
+    if args.baseline is not None:
+        baseline_file_path = Path(args.baseline)
+
+        if not baseline_file_path.is_file():
+            print('Provided baseline does not exist!')
+            quit()
+
+        baseline_keys = aptus.Aptus.load_baseline_keys(baseline_file_path)
+
     with open(key_file_path, 'r', encoding='utf-8') as infile:
         keys = json.load(infile)
 
-        if not query_yes_no('Are you sure you want to update {} keys?'.format(len(keys))):
+        try:
+            aptus.Aptus.check_key_ids(keys)
+        except ValueError as error:
+            print(error)
+            quit()
+
+        changed_keys = aptus.Aptus.changed_keys(keys, baseline_keys)
+
+        if len(changed_keys) == 0:
+            print('No changes!')
+            quit()
+
+        if not query_yes_no('Are you sure you want to update {} keys?'.format(len(changed_keys))):
             print('Aborting!')
             quit()
 
-        apt = aptus.Aptus(config.BROWSER,
-                          config.APTUS_BASE_URL,
-                          config.APTUS_USERNAME,
-                          config.APTUS_PASSWORD,
-                          config.APTUS_MIN_CUSTOMER_ID,
-                          config.APTUS_MAX_CUSTOMER_ID)
-        apt.update_keys(keys)
-        apt.quit()
+        results_file_path = Path(args.results) if args.results is not None else \
+            key_file_path.with_name('{}_results.json'.format(key_file_path.stem))
+
+        # Keys are updated on the sessions of the workers, the browser of this session is never started
+        apt = aptus.Aptus.from_config(config, request_rate=args.rate)
+
+        try:
+            key_results = apt.update_keys(keys, baseline_keys, workers=args.workers,
+                                          results_file_path=results_file_path)
+            apt.print_session_report()
+            apt.print_metrics_report()
+            apt.write_metrics(results_file_path.with_name('{}_metrics'.format(results_file_path.stem)))
+        finally:
+            apt.quit()
+
+        print('Results written to: {}'.format(results_file_path))
+
+        if any(map(lambda result: result.get('status') == 'failed', key_results)):
+            sys.exit(1)
 else:
     print('Unknown action: {}'.format(args.action))
     quit()
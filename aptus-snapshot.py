@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+import argparse
+from pathlib import Path
+
+import aptus
+import aptus_snapshots
+
+#
+# Setup args parser
+#
+
+arg_parser = argparse.ArgumentParser(description='Aptus Snapshot, stores dumps by content hash and restores them')
+
+arg_parser.add_argument(
+    'action',
+    type=str,
+    choices=['list', 'store', 'restore'],
+    help='List the stored dumps, store a dump directory, or restore a stored dump'
+)
+
+arg_parser.add_argument(
+    'dump',
+    type=str,
+    nargs='?',
+    help='Dump directory to store, or name (<YYYY-MM-DD-HHMM>) of the dump to restore'
+)
+
+arg_parser.add_argument(
+    '--prune',
+    action='store_true',
+    help='Delete the files of the dump directory once stored'
+)
+
+arg_parser.add_argument(
+    '--output',
+    type=str,
+    action='store',
+    help='Directory to restore the dump to, dumps/<YYYY-MM-DD-HHMM> if not given'
+)
+
+arg_parser.add_argument(
+    '--store',
+    type=str,
+    action='store',
+    default=str(Path('dumps').joinpath(aptus.SNAPSHOT_STORE_DIR_NAME)),
+    help='Snapshot store directory'
+)
+
+args = arg_parser.parse_args()
+
+if args.action != 'list' and args.dump is None:
+    arg_parser.error('a dump is required to {}'.format(args.action))
+
+#
+# Snapshot
+#
+
+store = aptus_snapshots.SnapshotStore(Path(args.store))
+
+if args.action == 'list':
+    for name in store.names():
+        print(name)
+elif args.action == 'store':
+    dump_dir = Path(args.dump)
+
+    if not dump_dir.is_dir():
+        arg_parser.error('dump directory does not exist: {}'.format(dump_dir))
+
+    manifest_path = store.store(dump_dir)
+    print('Stored {}: {} records stored, {} unchanged'.format(manifest_path, store.stored_objects,
+                                                              store.reused_objects))
+
+    if args.prune:
+        for pruned_file_path in store.prune(dump_dir):
+            print('Pruned {}'.format(pruned_file_path))
+elif args.action == 'restore':
+    if not store.contains(args.dump):
+        arg_parser.error('dump is not stored: {}'.format(args.dump))
+
+    output_dir = Path(args.output) if args.output is not None else Path('dumps').joinpath(args.dump)
+
+    for dump_file_path in store.restore(args.dump, output_dir):
+        print('Restored {}'.format(dump_file_path))
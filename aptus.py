@@ -1,16 +1,187 @@
+import bisect
+import html
 import json
 import logging
 import re
-from datetime import datetime
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
-from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions
+from selenium.webdriver.support.wait import WebDriverWait
+
+import aptus_cache
+import aptus_drivers
+import aptus_errors
+import aptus_files
+import aptus_fingerprints
+import aptus_http
+import aptus_journal
+import aptus_metrics
+import aptus_pipeline
+import aptus_pool
+import aptus_session
+import aptus_snapshots
+import aptus_writers
+
+LOGIN_PATH = 'Account/Login'
+
+# Seconds a login session is trusted, it is renewed a margin before that
+SESSION_MAX_AGE = 20 * 60
+SESSION_RENEW_MARGIN = 60
+
+# Attempts and initial backoff in seconds for a key update failing
+KEY_UPDATE_ATTEMPTS = 3
+KEY_UPDATE_BACKOFF = 2.0
+
+# Errors a key update is retried on, pages failing to load and browser and network errors before saving. Other
+# errors, such as a missing key, an invalid value or a save not confirmed, fail the key right away.
+KEY_UPDATE_RETRY_ERRORS = (aptus_errors.DumpError, WebDriverException, OSError)
+
+# Attempts and initial backoff in seconds for dumping a customer whose pages fail, and the customers failing for good a
+# dump tolerates before exiting with an error
+DUMP_ATTEMPTS = 3
+DUMP_RETRY_BACKOFF = 2.0
+MAX_DUMP_FAILURES = 10
+
+# Customers failing for good, with a snapshot of the page they failed on
+ERRORS_FILE_NAME = 'errors.jsonl'
+
+# Pages recorded by a dump, or replayed from the cache without the network, and the seconds a recorded page is kept
+PAGE_CACHE_MODES = ['record', 'replay']
+PAGE_CACHE_FILE = 'dumps/pages.sqlite'
+PAGE_CACHE_TTL = 30 * 24 * 60 * 60
+
+# Timers of methods handling one record, reported as records per second
+RECORD_TIMERS = ['dump_authority', 'dump_customer', 'dump_key', 'dump_contract', 'dump_customer_entry_phone',
+                 'dump_customer_notes', 'dump_agera', 'dump_agera_entity', 'dump_booking_window', 'update_key']
+
+# Maximum seconds to wait for a page to be ready
+PAGE_TIMEOUT = 10
+
+# Seconds every query matching nothing used to block with the previous implicit wait
+IMPLICIT_WAIT = 10
+
+# Table rows read by the dump parsers
+TABLE_ROWS = {
+    'list': 'div.listTableDiv > table.listTable > tbody > tr',
+    'nestedList': 'div.listTableDiv > div > table.listTable > tbody > tr',
+    'details': 'div.detailsTableDiv > table.detailsTable > tbody > tr'
+}
+
+# Final dump file of each part
+DUMP_FILE_NAMES = {
+    'agera': 'agera_dump.json',
+    'authorities': 'authorities_dump.json',
+    'customers': 'customer_dump.json',
+    'bookings': 'bookings_dump.json'
+}
+
+# Sections of a dumped customer, in dump order. Sections not selected are not loaded and listed as omitted.
+CUSTOMER_SECTIONS = ['details', 'keys', 'contracts', 'entryPhone', 'notes']
+
+# Entities shared by ageras, dumped once each by id and referenced from the ageras by id. By agera dump field,
+# the list page of all entities (None if only reached from the ageras) and the path of their details pages.
+AGERA_ENTITIES = {
+    'articles': (None, 'Agera/ArticleDetails'),
+    'templates': ('Agera/AgeraTemplateIndex', 'Agera/AgeraTemplateDetails'),
+    'areas': ('Agera/AreaIndex', 'Agera/AreaDetails')
+}
+
+# Article files downloaded at once, and the directory next to the dumps their content is stored in once
+DOWNLOAD_CONCURRENCY = 4
+FILE_STORE_DIR_NAME = 'files'
+
+# Fingerprints of the list rows of a dump, compared by the next incremental dump
+FINGERPRINTS_FILE_NAME = 'list_fingerprints.json'
+
+# Marks a dump replayed from the page cache, which later dumps do not take previous dumps from
+REPLAY_MARKER_FILE_NAME = 'replayed_from_page_cache'
+
+# Directory next to the dumps the snapshots of dumps are stored in
+SNAPSHOT_STORE_DIR_NAME = 'snapshots'
+
+# Booking systems, the booking calendars of a system and the bookings of a calendar between two dates
+BOOKING_SYSTEMS_PATH = 'BookingSystem/Index'
+BOOKING_SYSTEM_DETAILS_PATH = 'BookingSystem/Details'
+BOOKING_CALENDAR_PATH = 'BookingCalendar/Bookings'
+
+# Days of a booking calendar fetched per page, and the days before and after today dumped by default
+BOOKING_WINDOW_DAYS = 31
+BOOKINGS_DAYS_BACK = 365
+BOOKINGS_DAYS_AHEAD = 365
+
+# Customer list, paginated
+CUSTOMER_INDEX_PATH = 'Customer/Index'
+
+# Consecutive missing customer ID's before probing doubles the number of ID's skipped, and the largest skip
+PROBE_GAP = 20
+PROBE_MAX_STEP = 16
+
+# Key fields that can be updated, by key dump field with the name and type of their edit form field
+KEY_FIELDS = {
+    'name': ('Name', 'string'),
+    'card': ('Card', 'string'),
+    'code': ('Code', 'string'),
+    'start': ('Start', 'string'),
+    'stop': ('Stop', 'string'),
+    'blocked': ('Blocked', 'bool')
+}
+
+# Snapshot of table rows (onclick, cell html, label for and link href) for each selector, in one round-trip
+TABLE_SNAPSHOT_SCRIPT = '''
+return arguments[0].map(function (selector) {
+    return Array.from(document.querySelectorAll(selector)).map(function (tr) {
+        return {
+            onclick: tr.getAttribute('onclick'),
+            cells: Array.from(tr.querySelectorAll('td')).map(function (td) {
+                var label = td.querySelector('label');
+                var link = td.querySelector('a');
+                return {
+                    html: td.innerHTML,
+                    label: label ? label.getAttribute('for') : null,
+                    href: link ? link.href : null
+                };
+            })
+        };
+    });
+});
+'''
+
+# Resolved href of every link on the page
+LINKS_SCRIPT = '''
+return Array.from(document.querySelectorAll('a[href]')).map(function (a) {
+    return a.href;
+});
+'''
+
+# Action, method and fields (name and value pairs, as submitted) of the form of the element with the given id
+FORM_SNAPSHOT_SCRIPT = '''
+var form = document.getElementById(arguments[0]).form;
+return {
+    action: form.action,
+    method: form.method.toLowerCase(),
+    fields: Array.from(new FormData(form).entries()).filter(function (entry) {
+        return typeof entry[1] === 'string';
+    })
+};
+'''
 
 
 class Aptus:
-    def __init__(self, browser, base_url, username, password, min_customer_id, max_customer_id):
+    def __init__(self, browser, base_url, username, password, min_customer_id, max_customer_id, workers=1,
+                 dump_format='json', session_file=None, session_max_age=SESSION_MAX_AGE, request_rate=None,
+                 browser_profile='default', pipeline_concurrency=1, customer_sections=None, bookings_start=None,
+                 bookings_stop=None, bookings_since=None, booking_window_days=BOOKING_WINDOW_DAYS,
+                 download_concurrency=DOWNLOAD_CONCURRENCY, snapshot_dumps=False, incremental=False,
+                 dump_attempts=DUMP_ATTEMPTS, dump_retry_backoff=DUMP_RETRY_BACKOFF,
+                 max_dump_failures=MAX_DUMP_FAILURES, page_cache_mode=None, page_cache_file=PAGE_CACHE_FILE,
+                 page_cache_ttl=PAGE_CACHE_TTL):
+        self.browser = browser
         self.base_url = base_url
         self.username = username
         self.password = password
@@ -18,128 +189,580 @@ class Aptus:
         self.min_customer_id = min_customer_id
         self.max_customer_id = max_customer_id
 
-        # Initialize browser driver
-        if browser == 'chrome':
-            options = webdriver.ChromeOptions()
-            options.add_argument('--headless=new')
-            self.web = webdriver.Chrome(options=options)
-        elif browser == 'safari':
-            options = webdriver.SafariOptions()
-            self.web = webdriver.Safari(options=options)
-        elif browser == 'firefox':
-            options = webdriver.FirefoxOptions()
-            options.add_argument('-headless')
-            self.web = webdriver.Firefox(options=options)
-
-        # Implicitly wait maximum 10 seconds for elements
-        self.web.implicitly_wait(10)
+        # Number of parallel sessions used for dumping customers
+        self.workers = workers
+
+        # Sections of the customers dumped, all if None
+        self.customer_sections = customer_sections if customer_sections is not None else CUSTOMER_SECTIONS
+
+        # Dates of the bookings dumped, around today if None, and the days fetched per page of a calendar
+        self.bookings_start = bookings_start
+        self.bookings_stop = bookings_stop
+        self.booking_window_days = booking_window_days
+
+        # Bookings before this date are taken from the previous dump instead of fetched again, all fetched if None
+        self.bookings_since = bookings_since
+
+        # Article files downloaded at once, none downloaded if 0
+        self.download_concurrency = download_concurrency
+
+        # Details of keys and contracts listed unchanged since the previous dump are reused
+        self.incremental = incremental
+        self.list_fingerprints = aptus_fingerprints.ListFingerprints()
+
+        # A customer failing is retried, and recorded in the errors file of the dump if it fails for good
+        self.dump_attempts = dump_attempts
+        self.dump_retry_backoff = dump_retry_backoff
+        self.max_dump_failures = max_dump_failures
+        self.error_log = aptus_errors.ErrorLog()
+
+        # Finished dumps are stored in the snapshot store, keeping full files of the latest dump only
+        self.snapshot_dumps = snapshot_dumps
+
+        # Pages fetched at once by the customer pipeline without a browser, sequential if 1
+        self.pipeline_concurrency = pipeline_concurrency
+
+        # Format of the customer and authority dump files, json or jsonl
+        self.dump_format = dump_format
+
+        # Login session, saved to the session file for reuse by later runs and workers
+        self.session_file = session_file
+        self.session_max_age = session_max_age
+        self.session_store = aptus_session.SessionStore(Path(session_file), base_url, username, session_max_age) \
+            if session_file is not None else None
+        self.session_time = None
+        self.session_restore_attempted = False
+
+        # Requests per second of this session and all sessions spawned from it, unlimited if None
+        self.request_rate = request_rate
+        self.rate_limiter = aptus_pool.RateLimiter(request_rate) if request_rate is not None else None
+
+        # Pages loaded are recorded to the page cache, or replayed from it instead of loaded, not cached if None
+        if page_cache_mode is not None and page_cache_mode not in PAGE_CACHE_MODES:
+            raise ValueError('Unknown page cache mode: {}, expected one of {}'.format(page_cache_mode,
+                                                                                  ', '.join(PAGE_CACHE_MODES)))
+
+        self.page_cache_mode = page_cache_mode
+        self.page_cache_file = page_cache_file
+        self.page_cache_ttl = page_cache_ttl
+        self.page_cache = aptus_cache.PageCache(Path(page_cache_file), page_cache_ttl) \
+            if page_cache_mode is not None else None
+
+        if page_cache_mode == 'replay':
+            # Nothing is fetched when replaying, so no logins, rate limit, downloads or retries of missing pages
+            self.session_store = None
+            self.rate_limiter = None
+            self.download_concurrency = 0
+            self.dump_attempts = 1
+            self.snapshot_dumps = False
+
+        # Browser driver, started when first used so a session only spawning workers starts none
+        self.browser_profile = browser_profile
+        self.driver = None
+        self.page_ready_states = aptus_drivers.READY_STATES.get(browser_profile)
 
         self.logger = logging.getLogger(__name__)
+        self.metrics = aptus_metrics.Metrics()
+
+        # Checkpoint journal of the dump in progress
+        self.journal = None
+
+        # HTTP session for posting forms and downloading files with the cookies of a browser, created when first needed
+        self.cookie_session = None
+
+    @property
+    def web(self):
+        if self.driver is None:
+            self.driver = aptus_cache.ReplayBrowser(self.page_cache) if self.page_cache_mode == 'replay' else \
+                aptus_drivers.create_driver(self.browser, self.browser_profile)
+
+            # Never wait for elements, pages are waited for explicitly until ready
+            self.driver.implicitly_wait(0)
+
+            self._instrument(self.driver)
+
+        return self.driver
+
+    @classmethod
+    def from_config(cls, config, **overrides):
+        options = {
+            'workers': getattr(config, 'DUMP_WORKERS', 1),
+            'dump_format': getattr(config, 'DUMP_FORMAT', 'json'),
+            'session_file': getattr(config, 'SESSION_FILE', None),
+            'session_max_age': getattr(config, 'SESSION_MAX_AGE', SESSION_MAX_AGE),
+            'request_rate': getattr(config, 'REQUEST_RATE', None),
+            'browser_profile': getattr(config, 'BROWSER_PROFILE', 'default'),
+            'pipeline_concurrency': getattr(config, 'PIPELINE_CONCURRENCY', 1),
+            'bookings_start': getattr(config, 'BOOKINGS_START', None),
+            'bookings_stop': getattr(config, 'BOOKINGS_STOP', None),
+            'booking_window_days': getattr(config, 'BOOKING_WINDOW_DAYS', BOOKING_WINDOW_DAYS),
+            'download_concurrency': getattr(config, 'DOWNLOAD_CONCURRENCY', DOWNLOAD_CONCURRENCY),
+            'snapshot_dumps': getattr(config, 'SNAPSHOT_DUMPS', False),
+            'incremental': getattr(config, 'INCREMENTAL_DUMPS', False),
+            'dump_attempts': getattr(config, 'DUMP_ATTEMPTS', DUMP_ATTEMPTS),
+            'max_dump_failures': getattr(config, 'MAX_DUMP_FAILURES', MAX_DUMP_FAILURES),
+            'page_cache_mode': getattr(config, 'PAGE_CACHE_MODE', None),
+            'page_cache_file': getattr(config, 'PAGE_CACHE_FILE', PAGE_CACHE_FILE),
+            'page_cache_ttl': getattr(config, 'PAGE_CACHE_TTL', PAGE_CACHE_TTL)
+        }
+        for name in ['bookings_start', 'bookings_stop']:
+            if isinstance(options.get(name), str):
+                options[name] = date.fromisoformat(options.get(name))
+        options.update(overrides)
+
+        return cls(config.BROWSER,
+                   config.APTUS_BASE_URL,
+                   config.APTUS_USERNAME,
+                   config.APTUS_PASSWORD,
+                   config.APTUS_MIN_CUSTOMER_ID,
+                   config.APTUS_MAX_CUSTOMER_ID,
+                   **options)
+
+    def spawn(self):
+        # New session with the same settings, for parallel workers
+        worker = Aptus(self.browser, self.base_url, self.username, self.password, self.min_customer_id,
+                       self.max_customer_id, session_file=self.session_file, session_max_age=self.session_max_age,
+                       browser_profile=self.browser_profile, customer_sections=self.customer_sections,
+                       dump_attempts=self.dump_attempts, dump_retry_backoff=self.dump_retry_backoff,
+                       page_cache_mode=self.page_cache_mode, page_cache_file=self.page_cache_file,
+                       page_cache_ttl=self.page_cache_ttl)
+
+        # Request rate is limited for all sessions together
+        worker.rate_limiter = self.rate_limiter
+
+        # List rows are fingerprinted, and previous details reused, for all sessions together
+        worker.list_fingerprints = self.list_fingerprints
+
+        # Customers failing for good are recorded in the same errors file
+        worker.error_log = self.error_log
+
+        return worker
+
+    def _instrument(self, web):
+        # Count every command sent to the browser, or request sent to the server without a browser
+        if isinstance(web, aptus_http.HttpBrowser):
+            fetch = web.fetch
+            load = web.load
+
+            def counted_fetch(url, data=None):
+                self.metrics.increment('round_trips')
+                return fetch(url, data)
+
+            def timed_load(url, html):
+                # Pages are parsed when loaded without a browser
+                with self.metrics.timer('parse'):
+                    return load(url, html)
+
+            web.fetch = counted_fetch
+            web.load = timed_load
+        else:
+            execute = web.execute
+
+            def counted_execute(driver_command, params=None):
+                self.metrics.increment('round_trips')
+                return execute(driver_command, params)
+
+            web.execute = counted_execute
 
     def _build_url(self, path: str) -> str:
         return '{base}/{path}'.format(base=self.base_url, path=path)
 
-    def _abort(self):
-        self.web.quit()
-        raise Exception('Aborted Aptus due to error')
+    def _throttle(self):
+        # Wait for the request rate limit before a request
+        if self.rate_limiter is not None:
+            with self.metrics.timer('rate_limit_wait'):
+                self.rate_limiter.wait()
+
+    def _wait_for_page(self, previous_page_element=None):
+        if isinstance(self.web, aptus_http.HttpBrowser):
+            # Pages are complete when fetched
+            return
+
+        with self.metrics.timer('page_wait'):
+            wait = WebDriverWait(self.web, PAGE_TIMEOUT)
+
+            try:
+                if previous_page_element is not None:
+                    # Wait for navigation away from the previous page
+                    wait.until(expected_conditions.staleness_of(previous_page_element))
+
+                wait.until(lambda web: web.execute_script('return document.readyState') in self.page_ready_states)
+            except TimeoutException:
+                # Retried as a page failing, the browser is kept
+                raise aptus_errors.DumpError('Timed out waiting for page {} to load'.format(self.web.current_url))
+
+    def wait_report(self) -> dict:
+        return {
+            'pageWaits': self.metrics.count('page_wait'),
+            'pageWaitSeconds': self.metrics.seconds('page_wait'),
+            'emptyTables': self.metrics.counter('empty_tables'),
+            'savedSeconds': self.metrics.counter('empty_tables') * IMPLICIT_WAIT
+        }
+
+    def print_wait_report(self):
+        report = self.wait_report()
+        print('Waited {:.1f} s for {} pages to be ready, {} empty tables saved {} s of implicit waits'.format(
+            report.get('pageWaitSeconds'), report.get('pageWaits'),
+            report.get('emptyTables'), report.get('savedSeconds')))
+
+    def print_metrics_report(self):
+        elapsed_seconds = self.metrics.elapsed()
+        print('Run took {:.1f} s, {} page loads in {:.1f} s, {} element queries in {:.1f} s, {} round-trips'.format(
+            elapsed_seconds, self.metrics.count('page_load'), self.metrics.seconds('page_load'),
+            self.metrics.count('element_query'), self.metrics.seconds('element_query'),
+            self.metrics.counter('round_trips')))
+        print('Waited {:.1f} s, parsed for {:.1f} s, {} login redirects'.format(
+            self.metrics.seconds('page_wait') + self.metrics.seconds('rate_limit_wait'), self.metrics.seconds('parse'),
+            self.metrics.counter('login_redirects')))
+
+        for name in filter(lambda record_timer: self.metrics.count(record_timer) > 0, RECORD_TIMERS):
+            print('{}: {} in {:.1f} s, {:.1f}/s'.format(name, self.metrics.count(name), self.metrics.seconds(name),
+                                                       self.metrics.rate(name)))
+
+    def write_metrics(self, metrics_file_path: Path):
+        # Metrics of the run as JSON and Prometheus text format, next to the run output
+        self.metrics.write_json(metrics_file_path.with_suffix('.json'))
+        self.metrics.write_prometheus(metrics_file_path.with_suffix('.prom'))
+        print('Metrics written to: {}'.format(metrics_file_path.with_suffix('.json')))
+
+    def _load_page(self, url):
+        with self.metrics.timer('page_load'):
+            self.web.get(url)
+            self._wait_for_page()
+
+        self.record_page(url, self.web)
+
+    def record_page(self, url, page):
+        # Page loaded, stored in the page cache when recording
+        if self.page_cache_mode == 'record':
+            self.page_cache.put(url, page.current_url, page.page_source)
+
+    def login(self) -> bool:
+        # Log in on the open login page
+        try:
+            # Enter username
+            username_field = self.web.find_element(by=By.ID, value='Username')
+            username_field.send_keys(self.username)
+
+            # Enter password
+            password_field = self.web.find_element(by=By.ID, value='Password')
+            password_field.send_keys(self.password)
+
+            # Click login button
+            login_button = self.web.find_element(by=By.ID, value='btnLogin')
+            self._throttle()
+            login_button.click()
+        except NoSuchElementException:
+            # An error page shown instead of the login page, retried as a page failing
+            raise aptus_errors.DumpError('Error logging in, could not find fields for username and password or login '
+                                         'button')
+
+        self._wait_for_page(login_button)
+
+        # Get current url after potential redirects etc. again
+        if self.web.current_url.startswith(self._build_url(LOGIN_PATH)):
+            # Still at the login page
+            return False
+
+        self.metrics.increment('logins')
+        self.save_session()
+
+        return True
+
+    def save_session(self):
+        if self.session_store is not None:
+            self.session_time = self.session_store.save(self.web.get_cookies())
+        else:
+            self.session_time = time.time()
+
+    def restore_session(self):
+        # Reuse saved session cookies instead of logging in
+        self.session_restore_attempted = True
+
+        if self.session_store is None:
+            return
+
+        session = self.session_store.load()
+
+        if session is None:
+            return
+
+        saved_time, cookies = session
+
+        # Cookies can only be added on a page of the site
+        self.web.get(self._build_url(LOGIN_PATH))
+        self._wait_for_page()
+
+        for cookie in cookies:
+            self.web.add_cookie(cookie)
+
+        self.session_time = saved_time
+        self.metrics.increment('sessions_reused')
+        print('- Reusing saved session')
+
+    def renew_session(self):
+        if not self.session_restore_attempted:
+            self.restore_session()
+
+        if self.session_time is None or time.time() - self.session_time < self.session_max_age - SESSION_RENEW_MARGIN:
+            return
+
+        # Log in again before the session expires, instead of being redirected to the login page
+        if self.relogin():
+            print('- Renewed session')
+
+    def relogin(self) -> bool:
+        # Log in again on a fresh session
+        self.web.delete_all_cookies()
+        self.web.get(self._build_url(LOGIN_PATH))
+        self._wait_for_page()
+
+        return self.login()
+
+    def print_session_report(self):
+        print('Logins: {}, login redirects: {}, saved sessions reused: {}'.format(
+            self.metrics.counter('logins'), self.metrics.counter('login_redirects'),
+            self.metrics.counter('sessions_reused')))
 
     def open_path(self, path: str) -> str:
+        self.renew_session()
+
         login_attempts = 1
 
         while login_attempts >= 0:
             # Open url
-            self.web.get(self._build_url(path))
+            self._throttle()
+            self._load_page(self._build_url(path))
 
             # Get current url after potential redirects etc.
             current_url = self.web.current_url
 
-            login_redirect_url = self._build_url('Account/Login')
+            login_redirect_url = self._build_url(LOGIN_PATH)
 
             if not current_url.startswith(login_redirect_url):
                 # If not redirected to login page
                 return current_url
 
             login_attempts -= 1
+            self.metrics.increment('login_redirects')
             print('- Redirected to login page')
 
-            try:
-                # Enter username
-                username_field = self.web.find_element(by=By.ID, value='Username')
-                username_field.send_keys(self.username)
-
-                # Enter password
-                password_field = self.web.find_element(by=By.ID, value='Password')
-                password_field.send_keys(self.password)
-
-                # Click login button
-                login_button = self.web.find_element(by=By.ID, value='btnLogin')
-                login_button.click()
-            except NoSuchElementException:
-                self.logger.error('Error logging in, could not find fields for username and password or login button.')
-                self._abort()
-
-            # Get current url after potential redirects etc. again
-            current_url = self.web.current_url
-
-            if not current_url.startswith(login_redirect_url):
+            if self.login():
                 # If not redirected to login page again
                 print('- Logged in')
 
                 # Open url again after login since some pages are not reditected to correctly
-                self.web.get(self._build_url(path))
+                self._throttle()
+                self._load_page(self._build_url(path))
 
                 # Get current url after potential redirects etc.
                 current_url = self.web.current_url
 
                 return current_url
 
+        # Login rejected on every attempt, retried as a page failing
+        raise aptus_errors.DumpError('Error logging in, still on the login page after logging in to open {}'
+                                     .format(path))
+
+    def open_page(self, path: str) -> aptus_http.HttpBrowser:
+        # Page opened in a browserless page of its own sharing the session cookies, safe to call from several
+        # threads at once. Login redirects are not followed, the caller logs in with open_path.
+        page = self.web.new_page()
+        self._instrument(page)
+
+        self._throttle()
+        with self.metrics.timer('page_load'):
+            page.get(self._build_url(path))
+
+        self.record_page(self._build_url(path), page)
+
+        return page
+
+    def is_login_page(self, url) -> bool:
+        return url.startswith(self._build_url(LOGIN_PATH))
+
+    def load_checkpoints(self, dump_dir: Path, part):
+        if self.journal is None:
+            self.journal = aptus_journal.DumpJournal(dump_dir)
+
+        self.journal.load(part)
+
+    def is_checkpointed(self, part, entity_id) -> bool:
+        return self.journal.is_completed(part, entity_id)
+
+    def checkpoint(self, part, entity_id, dump):
+        # Result of a previous run if checkpointed, else dump and checkpoint it
+        if self.journal.is_completed(part, entity_id):
+            return self.journal.completed(part, entity_id)
+
+        data = dump(entity_id)
+        self.journal.record(part, entity_id, data, self.list_fingerprints.listed(data))
+
+        return data
+
+    def checkpoint_isolated(self, part, entity_id, dump, session=None) -> bool:
+        # Checkpoint an entity dumped on this session or a worker session, retrying it when its pages fail. An entity
+        # failing for good is recorded in the errors file and not checkpointed, so the dump carries on and a resumed
+        # dump retries it. Returns whether the entity was checkpointed.
+        session = session if session is not None else self
+
+        if self.journal.is_completed(part, entity_id):
+            return True
+
+        try:
+            data = session.dump_retrying(part, entity_id, dump)
+        except aptus_errors.DUMP_ERRORS as error:
+            session.record_error(part, entity_id, error)
+            return False
+
+        self.journal.record(part, entity_id, data, self.list_fingerprints.listed(data))
+
+        return True
+
+    def dump_retrying(self, part, entity_id, dump):
+        # Dump an entity, retried after a backoff doubling with every attempt on a fresh page load, logged in again if
+        # the session was lost. Raises the error of the last attempt.
+        for attempt in range(1, self.dump_attempts + 1):
+            try:
+                return dump(entity_id)
+            except aptus_errors.DUMP_ERRORS as error:
+                if attempt == self.dump_attempts:
+                    raise
+
+                self.logger.error('Error dumping {} ID: {}, attempt {}, {}'.format(part, entity_id, attempt, error))
+                print('- Retrying {} ID: {}'.format(part, entity_id))
+                self.metrics.increment('dump_retries')
+
+                time.sleep(self.dump_retry_backoff * 2 ** (attempt - 1))
+
+                if self.web.current_url is not None and self.is_login_page(self.web.current_url):
+                    # Session lost, logged in again before the next attempt
+                    try:
+                        self.relogin()
+                    except aptus_errors.DUMP_ERRORS as login_error:
+                        # Left to the next attempt, which logs in when redirected to the login page
+                        self.logger.error('Error logging in again, {}'.format(login_error))
+
+    def record_error(self, part, entity_id, error, on_session_page=True):
+        # Entity failing for good, with the page it failed on. Errors without a page are from the current page of
+        # the session if on_session_page, else they are recorded without a page rather than an unrelated one.
+        page = getattr(error, 'page', None)
+        if page is None and on_session_page:
+            page = self.web
+
+        self.logger.error('Error dumping {} ID: {}, {}'.format(part, entity_id, error))
+        print('Failed {} ID: {}'.format(part, entity_id))
+        if page is None:
+            self.error_log.record(part, entity_id, error, self.dump_attempts, None, None)
+        else:
+            self.error_log.record(part, entity_id, error, self.dump_attempts, page.current_url, page.page_source)
+
+    def checkpointed(self, part, entity_id):
+        return self.journal.completed(part, entity_id)
+
+    def finish_checkpoints(self, part):
+        self.journal.finish(part)
+
+    @staticmethod
+    def previous_dump_dirs(dump_dir: Path) -> list:
+        # Dump directories before the dump directory, oldest first, without the dumps replayed from the page cache
+        return sorted(filter(lambda path: path.is_dir() and path.name < dump_dir.name and
+                             not path.joinpath(REPLAY_MARKER_FILE_NAME).is_file(), dump_dir.parent.iterdir()))
+
+    def previous_dump_file_path(self, dump_dir: Path, part):
+        # Dump file of the part in the latest dump before the dump directory, None if there is none
+        previous_dump_file_paths = sorted(
+            filter(lambda path: path.is_file(),
+                   map(lambda path: self.dump_file_path(path, part), self.previous_dump_dirs(dump_dir))))
+
+        return previous_dump_file_paths[-1] if len(previous_dump_file_paths) > 0 else None
+
+    def dump_file_path(self, dump_dir: Path, part) -> Path:
+        dump_file_path = dump_dir.joinpath(DUMP_FILE_NAMES.get(part))
+
+        if self.dump_format == 'jsonl' and part in ('authorities', 'customers'):
+            return dump_file_path.with_suffix('.jsonl')
+
+        return dump_file_path
+
+    def read_tables(self, *names, page: aptus_http.HttpBrowser = None) -> dict:
+        # Rows of the tables of the open page, or of a page opened with open_page
+        selectors = list(map(lambda name: TABLE_ROWS.get(name), names))
+
+        with self.metrics.timer('element_query'):
+            if page is not None:
+                tables = page.snapshot_tables(selectors)
+            elif isinstance(self.web, aptus_http.HttpBrowser):
+                tables = self.web.snapshot_tables(selectors)
+            else:
+                tables = self.web.execute_script(TABLE_SNAPSHOT_SCRIPT, selectors)
+
+                # Each empty table queried in a browser used to cost a full implicit wait, browserless sessions never
+                # waited implicitly
+                self.metrics.increment('empty_tables', len(list(filter(lambda rows: len(rows) == 0, tables))))
+
+        return dict(zip(names, tables))
+
+    def read_links(self) -> list:
+        with self.metrics.timer('element_query'):
+            if isinstance(self.web, aptus_http.HttpBrowser):
+                return self.web.snapshot_links()
+
+            return self.web.execute_script(LINKS_SCRIPT)
+
+    @aptus_metrics.timed('dump_all_authorities')
     def dump_all_authorities(self, dump_dir: Path):
         # Open url to authority index page
         self.open_path('Authority/Index')
 
         # Authority table
-        tr_elements = self.web.find_elements(by=By.CSS_SELECTOR,
-                                             value='div.listTableDiv > table.listTable > tbody > tr')
-
-        row_datas = list(map(lambda tr_element: {
-            'tr': tr_element,
-            'onclick': tr_element.get_attribute('onclick')
-        }, tr_elements))
+        table_rows = self.read_tables('list').get('list')
 
         row_datas = list(
             filter(lambda row: row.get('onclick') is not None and '/Authority/Details/' in row.get('onclick'),
-                   row_datas))
+                   table_rows))
 
         row_datas = list(
             map(lambda row: {
                 'id': re.search(r"document\.location\.href=\'.+/Authority/Details/(\d+)\'", row.get('onclick')).group(
                     1),
-                'name': row.get('tr').find_element(by=By.CSS_SELECTOR, value='td').get_attribute('innerHTML').strip()
+                'name': self.convert_parse_string(row.get('cells')[0], 'string')
             }, row_datas))
 
         print('Authorities: {}'.format(len(row_datas)))
 
-        authorities = []
+        self.load_checkpoints(dump_dir, 'authorities')
 
-        # Loop over authority id's
-        for authority_data in row_datas:
-            authorities.append(self.dump_authority(authority_data.get('id'), authority_data.get('name')))
+        authority_names = {authority_data.get('id'): authority_data.get('name') for authority_data in row_datas}
 
-        authorities_dump_file_path = dump_dir.joinpath("authorities_dump.json")
+        # Always loading the details pages since the list only shows their names, different authorities concurrently
+        # with more than one worker
+        failed_authority_ids = self.checkpoint_all('authorities', list(authority_names),
+                                                   lambda session, authority_id: session.dump_authority(
+                                                       authority_id, authority_names.get(authority_id)))
 
-        with authorities_dump_file_path.open(mode='w', encoding='utf-8') as outfile:
-            json_string = json.dumps(authorities, indent=2, ensure_ascii=False)
-            outfile.write(json_string)
+        # Stream the checkpointed authorities to the dump file, without the ones failing
+        with aptus_writers.open_array_writer(self.dump_file_path(dump_dir, 'authorities')) as writer:
+            for authority_id in authority_names:
+                if authority_id not in failed_authority_ids:
+                    writer.write(self.checkpointed('authorities', authority_id))
+
+        if len(failed_authority_ids) > 0:
+            # Keep the checkpoints for resuming the failed authorities
+            print('Authorities failed: {}, resume the dump to retry them'.format(len(failed_authority_ids)))
+        else:
+            self.finish_checkpoints('authorities')
 
+    @aptus_metrics.timed('dump_authority')
     def dump_authority(self, authority_id, authority_name):
         # Open authority details page
         self.open_path('Authority/Details/{id}'.format(id=authority_id))
 
         # Permissions table
-        td_elements = self.web.find_elements(by=By.CSS_SELECTOR,
-                                             value='div.listTableDiv > div > table.listTable > tbody > tr > td')
+        table_rows = self.read_tables('nestedList').get('nestedList')
+        cells = [cell for row in table_rows for cell in row.get('cells')]
 
-        timezones = list(map(lambda td_element: td_element.get_attribute('innerHTML').strip(), td_elements))
+        timezones = list(map(lambda cell: self.convert_parse_string(cell, 'string'), cells))
 
         print('Authority {}, {}, {} timezones'.format(authority_id, authority_name, len(timezones)))
 
@@ -149,21 +772,252 @@ class Aptus:
             'timezones': timezones
         }
 
+    @aptus_metrics.timed('dump_all_customers')
     def dump_all_customers(self, dump_dir: Path):
-        customers = []
+        self.load_checkpoints(dump_dir, 'customers')
+
+        # Fingerprints of the keys and contracts of the customers dumped by a previous run
+        self.list_fingerprints.merge(self.journal.fingerprints('customers'))
+
+        customer_ids = self.discover_customer_ids()
+        failed_customer_ids = []
+
+        # Customers are checkpointed as they are dumped, only the id's of existing customers are kept in memory
+        if customer_ids is None:
+            print('Customer list unavailable, probing customer ID range')
+            dumped_customer_ids = self.dump_customers_probing(self.load_customer_id_hint(dump_dir))
+        elif self.workers > 1:
+            dumped_customer_ids, failed_customer_ids = self.dump_customers_parallel(customer_ids)
+        elif self.pipeline_concurrency > 1 and isinstance(self.web, aptus_http.HttpBrowser):
+            dumped_customer_ids = self.dump_customers_pipelined(customer_ids)
+        else:
+            dumped_customer_ids = []
 
-        # Loop over customer id's
-        for customer_id in range(self.min_customer_id, self.max_customer_id):
-            customer = self.dump_customer(customer_id)
-            if customer is not None:
-                customers.append(customer)
+            # Loop over customer id's
+            for customer_id in customer_ids:
+                if self.checkpoint_isolated('customers', customer_id, self.dump_customer) and \
+                        self.checkpointed('customers', customer_id) is not None:
+                    dumped_customer_ids.append(customer_id)
 
-        customer_dump_file_path = dump_dir.joinpath('customer_dump.json')
+        # Stream the checkpointed customers to the dump file
+        with aptus_writers.open_array_writer(self.dump_file_path(dump_dir, 'customers')) as writer:
+            for customer_id in dumped_customer_ids:
+                writer.write(self.checkpointed('customers', customer_id))
 
-        with customer_dump_file_path.open(mode='w', encoding='utf-8') as outfile:
-            json_string = json.dumps(customers, indent=2, ensure_ascii=False)
+        # Customer id's found, hint for the next dump
+        customer_ids_file_path = dump_dir.joinpath('customer_ids.json')
+
+        with customer_ids_file_path.open(mode='w', encoding='utf-8') as outfile:
+            json_string = json.dumps(dumped_customer_ids)
             outfile.write(json_string)
 
+        # Fingerprints of the keys and contracts listed, compared by the next incremental dump
+        self.list_fingerprints.save(dump_dir.joinpath(FINGERPRINTS_FILE_NAME))
+
+        # Customers failing for good, in every way of dumping them
+        failed_customer_ids = sorted(set(failed_customer_ids) | set(self.error_log.failed_ids('customers')))
+
+        if len(failed_customer_ids) > 0:
+            # Keep the checkpoints for resuming the failed customers
+            print('Customers failed: {}, resume the dump to retry them'.format(len(failed_customer_ids)))
+        else:
+            self.finish_checkpoints('customers')
+
+    @aptus_metrics.timed('discover_customer_ids')
+    def discover_customer_ids(self):
+        # Open url to customer list page
+        self.open_path(CUSTOMER_INDEX_PATH)
+
+        index_url = self._build_url(CUSTOMER_INDEX_PATH)
+        pages_to_visit = []
+        visited_pages = {self.list_page_url(index_url)}
+        customer_ids = set()
+        page_count = 0
+
+        while True:
+            page_count += 1
+
+            # A redirect lands on a page that may have been visited already
+            visited_pages.add(self.list_page_url(self.web.current_url))
+
+            # Customer table
+            table_rows = self.read_tables('list').get('list')
+
+            onclick_attributes = list(map(lambda row: row.get('onclick'), table_rows))
+            customer_onclick_urls = list(
+                filter(lambda a: a is not None and '/Customer/Details/' in a, onclick_attributes))
+            page_customer_ids = set(
+                map(lambda a: int(re.search(r"document\.location\.href=\'.+/Customer/Details/(\d+)\'", a).group(1)),
+                    customer_onclick_urls))
+
+            # Pagination links to other pages of the customer list, only followed from pages with new customers so
+            # a pager linking past the last page ends
+            if not page_customer_ids.issubset(customer_ids):
+                for link in self.read_links():
+                    if link is None or not link.startswith(index_url) or urllib.parse.urlparse(link).query == '':
+                        continue
+
+                    link = self.list_page_url(link)
+                    if link not in visited_pages and link not in pages_to_visit:
+                        pages_to_visit.append(link)
+
+            customer_ids.update(page_customer_ids)
+
+            if len(pages_to_visit) == 0:
+                break
+
+            # Visited when requested, whatever page it ends up on
+            page_url = pages_to_visit.pop(0)
+            visited_pages.add(page_url)
+            self.open_path(page_url[len(self.base_url) + 1:])
+
+        if len(customer_ids) == 0:
+            # Return None to signify that the list is unavailable
+            return None
+
+        customer_ids = sorted(filter(lambda customer_id: self.min_customer_id <= customer_id < self.max_customer_id,
+                                     customer_ids))
+
+        print('Customers found: {} on {} list pages'.format(len(customer_ids), page_count))
+
+        return customer_ids
+
+    @staticmethod
+    def list_page_url(url) -> str:
+        # Url of a list page with its query sorted and without a fragment, the first page being the bare list url
+        parsed_url = urllib.parse.urlparse(url)
+        query = sorted(filter(lambda parameter: parameter != ('page', '1'), urllib.parse.parse_qsl(parsed_url.query)))
+
+        return urllib.parse.urlunparse(parsed_url._replace(query=urllib.parse.urlencode(query), fragment=''))
+
+    @staticmethod
+    def load_customer_id_hint(dump_dir: Path) -> list:
+        # Customer id's of the latest previous dump
+        for previous_dump_dir in reversed(Aptus.previous_dump_dirs(dump_dir)):
+            customer_ids_file_path = previous_dump_dir.joinpath('customer_ids.json')
+
+            if customer_ids_file_path.is_file():
+                with customer_ids_file_path.open(mode='r', encoding='utf-8') as infile:
+                    customer_ids = json.load(infile)
+
+                print('Using {} customer ID\'s from {} as hint'.format(len(customer_ids), previous_dump_dir.name))
+                return customer_ids
+
+        return []
+
+    def dump_customers_probing(self, hint_customer_ids):
+        # Probe the customer id range, skipping ahead in long gaps of missing id's. When a customer is found after
+        # skipping, every id skipped since the previous customer found is probed. Id's of the hint are always probed,
+        # and id's above the hint are probed without skipping since new customers are added there. Without a hint
+        # every id is probed.
+        hint_customer_ids = sorted(set(hint_customer_ids))
+
+        if len(hint_customer_ids) > 0:
+            dense_from_customer_id = hint_customer_ids[-1]
+        else:
+            self.logger.warning('Probing customer ID\'s without a hint, every ID is probed')
+            print('No customer ID hint, probing every customer ID')
+            dense_from_customer_id = self.min_customer_id
+        found_customer_ids = set()
+        probed_customer_ids = set()
+
+        def probe(probe_customer_id):
+            probed_customer_ids.add(probe_customer_id)
+            # A customer failing counts as missing
+            if self.checkpoint_isolated('customers', probe_customer_id, self.dump_customer) and \
+                    self.checkpointed('customers', probe_customer_id) is not None:
+                found_customer_ids.add(probe_customer_id)
+            return probe_customer_id in found_customer_ids
+
+        step = 1
+        misses = 0
+        skipped = False
+        customer_id = self.min_customer_id
+
+        while customer_id < self.max_customer_id:
+            if probe(customer_id):
+                if skipped:
+                    # Go back over all the id's skipped since the previous customer found
+                    back_customer_id = customer_id - 1
+
+                    while back_customer_id >= self.min_customer_id and back_customer_id not in found_customer_ids:
+                        if back_customer_id not in probed_customer_ids:
+                            probe(back_customer_id)
+                        back_customer_id -= 1
+
+                    skipped = False
+
+                step = 1
+                misses = 0
+            else:
+                misses += 1
+                if customer_id >= dense_from_customer_id:
+                    step = 1
+                elif misses % PROBE_GAP == 0:
+                    step = min(step * 2, PROBE_MAX_STEP)
+
+            next_customer_id = customer_id + step
+
+            # Never skip a hinted id
+            hint_index = bisect.bisect_right(hint_customer_ids, customer_id)
+            if hint_index < len(hint_customer_ids) and hint_customer_ids[hint_index] < next_customer_id:
+                next_customer_id = hint_customer_ids[hint_index]
+                step = 1
+                misses = 0
+
+            skipped = skipped or next_customer_id > customer_id + 1
+            customer_id = next_customer_id
+
+        print('Probed {} customer ID\'s'.format(len(probed_customer_ids)))
+
+        return sorted(found_customer_ids)
+
+    def dump_customers_parallel(self, customer_ids):
+        print('Dumping customers with {} workers'.format(self.workers))
+
+        # Customers checkpointed by a previous run are not dumped again
+        pending_customer_ids = list(
+            filter(lambda customer_id: not self.is_checkpointed('customers', customer_id), customer_ids))
+
+        # Results are checkpointed, only whether the customer exists is returned from the workers
+        pool = aptus_pool.WorkerPool(self.spawn, self.workers, metrics=self.metrics)
+        results = pool.run(pending_customer_ids,
+                           lambda worker, customer_id: self.checkpoint_isolated('customers', customer_id,
+                                                                                worker.dump_customer, worker) and
+                           self.checkpointed('customers', customer_id) is not None)
+
+        for customer_id in customer_ids:
+            if customer_id not in results and self.is_checkpointed('customers', customer_id):
+                results[customer_id] = self.checkpointed('customers', customer_id) is not None
+
+        # Customers whose worker crashed, recorded with the customers failing for good
+        for customer_id, error in sorted(pool.failures.items()):
+            self.logger.error('Error dumping customer ID: {}, {}'.format(customer_id, error))
+            print('Customer ID: {} failed'.format(customer_id))
+            self.error_log.record('customers', customer_id, error, pool.attempts.get(customer_id, 0), None, None)
+
+        # Merge in customer id order
+        dumped_customer_ids = list(filter(lambda customer_id: results.get(customer_id), sorted(results)))
+
+        return dumped_customer_ids, sorted(pool.failures)
+
+    def dump_customers_pipelined(self, customer_ids):
+        print('Dumping customers with {} pages in flight'.format(self.pipeline_concurrency))
+
+        # Customers checkpointed by a previous run are not dumped again
+        pending_customer_ids = list(
+            filter(lambda customer_id: not self.is_checkpointed('customers', customer_id), customer_ids))
+
+        pipeline = aptus_pipeline.CustomerPipeline(self, self.pipeline_concurrency)
+        pipeline.run(pending_customer_ids,
+                     lambda customer_id, customer: self.journal.record('customers', customer_id, customer,
+                                                                       self.list_fingerprints.listed(customer)))
+
+        # Customers failing for good are not checkpointed
+        return list(filter(lambda customer_id: self.is_checkpointed('customers', customer_id) and
+                           self.checkpointed('customers', customer_id) is not None, customer_ids))
+
+    @aptus_metrics.timed('dump_customer')
     def dump_customer(self, customer_id):
         # Open url to customer details page
         customer_details_path = 'Customer/Details/{id}'.format(id=customer_id)
@@ -177,27 +1031,41 @@ class Aptus:
 
         print('Customer ID: {}'.format(customer_id))
 
-        # Gather customer data
+        # Gather customer data, only loading the selected sections. The details page is always loaded since it tells
+        # whether the customer exists.
+        sections = {
+            'details': lambda: self.dump_customer_details(self.read_tables('details')),
+            'keys': lambda: self.dump_customer_keys(customer_id),
+            'contracts': lambda: self.dump_customer_contracts(customer_id),
+            'entryPhone': lambda: self.dump_customer_entry_phone(customer_id),
+            'notes': lambda: self.dump_customer_notes(customer_id)
+        }
+
+        return self.assemble_customer(customer_id, sections)
 
+    def assemble_customer(self, customer_id, sections: dict) -> dict:
+        # Customer with the selected sections in dump order, each loaded by calling its function
         customer = {
-            'id': customer_id,
-            'details': self.dump_customer_details(),
-            'keys': self.dump_customer_keys(customer_id),
-            'contracts': self.dump_customer_contracts(customer_id),
-            'entryPhone': self.dump_customer_entry_phone(customer_id),
-            'notes': self.dump_customer_notes(customer_id)
+            'id': customer_id
         }
 
+        for section in filter(lambda name: name in self.customer_sections, CUSTOMER_SECTIONS):
+            customer[section] = sections.get(section)()
+
+        # Sections not selected are listed as omitted, telling them apart from empty ones
+        omitted_sections = list(filter(lambda name: name not in self.customer_sections, CUSTOMER_SECTIONS))
+
+        if len(omitted_sections) > 0:
+            customer['omitted'] = omitted_sections
+
         return customer
 
-    def dump_customer_details(self):
+    def dump_customer_details(self, tables: dict):
         # Details table
-        details_table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                                    value='div.detailsTableDiv > table.detailsTable > tbody > tr')
+        details_table_rows = tables.get('details')
 
         if len(details_table_rows) != 6:
-            self.logger.error('Error dumping customer, expected 6 rows in details table')
-            self._abort()
+            raise aptus_errors.DumpError('Error dumping customer, expected 6 rows in details table')
 
         return {
             'name': self.dump_customer_details_row(details_table_rows[0], 'Name', 'string'),
@@ -208,67 +1076,89 @@ class Aptus:
             'isCompany': self.dump_customer_details_row(details_table_rows[5], 'IsCompany', 'bool')
         }
 
-    def dump_customer_details_row(self, tr_element, expected_label, input_type):
-        td_elements = tr_element.find_elements(by=By.CSS_SELECTOR, value='td')
+    def dump_customer_details_row(self, row, expected_label, input_type):
+        cells = row.get('cells')
 
-        if len(td_elements) != 2:
-            self.logger.error('Error dumping customer details row, expected 2 td elements in tr')
-            self._abort()
+        if len(cells) != 2:
+            raise aptus_errors.DumpError('Error dumping customer details row, expected 2 td elements in tr')
 
         # Label
-        label_td = td_elements[0]
-        actual_label = label_td.find_element(by=By.CSS_SELECTOR, value='label').get_attribute('for')
+        actual_label = cells[0].get('label')
 
         if actual_label != expected_label:
-            self.logger.error(
-                'Error dumping customer details row, expected label {}, got label {}'.format(expected_label,
-                                                                                             actual_label))
-            self._abort()
+            raise aptus_errors.DumpError('Error dumping customer details row, expected label {}, got label {}'.format(
+                expected_label, actual_label))
 
         # Value
-        return self.convert_parse_string(td_elements[1], input_type)
+        return self.convert_parse_string(cells[1], input_type)
 
     def dump_customer_keys(self, customer_id):
         # Open url to customer keys page
         self.open_path('CustomerKeys/Index/{id}'.format(id=customer_id))
 
         # Keys table
-        table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                            value='div.listTableDiv > table.listTable > tbody > tr')
-
-        onclick_attributes = list(map(lambda row: row.get_attribute('onclick'), table_rows))
-        key_onclick_urls = list(filter(lambda a: a is not None and '/CustomerKeys/Details/' in a, onclick_attributes))
-        key_ids = list(
-            map(lambda a: re.search(r"document\.location\.href=\'.+/CustomerKeys/Details/(\d+)\'", a).group(1),
-                key_onclick_urls))
+        key_rows = self.parse_onclick_rows(self.read_tables('list').get('list'), 'CustomerKeys/Details')
 
         keys = []
 
-        print('Keys: {}'.format(len(key_ids)))
+        print('Keys: {}'.format(len(key_rows)))
 
         # Loop over key id's
-        for key_id in key_ids:
-            keys.append(self.dump_key(key_id))
+        for key_id, key_row in key_rows:
+            keys.append(self.dump_listed('keys', key_id, key_row, self.dump_key))
 
         return keys
 
+    @staticmethod
+    def parse_onclick_rows(table_rows, details_path) -> list:
+        # (id, row) of the rows opening a details page on click, by the id of the page
+        onclick_rows = list(filter(lambda row: row.get('onclick') is not None and
+                                   '/{}/'.format(details_path) in row.get('onclick'), table_rows))
+
+        return list(map(lambda row: (re.search(r"document\.location\.href=\'.+/" + re.escape(details_path) +
+                                               r"/(\d+)\'", row.get('onclick')).group(1), row), onclick_rows))
+
+    @staticmethod
+    def parse_onclick_ids(table_rows, details_path) -> list:
+        # Id's of the details pages the rows open on click
+        return list(map(lambda onclick_row: onclick_row[0], Aptus.parse_onclick_rows(table_rows, details_path)))
+
+    def reusable_details(self, kind, entity_id, row):
+        # Details of the previous dump if dumping incrementally and the list row is unchanged since, else None
+        details = self.list_fingerprints.reusable(kind, entity_id, row)
+
+        if details is not None:
+            self.metrics.increment('details_reused')
+
+        return details
+
+    def dump_listed(self, kind, entity_id, row, dump):
+        # Details reused from the previous dump, or dumped from the details page
+        details = self.reusable_details(kind, entity_id, row)
+
+        return details if details is not None else dump(entity_id)
+
+    @aptus_metrics.timed('dump_key')
     def dump_key(self, key_id):
         # Open url to key details page
         self.open_path('CustomerKeys/Details/{id}'.format(id=key_id))
 
+        return self.parse_key(key_id, self.read_tables('list', 'details'))
+
+    def parse_key(self, key_id, tables: dict):
         # Details table
-        details_table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                                    value='div.detailsTableDiv > table.detailsTable > tbody > tr')
+        details_table_rows = tables.get('details')
 
         if len(details_table_rows) != 10:
-            self.logger.error('Error dumping key, expected 10 rows in details table')
-            self._abort()
+            raise aptus_errors.DumpError('Error dumping key, expected 10 rows in details table')
 
         print('Key ID: {}'.format(key_id))
 
         # Permissions table
-        permissions_table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                                        value='div.listTableDiv > table.listTable > tbody > tr')
+        permissions_table_rows = tables.get('list')
+
+        if len(permissions_table_rows) == 0:
+            raise aptus_errors.DumpError('Error dumping key, expected a header row in permissions table')
 
         # Remove table header
         permissions_table_rows.pop(0)
@@ -277,11 +1167,10 @@ class Aptus:
 
         # Loop over key id's
         for permission_row in permissions_table_rows:
-            columns = permission_row.find_elements(by=By.CSS_SELECTOR, value='td')
+            columns = permission_row.get('cells')
 
             if len(columns) != 4:
-                self.logger.error('Error dumping key permission, expected 4 columns in permissions table')
-                self._abort()
+                raise aptus_errors.DumpError('Error dumping key permission, expected 4 columns in permissions table')
 
             permissions.append({
                 'permission': self.convert_parse_string(columns[0], 'string'),
@@ -310,37 +1199,31 @@ class Aptus:
         self.open_path('CustomerContract/Index/{id}'.format(id=customer_id))
 
         # Contracts table
-        table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                            value='div.listTableDiv > table.listTable > tbody > tr')
-
-        onclick_attributes = list(map(lambda row: row.get_attribute('onclick'), table_rows))
-        key_onclick_urls = list(
-            filter(lambda a: a is not None and '/CustomerContract/Details/' in a, onclick_attributes))
-        contract_ids = list(
-            map(lambda a: re.search(r"document\.location\.href=\'.+/CustomerContract/Details/(\d+)\'", a).group(1),
-                key_onclick_urls))
+        contract_rows = self.parse_onclick_rows(self.read_tables('list').get('list'), 'CustomerContract/Details')
 
         contracts = []
 
-        print('Contracts: {}'.format(len(contract_ids)))
+        print('Contracts: {}'.format(len(contract_rows)))
 
         # Loop over key id's
-        for contract_id in contract_ids:
-            contracts.append(self.dump_contract(contract_id))
+        for contract_id, contract_row in contract_rows:
+            contracts.append(self.dump_listed('contracts', contract_id, contract_row, self.dump_contract))
 
         return contracts
 
+    @aptus_metrics.timed('dump_contract')
     def dump_contract(self, contract_id):
         # Open url to customer contract details page
         self.open_path('CustomerContract/Details/{id}'.format(id=contract_id))
 
+        return self.parse_contract(contract_id, self.read_tables('details'))
+
+    def parse_contract(self, contract_id, tables: dict):
         # Details table
-        details_table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                                    value='div.detailsTableDiv > table.detailsTable > tbody > tr')
+        details_table_rows = tables.get('details')
 
         if len(details_table_rows) != 8:
-            self.logger.error('Error dumping contract, expected 8 rows in details table')
-            self._abort()
+            raise aptus_errors.DumpError('Error dumping contract, expected 8 rows in details table')
 
         print('Contract ID: {}'.format(contract_id))
 
@@ -357,6 +1240,7 @@ class Aptus:
             'addressName': self.dump_customer_details_row(details_table_rows[7], 'AddressName', 'string')
         }
 
+    @aptus_metrics.timed('dump_customer_entry_phone')
     def dump_customer_entry_phone(self, customer_id):
         # Open url directly to entry phone index page
         customer_entry_phone_index_path = 'CustomerEntryPhone/Index/{id}'.format(id=customer_id)
@@ -368,14 +1252,19 @@ class Aptus:
             # Return None to signify no data
             return None
 
+        return self.parse_entry_phone(current_url, self.read_tables('list', 'details'))
+
+    def parse_entry_phone(self, entry_phone_url, tables: dict):
         # Get entry phone id
-        entry_phone_id = re.search(r".+/CustomerEntryPhone/Details/(\d+)", current_url).group(1)
+        entry_phone_id = re.search(r".+/CustomerEntryPhone/Details/(\d+)", entry_phone_url).group(1)
 
         print('Entry phone ID: {}'.format(entry_phone_id))
 
         # Entry phone names table
-        entry_phone_name_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                                       value='div.listTableDiv > table.listTable > tbody > tr')
+        entry_phone_name_rows = tables.get('list')
+
+        if len(entry_phone_name_rows) == 0:
+            raise aptus_errors.DumpError('Error dumping entry phone, expected a header row in list table')
 
         # Remove table header
         entry_phone_name_rows.pop(0)
@@ -384,11 +1273,10 @@ class Aptus:
 
         # Loop over entry phone names
         for entry_phone_name_row in entry_phone_name_rows:
-            columns = entry_phone_name_row.find_elements(by=By.CSS_SELECTOR, value='td')
+            columns = entry_phone_name_row.get('cells')
 
             if len(columns) != 5:
-                self.logger.error('Error dumping entry phone name, expected 4 columns in list table')
-                self._abort()
+                raise aptus_errors.DumpError('Error dumping entry phone name, expected 5 columns in list table')
 
             entry_phone_names.append({
                 'firstName': self.convert_parse_string(columns[0], 'string'),
@@ -399,12 +1287,10 @@ class Aptus:
             })
 
         # Details table
-        details_table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                                    value='div.detailsTableDiv > table.detailsTable > tbody > tr')
+        details_table_rows = tables.get('details')
 
         if len(details_table_rows) != 8:
-            self.logger.error('Error dumping entry phone, expected 8 rows in details table')
-            self._abort()
+            raise aptus_errors.DumpError('Error dumping entry phone, expected 8 rows in details table')
 
         return {
             'id': entry_phone_id,
@@ -421,13 +1307,19 @@ class Aptus:
             'entryPhoneNames': entry_phone_names
         }
 
+    @aptus_metrics.timed('dump_customer_notes')
     def dump_customer_notes(self, customer_id):
         # Open url to customer note index page
         self.open_path('CustomerNote/Index/{id}'.format(id=customer_id))
 
+        return self.parse_notes(self.read_tables('list'))
+
+    def parse_notes(self, tables: dict):
         # Notes list
-        notes_table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                                  value='div.listTableDiv > table.listTable > tbody > tr')
+        notes_table_rows = tables.get('list')
+
+        if len(notes_table_rows) == 0:
+            raise aptus_errors.DumpError('Error dumping customer notes, expected a header row in customer note table')
 
         # Remove table header
         notes_table_rows.pop(0)
@@ -438,11 +1330,10 @@ class Aptus:
 
         # Loop over note table rows
         for permission_row in notes_table_rows:
-            columns = permission_row.find_elements(by=By.CSS_SELECTOR, value='td')
+            columns = permission_row.get('cells')
 
             if len(columns) != 4:
-                self.logger.error('Error dumping customer note, expected 4 columns in customer note table')
-                self._abort()
+                raise aptus_errors.DumpError('Error dumping customer note, expected 4 columns in customer note table')
 
             notes.append({
                 'note': self.convert_parse_string(columns[0], 'string'),
@@ -452,73 +1343,265 @@ class Aptus:
 
         return notes
 
-    def get_details_table_row_for_name(self, name):
-        # Details table
-        details_table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                                    value='div.detailsTableDiv > table.detailsTable > tbody > tr')
+    def read_form(self, element_id) -> dict:
+        # Form of an element read in one round-trip, including hidden fields and anti-forgery token
+        with self.metrics.timer('element_query'):
+            if isinstance(self.web, aptus_http.HttpBrowser):
+                return self.web.snapshot_form(element_id)
+
+            return self.web.execute_script(FORM_SNAPSHOT_SCRIPT, element_id)
+
+    def post_form(self, form: dict, fields: list) -> aptus_http.HttpBrowser:
+        # Submit form fields with a plain HTTP POST instead of typing them, returns the session with the response
+        if form.get('method') != 'post':
+            raise Exception('Expected a form posted with method post')
+
+        session = self.http_session()
+
+        self._throttle()
+        session.load(*session.fetch(form.get('action'), list(map(tuple, fields))))
+
+        return session
 
-        # Filter out tr element
-        filtered_rows = list(
-            filter(lambda row: row.find_element(by=By.CSS_SELECTOR, value='td > label').get_attribute('for') == name,
-                   details_table_rows))
+    def http_session(self) -> aptus_http.HttpBrowser:
+        # Plain HTTP session logged in as the browser, the browserless session itself without a browser
+        if isinstance(self.web, aptus_http.HttpBrowser):
+            return self.web
 
-        if len(filtered_rows) != 1:
-            raise Exception('Could not find expected field in details table')
+        # Copy the cookies of the browser, they change when the session is renewed
+        if self.cookie_session is None:
+            self.cookie_session = aptus_http.HttpBrowser()
+            self._instrument(self.cookie_session)
 
-        return filtered_rows[0]
+        self.cookie_session.delete_all_cookies()
 
-    def update_key(self, key_data: dict):
+        for cookie in self.web.get_cookies():
+            self.cookie_session.add_cookie(cookie)
+
+        return self.cookie_session
+
+    @staticmethod
+    def replace_form_field(fields: list, name, values: list) -> list:
+        # Fields with the values of name replaced, in place of the first one
+        replaced_fields = []
+
+        for field in fields:
+            if field[0] != name:
+                replaced_fields.append(field)
+            elif not any(map(lambda replaced_field: replaced_field[0] == name, replaced_fields)):
+                replaced_fields.extend(map(lambda value: [name, value], values))
+
+        if not any(map(lambda field: field[0] == name, fields)):
+            replaced_fields.extend(map(lambda value: [name, value], values))
+
+        return replaced_fields
+
+    @aptus_metrics.timed('update_key')
+    def update_key(self, key_data: dict) -> str:
         key_id = key_data.get('id')
         # Open url to key edit page
-        self.open_path('CustomerKeys/Edit/{id}'.format(id=key_id))
+        key_edit_path = 'CustomerKeys/Edit/{id}'.format(id=key_id)
+        current_url = self.open_path(key_edit_path)
+
+        if not current_url.endswith(key_edit_path):
+            # Key does not exist if we have been redirected to other page
+            raise Exception('Key does not exist')
 
         print('Updating key: {}'.format(key_id))
 
+        # Edit form read once, changed fields are posted with all other fields as they are
+        form = self.read_form('theSubmitButton')
+        fields = form.get('fields')
+
         has_changed = False
 
-        # Update code
-        code_key = 'code'
-        if code_key in key_data:
-            code_tr = self.get_details_table_row_for_name('Code')
-            code_input = code_tr.find_element(by=By.CSS_SELECTOR, value='input')
+        # Update fields, verified against the current values of the form
+        for key_field, (form_field, input_type) in KEY_FIELDS.items():
+            if key_field not in key_data:
+                continue
 
-            # Update code
-            old_code = code_input.get_attribute('value')
-            new_code = key_data.get(code_key)
+            values = list(map(lambda field: field[1], filter(lambda field: field[0] == form_field, fields)))
 
-            if new_code != old_code:
+            new_value = self.key_field_value(key_field, key_data.get(key_field))
+
+            if input_type == 'bool':
+                # Checked checkbox followed by a hidden false field, only the hidden field when not checked
+                old_value = 'true' in map(str.lower, values)
+                new_values = ['true', 'false'] if new_value else ['false']
+            else:
+                if len(values) == 0:
+                    raise Exception('Could not find expected field in edit form: {}'.format(form_field))
+
+                old_value = values[0]
+                new_values = [new_value]
+
+            if new_value != old_value:
                 has_changed = True
-                code_input.clear()
-                code_input.send_keys(new_code)
-                print('Updating code from: {} to: {}'.format(old_code, new_code))
+                fields = self.replace_form_field(fields, form_field, new_values)
+                print('Updating {} from: {} to: {}'.format(key_field, old_value, new_value))
 
         # Save
         if has_changed:
-            save_button = self.web.find_element(by=By.ID, value='theSubmitButton')
-            save_button.click()
+            try:
+                session = self.post_form(form, fields)
+            except KEY_UPDATE_RETRY_ERRORS as error:
+                # The key may have been saved, a retry would find it unchanged
+                raise Exception('Save not confirmed: {}'.format(error))
+
+            if session.current_url.startswith(self._build_url(LOGIN_PATH)):
+                raise Exception('Redirected to login page when saving')
+
+            # Confirm OK from the response
+            if len(session.find_elements(by=By.CSS_SELECTOR, value='div.message > div.messageOk')) == 0:
+                errors = session.find_elements(by=By.CSS_SELECTOR, value='.validation-summary-errors li') + \
+                    session.find_elements(by=By.CSS_SELECTOR, value='.field-validation-error')
+                raise Exception('Save not confirmed: {}'.format(
+                    '; '.join(map(lambda error: error.text, errors)) or 'no OK message'))
 
-            # Wait for OK
-            self.web.find_element(by=By.CSS_SELECTOR, value='div.message > div.messageOk')
             print('Saved successfully!')
+            return 'updated'
         else:
             print('No changes!')
+            return 'unchanged'
+
+    @staticmethod
+    def key_field_value(key_field, value):
+        # Value of a key field as held by the edit form. Dumped strings are HTML as shown on the details page and
+        # are unescaped, booleans are true or false and given as such or as the strings true and false.
+        form_field, input_type = KEY_FIELDS.get(key_field)
+
+        if input_type == 'bool':
+            if isinstance(value, bool):
+                return value
+            if isinstance(value, str) and value.strip().lower() in ('true', 'false'):
+                return value.strip().lower() == 'true'
+
+            raise ValueError('Invalid value for {}: {!r}, expected true or false'.format(key_field, value))
+
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value)
+        if isinstance(value, str):
+            return html.unescape(value)
+
+        raise ValueError('Invalid value for {}: {!r}, expected a string'.format(key_field, value))
+
+    @staticmethod
+    def load_baseline_keys(customer_dump_file_path: Path) -> dict:
+        # Keys of a customer dump, by key id
+        baseline_keys = {}
+
+        for customer in aptus_writers.iter_dump_records(customer_dump_file_path):
+            for key in customer.get('keys', []):
+                baseline_keys[str(key.get('id'))] = key
+
+        print('Using {} keys from {} as baseline'.format(len(baseline_keys), customer_dump_file_path))
+
+        return baseline_keys
+
+    @staticmethod
+    def check_key_ids(key_datas: list):
+        # Every key given once, entries of the same key would be saved in no particular order by parallel workers
+        key_ids = set()
+        duplicate_key_ids = set()
 
-    def update_keys(self, key_datas: list):
         for key_data in key_datas:
-            self.update_key(key_data)
+            key_id = str(key_data.get('id'))
+            if key_id in key_ids:
+                duplicate_key_ids.add(key_id)
+            key_ids.add(key_id)
+
+        if len(duplicate_key_ids) > 0:
+            raise ValueError('Key ID\'s given more than once: {}'.format(', '.join(sorted(duplicate_key_ids))))
+
+    @staticmethod
+    def changed_keys(key_datas: list, baseline_keys: dict = None) -> list:
+        # Keys with values differing from the baseline, keys missing from the baseline are always included
+        if baseline_keys is None:
+            return key_datas
+
+        def has_changes(key_data):
+            baseline_key = baseline_keys.get(str(key_data.get('id')))
+
+            if baseline_key is None:
+                return True
+
+            try:
+                return any(map(lambda key_field: key_field in key_data and
+                               Aptus.key_field_value(key_field, key_data.get(key_field)) !=
+                               Aptus.key_field_value(key_field, baseline_key.get(key_field)), KEY_FIELDS))
+            except ValueError:
+                # Invalid values are left to the update to fail with
+                return True
+
+        return list(filter(has_changes, key_datas))
+
+    def update_keys(self, key_datas: list, baseline_keys: dict = None, workers=1, results_file_path: Path = None,
+                    max_attempts=KEY_UPDATE_ATTEMPTS, backoff=KEY_UPDATE_BACKOFF) -> list:
+        # Only keys changed since the baseline are opened, and verified against the live form before saving. Keys
+        # are updated by parallel workers, a key failing to load is retried after a backoff and does not stop the
+        # others.
+        self.check_key_ids(key_datas)
+
+        changed_key_datas = {str(key_data.get('id')): key_data for key_data in
+                             self.changed_keys(key_datas, baseline_keys)}
+
+        if baseline_keys is not None:
+            print('Unchanged since baseline: {}, to update: {}'.format(len(key_datas) - len(changed_key_datas),
+                                                                       len(changed_key_datas)))
+
+        pool = aptus_pool.WorkerPool(self.spawn, workers, max_attempts=max_attempts, backoff=backoff,
+                                     metrics=self.metrics, retry_errors=KEY_UPDATE_RETRY_ERRORS)
+        statuses = pool.run(list(changed_key_datas),
+                            lambda worker, key_id: worker.update_key(changed_key_datas.get(key_id)))
+
+        for key_id, error in pool.failures.items():
+            self.logger.error('Error updating key ID: {}, {}'.format(key_id, error))
+
+        def key_result(key_data):
+            key_id = str(key_data.get('id'))
+
+            if key_id not in changed_key_datas:
+                return {'id': key_data.get('id'), 'status': 'unchanged', 'reason': 'Unchanged since baseline'}
+            elif key_id in pool.failures:
+                return {'id': key_data.get('id'), 'status': 'failed', 'reason': pool.failures.get(key_id)}
+            else:
+                return {'id': key_data.get('id'), 'status': statuses.get(key_id), 'reason': None}
+
+        # Results in the order of the keys given
+        key_results = list(map(key_result, key_datas))
+
+        print('Updated: {}, unchanged: {}, failed: {}'.format(
+            *map(lambda status: len(list(filter(lambda result: result.get('status') == status, key_results))),
+                 ['updated', 'unchanged', 'failed'])))
+
+        if results_file_path is not None:
+            with aptus_writers.open_array_writer(results_file_path) as writer:
+                for result in key_results:
+                    writer.write(result)
+
+        return key_results
 
     def quit(self):
-        self.web.quit()
+        if self.driver is not None:
+            self.driver.quit()
+
+        if self.page_cache is not None:
+            self.page_cache.close()
+
+        if self.cookie_session is not None:
+            self.cookie_session.quit()
 
     @staticmethod
-    def convert_parse_string(element, input_type):
-        value_raw = element.get_attribute('innerHTML')
+    def convert_parse_string(cell, input_type):
+        value_raw = cell.get('html')
         value_trimmed = value_raw.strip()
 
         if input_type == 'string':
             return value_trimmed
         elif input_type == 'link':
-            href = element.find_element(by=By.CSS_SELECTOR, value='a').get_attribute('href')
+            href = cell.get('href')
+            if href is None:
+                raise ValueError('Expected a link in cell')
             return href
         elif input_type == 'bool':
             if value_trimmed == 'Ja':
@@ -535,79 +1618,134 @@ class Aptus:
     #
     #
 
+    @aptus_metrics.timed('dump_all_agera')
     def dump_all_agera(self, dump_dir: Path):
-        agera_dump_file_path = dump_dir.joinpath("agera_dump.json")
-
-        agera = {
-            'articles': [],
-            'ageras': self.dump_all_ageras(),
-            'templates': [],
-            'areas': [],
-            'article_files': self.dump_all_agera_article_files()
-        }
+        agera_ids, failed_ids = self.dump_all_ageras(dump_dir)
 
-        with agera_dump_file_path.open(mode='w', encoding='utf-8') as outfile:
-            json_string = json.dumps(agera, indent=2, ensure_ascii=False)
-            outfile.write(json_string)
+        # Articles shared by many ageras are dumped once
+        article_ids = set()
+        for agera_id in agera_ids:
+            agera_articles = self.checkpointed('agera', agera_id).get('articles')
+            article_ids.update(map(lambda article: article.get('id'), agera_articles))
+
+        entity_ids = {'articles': sorted(article_ids, key=int)}
+        entity_names = {}
 
-    def dump_all_ageras(self):
+        for part in ['templates', 'areas']:
+            entity_names[part] = self.read_list_names(*AGERA_ENTITIES.get(part))
+            entity_ids[part] = list(entity_names.get(part))
+
+        for part in AGERA_ENTITIES:
+            print('Agera {}: {}'.format(part, len(entity_ids.get(part))))
+            self.load_checkpoints(dump_dir, 'agera_' + part)
+            failed_ids += self.checkpoint_all('agera_' + part, entity_ids.get(part),
+                                              lambda session, entity_id: session.dump_agera_entity(part, entity_id))
+
+        # Ageras reference their template by id
+        template_ids = {name: template_id for template_id, name in entity_names.get('templates').items()}
+
+        article_files = self.dump_all_agera_article_files(dump_dir)
+
+        # Stream the checkpointed ageras and entities to the dump file
+        with aptus_writers.open_object_writer(self.dump_file_path(dump_dir, 'agera')) as writer:
+            self.write_agera_entities(writer, 'articles', entity_ids.get('articles'))
+
+            ageras_writer = writer.array('ageras')
+            for agera_id in agera_ids:
+                agera = self.checkpointed('agera', agera_id)
+                agera['ageraTemplateId'] = template_ids.get(agera.get('ageraTemplateName'))
+                ageras_writer.write(agera)
+            ageras_writer.close()
+
+            for part in ['templates', 'areas']:
+                self.write_agera_entities(writer, part, entity_ids.get(part), entity_names.get(part))
+
+            writer.write('article_files', article_files)
+
+        if len(failed_ids) > 0:
+            # Keep the checkpoints for resuming the failed ageras and entities
+            print('Agera failed: {}, resume the dump to retry them'.format(len(failed_ids)))
+        else:
+            self.finish_checkpoints('agera')
+            for part in AGERA_ENTITIES:
+                self.finish_checkpoints('agera_' + part)
+
+    def write_agera_entities(self, writer, part, entity_ids, entity_names=None):
+        entities_writer = writer.array(part)
+        for entity_id in entity_ids:
+            if not self.is_checkpointed('agera_' + part, entity_id):
+                # Failed, left out of the dump
+                continue
+
+            entity = {'id': entity_id}
+            if entity_names is not None:
+                entity['name'] = entity_names.get(entity_id)
+            entity.update(self.checkpointed('agera_' + part, entity_id))
+            entities_writer.write(entity)
+        entities_writer.close()
+
+    def checkpoint_all(self, part, entity_ids, dump) -> list:
+        # Dump and checkpoint the entities not checkpointed yet, with dump(session, entity_id). Different entities
+        # are dumped concurrently on their own sessions when there is more than one worker. Entities failing for good
+        # are recorded in the errors file and left out of the checkpoints, their id's are returned.
+        pending_entity_ids = list(filter(lambda entity_id: not self.is_checkpointed(part, entity_id), entity_ids))
+
+        if self.workers <= 1 or len(pending_entity_ids) <= 1:
+            for entity_id in pending_entity_ids:
+                self.checkpoint_isolated(part, entity_id, lambda checkpoint_id: dump(self, checkpoint_id))
+        else:
+            pool = aptus_pool.WorkerPool(self.spawn, self.workers, metrics=self.metrics)
+            pool.run(pending_entity_ids,
+                     lambda worker, entity_id: self.checkpoint_isolated(part, entity_id,
+                                                                        lambda checkpoint_id: dump(worker,
+                                                                                                   checkpoint_id),
+                                                                        worker))
+
+            # Entities whose worker crashed, recorded with the entities failing for good
+            for entity_id, error in sorted(pool.failures.items()):
+                self.logger.error('Error dumping {} ID: {}, {}'.format(part, entity_id, error))
+                print('Failed {} ID: {}'.format(part, entity_id))
+                self.error_log.record(part, entity_id, error, pool.attempts.get(entity_id, 0), None, None)
+
+        return list(filter(lambda entity_id: not self.is_checkpointed(part, entity_id), entity_ids))
+
+    def dump_all_ageras(self, dump_dir: Path):
         # Open url to agera index page
         self.open_path('Agera/AgeraIndex/')
 
         # Agera table
-        table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                            value='div.listTableDiv > table.listTable > tbody > tr')
-
-        onclick_attributes = list(map(lambda row: row.get_attribute('onclick'), table_rows))
-        agera_onclick_urls = list(
-            filter(lambda a: a is not None and '/Agera/AgeraDetails/' in a, onclick_attributes))
-        agera_ids = list(
-            map(lambda a: re.search(r"document\.location\.href=\'.+/Agera/AgeraDetails/(\d+)\'", a).group(1),
-                agera_onclick_urls))
+        agera_ids = self.parse_onclick_ids(self.read_tables('list').get('list'), 'Agera/AgeraDetails')
 
         print('Agera: {}'.format(len(agera_ids)))
 
-        agera = []
+        self.load_checkpoints(dump_dir, 'agera')
 
-        # Loop over agera id's
-        for agera_id in agera_ids:
-            agera.append(self.dump_agera(agera_id))
+        # Different ageras are fetched concurrently with more than one worker, always from their details pages since
+        # the list only shows their names
+        failed_agera_ids = self.checkpoint_all('agera', agera_ids,
+                                               lambda session, agera_id: session.dump_agera(agera_id))
 
-        return agera
+        # Ageras dumped and the ones failing for good
+        return list(filter(lambda agera_id: agera_id not in failed_agera_ids, agera_ids)), failed_agera_ids
 
+    @aptus_metrics.timed('dump_agera')
     def dump_agera(self, agera_id):
         # Open url directly to agera details page
         agera_details_path = 'Agera/AgeraDetails/{id}'.format(id=agera_id)
-        current_url = self.open_path(agera_details_path)
+        self.open_path(agera_details_path)
 
         print('Agera ID: {}'.format(agera_id))
 
-        # Articles table
-        articles_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                               value='div.listTableDiv > table.listTable > tbody > tr')
-
-        onclick_attributes = list(map(lambda row: row.get_attribute('onclick'), articles_rows))
-        agera_onclick_urls = list(
-            filter(lambda a: a is not None and '/Agera/ArticleDetails/' in a, onclick_attributes))
-        article_ids = list(
-            map(lambda a: re.search(r"document\.location\.href=\'.+/Agera/ArticleDetails/(\d+)\'", a).group(1),
-                agera_onclick_urls))
-
-        articles = []
+        tables = self.read_tables('list', 'details')
 
-        # Loop over article ids
-        for article_id in article_ids:
-            articles.append({
-                'id': article_id
-            })
+        # Articles table, the articles themselves are dumped once for all ageras
+        article_ids = self.parse_onclick_ids(tables.get('list'), AGERA_ENTITIES.get('articles')[1])
 
         # Details table
-        details_table_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                                    value='div.detailsTableDiv > table.detailsTable > tbody > tr')
+        details_table_rows = tables.get('details')
 
         if len(details_table_rows) != 4:
-            self.logger.error('Error agera, expected 4 rows in details table')
-            self._abort()
+            raise aptus_errors.DumpError('Error dumping agera, expected 4 rows in details table')
 
         return {
             'id': agera_id,
@@ -615,68 +1753,370 @@ class Aptus:
             'mac': self.dump_customer_details_row(details_table_rows[1], 'MAC', 'string'),
             'address': self.dump_customer_details_row(details_table_rows[2], 'Address', 'string'),
             'ageraTemplateName': self.dump_customer_details_row(details_table_rows[3], 'AgeraTemplateName', 'string'),
-            'articles': articles
+            'articles': list(map(lambda article_id: {'id': article_id}, article_ids))
         }
 
-    def dump_all_agera_article_files(self):
+    def read_list_names(self, index_path, details_path) -> dict:
+        # Names in the first column of a list page, by the id of the details page each row opens
+        self.open_path(index_path)
+
+        entity_names = {}
+
+        for row in self.read_tables('list').get('list'):
+            row_ids = self.parse_onclick_ids([row], details_path)
+
+            if len(row_ids) > 0:
+                entity_names[row_ids[0]] = self.convert_parse_string(row.get('cells')[0], 'string')
+
+        return entity_names
+
+    @aptus_metrics.timed('dump_agera_entity')
+    def dump_agera_entity(self, part, entity_id):
+        # Open url directly to the details page of the article, template or area
+        self.open_path('{path}/{id}'.format(path=AGERA_ENTITIES.get(part)[1], id=entity_id))
+
+        print('Agera {} ID: {}'.format(part, entity_id))
+
+        return self.parse_details_fields(self.read_tables('details').get('details'))
+
+    def parse_details_fields(self, details_table_rows) -> dict:
+        # Every row of a details table without a fixed layout, by label with a lower case first letter
+        fields = {}
+
+        for row in details_table_rows:
+            cells = row.get('cells')
+
+            if len(cells) != 2 or cells[0].get('label') is None:
+                raise aptus_errors.DumpError('Error dumping details row, expected a label and a value in tr')
+
+            label = cells[0].get('label')
+            fields[label[:1].lower() + label[1:]] = self.convert_parse_string(cells[1], 'string')
+
+        return fields
+
+    @aptus_metrics.timed('dump_all_agera_article_files')
+    def dump_all_agera_article_files(self, dump_dir: Path):
 
         # Open url directly to Agera ArticleFileIndex page
         self.open_path('Agera/ArticleFileIndex')
 
         # Article file table
-        article_file_rows = self.web.find_elements(by=By.CSS_SELECTOR,
-                                                   value='div.listTableDiv > table.listTable > tbody > tr')
+        article_file_rows = self.read_tables('list').get('list')
 
         # Remove table header
         article_file_rows.pop(0)
 
         article_files = []
+        article_file_urls = {}
 
-        # Loop over article file names
-        for article_file_row in article_file_rows:
-            columns = article_file_row.find_elements(by=By.CSS_SELECTOR, value='td')
+        # Loop over article file names, a row not as expected is recorded by its row number and left out
+        for row_number, article_file_row in enumerate(article_file_rows, start=1):
+            try:
+                article_file, url = self.parse_article_file_row(article_file_row)
+            except aptus_errors.DUMP_ERRORS as error:
+                self.logger.error('Error dumping article file row: {}, {}'.format(row_number, error))
+                print('Failed article file row: {}'.format(row_number))
+                self.error_log.record('article_files', 'row {}'.format(row_number), error, 1, self.web.current_url,
+                                      self.web.page_source)
+                continue
+
+            print('Article File ID: {}'.format(article_file.get('id')))
+            article_file_urls[article_file.get('id')] = url
+            article_files.append(article_file)
 
-            if len(columns) != 4:
-                self.logger.error('Error dumping article file, expected 4 columns in list table')
-                self._abort()
+        print('Article Files: {}'.format(len(article_files)))
 
-            url = self.convert_parse_string(columns[2], 'link')
+        if self.page_cache_mode == 'replay':
+            self.replay_article_files(article_files, article_file_urls)
+        elif self.download_concurrency > 0:
+            self.download_article_files(dump_dir, article_files, article_file_urls)
 
-            # Get article file id
-            article_file_id = re.search(r".+/Agera/ShowArticleFile/(\d+)", url).group(1)
+        return article_files
 
-            print('Article File ID: {}'.format(article_file_id))
+    def replay_article_files(self, article_files: list, article_file_urls: dict):
+        # Digest, size and validators of the files as recorded in the page cache. Files not downloaded when recording
+        # are left without them, as in the recorded dump.
+        missing = 0
 
-            article_files.append({
-                'id': article_file_id,
-                'name': self.convert_parse_string(columns[0], 'string'),
-                'being_used': self.convert_parse_string(columns[1], 'bool'),
-            })
+        for article_file in article_files:
+            metadata = self.page_cache.get_file(article_file_urls.get(article_file.get('id')))
 
-        print('Article Files: {}'.format(len(article_files)))
+            if metadata is None:
+                missing += 1
+            else:
+                article_file.update(metadata)
 
-        return article_files
+        print('Article files replayed: {}, not in page cache: {}'.format(len(article_files) - missing, missing))
+
+    def parse_article_file_row(self, article_file_row):
+        # Article file and its download url
+        columns = article_file_row.get('cells')
+
+        if len(columns) != 4:
+            raise aptus_errors.DumpError('Error dumping article file, expected 4 columns in list table')
+
+        url = self.convert_parse_string(columns[2], 'link')
+
+        # Get article file id
+        article_file_match = re.search(r".+/Agera/ShowArticleFile/(\d+)", url)
+
+        if article_file_match is None:
+            raise aptus_errors.DumpError('Error dumping article file, expected a link to the file')
+
+        return {
+            'id': article_file_match.group(1),
+            'name': self.convert_parse_string(columns[0], 'string'),
+            'being_used': self.convert_parse_string(columns[1], 'bool'),
+        }, url
+
+    def download_article_files(self, dump_dir: Path, article_files: list, article_file_urls: dict):
+        # Download the files into the file store shared by all dumps, at most download_concurrency at once, adding
+        # the digest, size and validators to the article files. Files unchanged since the previous dump are skipped.
+        store = aptus_files.FileStore(dump_dir.parent.joinpath(FILE_STORE_DIR_NAME))
+
+        previous_article_files = {}
+        previous_dump_file_path = self.previous_dump_file_path(dump_dir, 'agera')
+
+        if previous_dump_file_path is not None:
+            with previous_dump_file_path.open(mode='r', encoding='utf-8') as infile:
+                previous_article_files = {article_file.get('id'): article_file
+                                          for article_file in json.load(infile).get('article_files', [])}
+
+        session = self.http_session()
+        failures = {}
+
+        def download(article_file):
+            url = article_file_urls.get(article_file.get('id'))
+
+            try:
+                metadata = self.download_article_file(session, store, url,
+                                                      previous_article_files.get(article_file.get('id')))
+            except Exception as error:
+                failures[article_file.get('id')] = error
+                return
+
+            article_file.update(metadata)
+
+            if self.page_cache_mode == 'record':
+                # Replayed dumps take the file metadata from the page cache, nothing is downloaded
+                self.page_cache.put_file(url, metadata)
+
+        with ThreadPoolExecutor(self.download_concurrency, thread_name_prefix='aptus-download') as executor:
+            list(executor.map(download, article_files))
+
+        print('Article files downloaded: {}, unchanged: {}, already stored: {}'.format(
+            self.metrics.counter('files_downloaded'), self.metrics.counter('files_unchanged'),
+            self.metrics.counter('files_deduplicated')))
+
+        # Files failing are left without a digest and recorded in the errors file, the dump carries on
+        for article_file_id, error in sorted(failures.items()):
+            self.logger.error('Error downloading article file ID: {}, {}'.format(article_file_id, error))
+            print('Failed article file ID: {}'.format(article_file_id))
+            self.error_log.record('article_files', article_file_id, error, 1, article_file_urls.get(article_file_id),
+                                  None)
+
+    @aptus_metrics.timed('download_article_file')
+    def download_article_file(self, session: aptus_http.HttpBrowser, store: aptus_files.FileStore, url,
+                              previous_article_file: dict = None) -> dict:
+        # Digest, size and validators of the stored file, the previous ones if unchanged
+        previous = previous_article_file if previous_article_file is not None and \
+            store.contains(previous_article_file.get('sha256')) else None
+
+        headers = {}
+        if previous is not None and previous.get('etag') is not None:
+            headers['If-None-Match'] = previous.get('etag')
+        if previous is not None and previous.get('lastModified') is not None:
+            headers['If-Modified-Since'] = previous.get('lastModified')
+
+        self._throttle()
+        self.metrics.increment('round_trips')
+
+        with session.open_file(url, headers) as response:
+            validators = {
+                'size': int(response.headers.get('Content-Length')) if response.headers.get('Content-Length') else None,
+                'etag': response.headers.get('ETag'),
+                'lastModified': response.headers.get('Last-Modified')
+            }
+
+            unchanged = response.status == 304 or (
+                previous is not None and validators.get('size') == previous.get('size') and
+                (validators.get('etag') or validators.get('lastModified')) is not None and
+                validators.get('etag') == previous.get('etag') and
+                validators.get('lastModified') == previous.get('lastModified'))
+
+            if unchanged:
+                # Same file as the previous dump, not read at all
+                self.metrics.increment('files_unchanged')
+                return {name: previous.get(name) for name in ['sha256', 'size', 'etag', 'lastModified']}
+
+            if self.is_login_page(response.geturl()):
+                raise Exception('Redirected to login page')
+
+            digest, size, stored = store.store(response)
+
+        self.metrics.increment('files_downloaded')
+        self.metrics.increment('file_bytes', size)
+
+        if not stored:
+            # Same content as a file stored before
+            self.metrics.increment('files_deduplicated')
+
+        return {'sha256': digest, 'size': size, 'etag': validators.get('etag'),
+                'lastModified': validators.get('lastModified')}
 
     #
     #
     #
 
+    @aptus_metrics.timed('dump_all_bookings')
     def dump_all_bookings(self, dump_dir: Path):
-        agera_dump_file_path = dump_dir.joinpath("bookings_dump.json")
+        start, stop = self.bookings_range()
+        print('Bookings: {} - {}'.format(start, stop))
+
+        # Booking systems and their calendars
+        systems = self.read_list_names(BOOKING_SYSTEMS_PATH, BOOKING_SYSTEM_DETAILS_PATH)
+        calendars = []
+
+        for system_id, system_name in systems.items():
+            system_details_path = '{path}/{id}'.format(path=BOOKING_SYSTEM_DETAILS_PATH, id=system_id)
+
+            for calendar_id, calendar_name in self.read_list_names(system_details_path, BOOKING_CALENDAR_PATH).items():
+                calendars.append({'id': calendar_id, 'systemId': system_id, 'name': calendar_name})
+
+        print('Booking systems: {}, calendars: {}'.format(len(systems), len(calendars)))
+
+        # Bookings before fetch_start are taken from the previous dump
+        fetch_start, previous_bookings = self.previous_bookings(dump_dir, start, stop)
+
+        # Every calendar is fetched in windows of dates, different windows concurrently with more than one worker
+        windows = {}
+        for calendar in calendars:
+            for window_start, window_stop in self.booking_windows(fetch_start, stop, self.booking_window_days):
+                window_id = '{}/{}'.format(calendar.get('id'), window_start.isoformat())
+                windows[window_id] = (calendar.get('id'), window_start, window_stop)
+
+        print('Booking windows: {}'.format(len(windows)))
+
+        self.load_checkpoints(dump_dir, 'bookings')
+        failed_window_ids = self.checkpoint_all('bookings', list(windows),
+                                                lambda session, window_id: session.dump_booking_window(
+                                                    *windows.get(window_id)))
+
+        # Stream the previous and checkpointed bookings to the dump file, by calendar and date
+        with aptus_writers.open_object_writer(self.dump_file_path(dump_dir, 'bookings')) as writer:
+            writer.write('start', start.isoformat())
+            writer.write('stop', stop.isoformat())
+            writer.write('systems', list(map(lambda system_id: {'id': system_id, 'name': systems.get(system_id)},
+                                             systems)))
+            writer.write('calendars', calendars)
+
+            bookings_writer = writer.array('bookings')
+            for calendar in calendars:
+                for booking in previous_bookings.get(calendar.get('id'), []):
+                    bookings_writer.write(booking)
+
+                for window_id, window in windows.items():
+                    if window[0] == calendar.get('id') and window_id not in failed_window_ids:
+                        for booking in self.checkpointed('bookings', window_id):
+                            bookings_writer.write(booking)
+            bookings_writer.close()
+
+        if len(failed_window_ids) > 0:
+            # Keep the checkpoints for resuming the failed windows
+            print('Booking windows failed: {}, resume the dump to retry them'.format(len(failed_window_ids)))
+        else:
+            self.finish_checkpoints('bookings')
 
-        # Get system id's
-        # For each system id
-        #   Get bookingscalendar id's
-        #       For each bookingcalendar id
-        #           Dump the bookingcalendar for a specified time period (start-stop date)
+    def bookings_range(self):
+        today = date.today()
+        start = self.bookings_start if self.bookings_start is not None else today - timedelta(days=BOOKINGS_DAYS_BACK)
+        stop = self.bookings_stop if self.bookings_stop is not None else today + timedelta(days=BOOKINGS_DAYS_AHEAD)
 
-        bookings = {
-            'bookings': []
-        }
+        if stop < start:
+            raise ValueError('Bookings stop date {} is before start date {}'.format(stop, start))
 
-        with agera_dump_file_path.open(mode='w', encoding='utf-8') as outfile:
-            json_string = json.dumps(bookings, indent=2, ensure_ascii=False)
-            outfile.write(json_string)
+        return start, stop
+
+    @staticmethod
+    def booking_windows(start: date, stop: date, window_days) -> list:
+        # Consecutive (start, stop) date ranges of at most window_days days, covering start to stop inclusive
+        windows = []
+        window_start = start
+
+        while window_start <= stop:
+            window_stop = min(window_start + timedelta(days=window_days - 1), stop)
+            windows.append((window_start, window_stop))
+            window_start = window_stop + timedelta(days=1)
+
+        return windows
+
+    def previous_bookings(self, dump_dir: Path, start: date, stop: date):
+        # First date to fetch, and the bookings before it from the previous dump by calendar id. Everything is
+        # fetched when not dumping incrementally, or when the previous dump does not cover the dates up to since.
+        if self.bookings_since is None or self.bookings_since <= start:
+            return start, {}
+
+        fetch_start = min(self.bookings_since, stop + timedelta(days=1))
+
+        previous_dump_file_path = self.previous_dump_file_path(dump_dir, 'bookings')
+
+        if previous_dump_file_path is None:
+            print('No previous bookings dump, dumping all bookings')
+            return start, {}
+
+        with previous_dump_file_path.open(mode='r', encoding='utf-8') as infile:
+            previous_dump = json.load(infile)
+
+        previous_start = date.fromisoformat(previous_dump.get('start'))
+        previous_stop = date.fromisoformat(previous_dump.get('stop'))
+
+        if previous_start > start or previous_stop < fetch_start - timedelta(days=1):
+            print('Previous bookings dump {} - {} does not cover {} - {}, dumping all bookings'.format(
+                previous_start, previous_stop, start, fetch_start - timedelta(days=1)))
+            return start, {}
+
+        print('Bookings before {} from {}'.format(fetch_start, previous_dump_file_path))
+
+        previous_bookings = {}
+        for booking in previous_dump.get('bookings'):
+            if start <= date.fromisoformat(booking.get('date')) < fetch_start:
+                previous_bookings.setdefault(booking.get('calendarId'), []).append(booking)
+
+        return fetch_start, previous_bookings
+
+    @aptus_metrics.timed('dump_booking_window')
+    def dump_booking_window(self, calendar_id, start: date, stop: date):
+        # Open url directly to the bookings of the calendar in the window
+        self.open_path('{path}/{id}?{query}'.format(path=BOOKING_CALENDAR_PATH, id=calendar_id,
+                                                    query=urllib.parse.urlencode({'from': start.isoformat(),
+                                                                                  'to': stop.isoformat()})))
+
+        print('Booking calendar ID: {}, {} - {}'.format(calendar_id, start, stop))
+
+        bookings = []
+
+        for row in self.read_tables('list').get('list'):
+            cells = row.get('cells')
+
+            if len(cells) == 0:
+                # Table header
+                continue
+
+            if len(cells) != 3:
+                raise aptus_errors.DumpError('Error dumping bookings, expected 3 columns in list table')
+
+            # Customer linked to its details page, no link if booked by the administration
+            customer_link = cells[2].get('href')
+            customer_match = re.search(r"/Customer/Details/(\d+)", customer_link) if customer_link is not None else None
+
+            bookings.append({
+                'calendarId': calendar_id,
+                'date': self.convert_parse_string(cells[0], 'string'),
+                'pass': self.convert_parse_string(cells[1], 'string'),
+                'customerId': customer_match.group(1) if customer_match is not None else None
+            })
+
+        return bookings
 
     #
     #
@@ -702,11 +2142,36 @@ class Aptus:
 
         return dump_dir_path
 
-    def dump_all(self, parts_to_dump):
+    def dump_all(self, parts_to_dump, resume_dump_dir: Path = None):
         print('Selected to dump: ', parts_to_dump)
-        dump_dir = self.create_dump_dir()
+
+        if resume_dump_dir is None:
+            dump_dir = self.create_dump_dir()
+        elif resume_dump_dir.is_dir():
+            print('Resuming dump: {}'.format(resume_dump_dir))
+            dump_dir = resume_dump_dir
+        else:
+            raise Exception('Dump directory to resume does not exist')
+
+        if self.page_cache_mode == 'replay':
+            # Not a dump of the current state, kept out of the previous dumps later dumps build on
+            with dump_dir.joinpath(REPLAY_MARKER_FILE_NAME).open(mode='w', encoding='utf-8') as outfile:
+                outfile.write(str(self.page_cache_file) + '\n')
+
+        self.journal = aptus_journal.DumpJournal(dump_dir)
+        self.error_log.open(dump_dir.joinpath(ERRORS_FILE_NAME))
+
+        # Fingerprints of a resumed dump are kept, entities checkpointed before are not listed again
+        self.list_fingerprints.load(dump_dir.joinpath(FINGERPRINTS_FILE_NAME))
+
+        if self.incremental:
+            self.load_previous_details(dump_dir)
+
         for part in parts_to_dump:
-            if part == 'agera':
+            if resume_dump_dir is not None and \
+                    self.journal.is_part_finished(part, self.dump_file_path(dump_dir, part)):
+                print('Already dumped: {}'.format(part))
+            elif part == 'agera':
                 self.dump_all_agera(dump_dir)
             elif part == 'authorities':
                 self.dump_all_authorities(dump_dir)
@@ -714,4 +2179,84 @@ class Aptus:
                 self.dump_all_customers(dump_dir)
             elif part == 'bookings':
                 self.dump_all_bookings(dump_dir)
+
+        self.print_wait_report()
+        self.print_session_report()
+        self.print_metrics_report()
+        self.print_error_report(dump_dir)
+
+        if self.page_cache is not None:
+            print('Page cache: {} pages in {}'.format(self.page_cache.count(), self.page_cache_file))
+
+        self.write_metrics(dump_dir.joinpath('metrics'))
+
+        if self.snapshot_dumps:
+            self.snapshot_dump(dump_dir)
+
         print('Dump complete!')
+
+    def print_error_report(self, dump_dir: Path):
+        if self.error_log.count() == 0:
+            print('No entities failed')
+            return
+
+        failed_parts = map(lambda part: '{} {}'.format(len(self.error_log.failed_ids(part)), part),
+                           sorted(self.error_log.failures))
+
+        print('Failed after {} attempts: {}, written to: {}'.format(self.dump_attempts, ', '.join(failed_parts),
+                                                                    dump_dir.joinpath(ERRORS_FILE_NAME)))
+
+    def too_many_failures(self) -> bool:
+        return self.error_log.count() > self.max_dump_failures
+
+    def load_previous_details(self, dump_dir: Path):
+        # Fingerprints of the latest previous dump having them, and the details of its keys and contracts to reuse
+        previous_dump_dirs = list(filter(lambda path: path.joinpath(FINGERPRINTS_FILE_NAME).is_file(),
+                                         self.previous_dump_dirs(dump_dir)))
+
+        if len(previous_dump_dirs) == 0:
+            print('No previous dump with list fingerprints, dumping all details')
+            return
+
+        previous_dump_dir = previous_dump_dirs[-1]
+        previous_details = {'keys': {}, 'contracts': {}}
+
+        def previous_records(part):
+            for dump_file_path in [previous_dump_dir.joinpath(DUMP_FILE_NAMES.get(part)),
+                                   previous_dump_dir.joinpath(DUMP_FILE_NAMES.get(part)).with_suffix('.jsonl')]:
+                if dump_file_path.is_file():
+                    return aptus_writers.iter_dump_records(dump_file_path)
+
+            return []
+
+        for customer in previous_records('customers'):
+            for kind in ['keys', 'contracts']:
+                for details in customer.get(kind) or []:
+                    previous_details.get(kind)[details.get('id')] = details
+
+        self.list_fingerprints.load_previous(previous_dump_dir.joinpath(FINGERPRINTS_FILE_NAME), previous_details)
+
+        print('Reusing details of unchanged list rows from {}: {}'.format(
+            previous_dump_dir.name, ', '.join(map(lambda kind: '{} {}'.format(len(previous_details.get(kind)), kind),
+                                                  previous_details))))
+
+    @staticmethod
+    def snapshot_dump(dump_dir: Path):
+        # Store the dump as a snapshot, and drop the full files of earlier snapshotted dumps superseded by the files
+        # of this dump. The latest dump of every part keeps its files, they are read by the next dump.
+        store = aptus_snapshots.SnapshotStore(dump_dir.parent.joinpath(SNAPSHOT_STORE_DIR_NAME))
+        manifest_path = store.store(dump_dir)
+
+        print('Snapshot {}: {} records stored, {} unchanged'.format(manifest_path, store.stored_objects,
+                                                                    store.reused_objects))
+
+        # Dumped as JSON or JSON Lines, either supersedes both
+        superseded_stems = set(map(lambda file_name: Path(file_name).stem,
+                                   filter(lambda file_name: dump_dir.joinpath(file_name).is_file(),
+                                          aptus_snapshots.SNAPSHOT_FILE_NAMES)))
+
+        for previous_dump_dir in sorted(filter(lambda path: path.is_dir() and path.name < dump_dir.name,
+                                               dump_dir.parent.iterdir())):
+            if store.contains(previous_dump_dir.name):
+                for pruned_file_path in store.prune(previous_dump_dir, superseded_stems):
+                    print('Pruned {}'.format(pruned_file_path))
@@ -0,0 +1,105 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import aptus_errors
+import aptus_http
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    final_url TEXT NOT NULL,
+    html BLOB NOT NULL,
+    fetched REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_fetched ON pages (fetched);
+CREATE TABLE IF NOT EXISTS files (
+    url TEXT PRIMARY KEY,
+    metadata TEXT NOT NULL,
+    fetched REAL NOT NULL
+);
+'''
+
+
+class PageCache:
+    # Pages loaded by a dump, the URL opened, the URL after redirects and the compressed HTML, in a SQLite file,
+    # and the digest, size and validators of the files downloaded. A page loaded again replaces the earlier one,
+    # pages and files older than the TTL are dropped when the cache is opened. Shared by the threads of a session.
+
+    def __init__(self, cache_file_path: Path, ttl=None):
+        self.cache_file_path = cache_file_path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+
+        cache_file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(cache_file_path, check_same_thread=False, isolation_level=None)
+
+        with self.lock:
+            self.connection.execute('PRAGMA journal_mode = WAL')
+            self.connection.execute('PRAGMA synchronous = NORMAL')
+            self.connection.executescript(SCHEMA)
+
+            if ttl is not None:
+                self.connection.execute('DELETE FROM pages WHERE fetched < ?', (time.time() - ttl,))
+                self.connection.execute('DELETE FROM files WHERE fetched < ?', (time.time() - ttl,))
+
+    def put(self, url, final_url, html):
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)',
+                                    (url, final_url, zlib.compress(html.encode('utf-8')), time.time()))
+
+    def get(self, url):
+        # URL after redirects and HTML of a cached page, None if not cached
+        with self.lock:
+            row = self.connection.execute('SELECT final_url, html FROM pages WHERE url = ?', (url,)).fetchone()
+
+        if row is None:
+            return None
+
+        return row[0], zlib.decompress(row[1]).decode('utf-8')
+
+    def put_file(self, url, metadata: dict):
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?)',
+                                    (url, json.dumps(metadata), time.time()))
+
+    def get_file(self, url):
+        # Metadata of a downloaded file, None if not cached
+        with self.lock:
+            row = self.connection.execute('SELECT metadata FROM files WHERE url = ?', (url,)).fetchone()
+
+        return json.loads(row[0]) if row is not None else None
+
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute('SELECT count(*) FROM pages').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class ReplayBrowser(aptus_http.HttpBrowser):
+    # Browserless session loading pages from a page cache instead of the network, for parsing a recorded dump
+    # again. A page not in the cache fails like a page not as expected.
+
+    def __init__(self, page_cache: PageCache, timeout=30):
+        super().__init__(timeout)
+        self.page_cache = page_cache
+
+    def new_page(self):
+        return ReplayBrowser(self.page_cache, self.timeout)
+
+    def fetch(self, url, data=None):
+        if data is not None:
+            raise aptus_errors.DumpError('Can not post to {} when replaying pages'.format(url))
+
+        page = self.page_cache.get(url)
+
+        if page is None:
+            raise aptus_errors.DumpError('Page not in page cache: {}'.format(url))
+
+        return page
@@ -0,0 +1,219 @@
+import hashlib
+import json
+from collections import Counter
+from pathlib import Path
+
+import aptus_writers
+
+# Entities compared within a record, by field: the entity name, the id field of the items (None for items without
+# an id, compared by content) and the entities within an item
+CUSTOMER_ENTITIES = {
+    'keys': ('key', 'id', {'permissions': ('permission', None, {})}),
+    'contracts': ('contract', 'id', {}),
+    'entryPhone': ('entryPhone', 'id', {'entryPhoneNames': ('entryPhoneName', None, {})}),
+    'notes': ('note', None, {})
+}
+AUTHORITY_ENTITIES = {
+    'timezones': ('timezone', None, {})
+}
+AGERA_ENTITIES = {
+    'articles': ('article', 'id', {}),
+    'ageras': ('agera', 'id', {'articles': ('ageraArticle', 'id', {})}),
+    'templates': ('ageraTemplate', 'id', {}),
+    'areas': ('ageraArea', 'id', {}),
+    'article_files': ('articleFile', 'id', {})
+}
+
+
+def _digest(record) -> str:
+    return hashlib.sha256(json.dumps(record, ensure_ascii=False, sort_keys=True,
+                                     separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def _items(value) -> list:
+    # Items of a list field, a single object field has one item or none
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+
+    return [value]
+
+
+def _in_id_order(records):
+    # Records checked to be in increasing id order, as merging requires
+    previous_id = None
+
+    for record in records:
+        if previous_id is not None and record.get('id') <= previous_id:
+            raise ValueError('Records not in ID order at ID {}'.format(record.get('id')))
+
+        previous_id = record.get('id')
+        yield record
+
+
+class DumpSource:
+    # Records of the dump files of a dump directory, or of the same dump in the snapshot store once its files are
+    # pruned
+
+    def __init__(self, dump_dir: Path, snapshot_store=None):
+        self.dump_dir = dump_dir
+        self.snapshot_store = snapshot_store
+
+    def _snapshot(self) -> bool:
+        return self.snapshot_store is not None and self.snapshot_store.contains(self.dump_dir.name)
+
+    def exists(self) -> bool:
+        return self.dump_dir.is_dir() or self._snapshot()
+
+    def records(self, dump_file_name):
+        # Records of an array dump file in file order, None if the dump does not have it
+        for dump_file_path in [self.dump_dir.joinpath(dump_file_name),
+                               self.dump_dir.joinpath(dump_file_name).with_suffix('.jsonl')]:
+            if dump_file_path.is_file():
+                return aptus_writers.iter_dump_records(dump_file_path)
+
+        if self._snapshot():
+            return self.snapshot_store.records(self.dump_dir.name, dump_file_name)
+
+        return None
+
+    def object(self, dump_file_name):
+        # Object of an object dump file, None if the dump does not have it
+        dump_file_path = self.dump_dir.joinpath(dump_file_name)
+
+        if dump_file_path.is_file():
+            with dump_file_path.open(mode='r', encoding='utf-8') as infile:
+                return json.load(infile)
+
+        if self._snapshot():
+            return self.snapshot_store.object(self.dump_dir.name, dump_file_name)
+
+        return None
+
+
+class DumpDiff:
+    # Changes between two dumps, keyed by entity id. Records are compared by hash first, only records that differ
+    # are compared field by field. Customers are merged in id order from the two dumps, one customer at a time.
+
+    def __init__(self, report):
+        # Called with every change
+        self.report = report
+        self.counts = {}
+
+    def _change(self, change, entity, record_id, parents: dict, **details):
+        self.counts[(entity, change)] = self.counts.get((entity, change), 0) + 1
+
+        entry = {'change': change, 'entity': entity}
+        if record_id is not None:
+            entry['id'] = record_id
+        if len(parents) > 0:
+            entry['parents'] = parents
+        entry.update(details)
+
+        self.report(entry)
+
+    def diff_items(self, entity, id_field, entities: dict, old_items: list, new_items: list, parents: dict):
+        if id_field is None:
+            # Items without an id are added or removed, never changed
+            new_digests = Counter(map(_digest, new_items))
+            for item in old_items:
+                if new_digests[_digest(item)] > 0:
+                    new_digests[_digest(item)] -= 1
+                else:
+                    self._change('removed', entity, None, parents, record=item)
+
+            old_digests = Counter(map(_digest, old_items))
+            for item in new_items:
+                if old_digests[_digest(item)] > 0:
+                    old_digests[_digest(item)] -= 1
+                else:
+                    self._change('added', entity, None, parents, record=item)
+
+            return
+
+        old_by_id = {item.get(id_field): item for item in old_items}
+        new_ids = set(map(lambda item: item.get(id_field), new_items))
+
+        for old_item in old_items:
+            if old_item.get(id_field) not in new_ids:
+                self._change('removed', entity, old_item.get(id_field), parents, record=old_item)
+
+        for new_item in new_items:
+            self.diff_record(entity, id_field, entities, old_by_id.get(new_item.get(id_field)), new_item, parents)
+
+    def diff_record(self, entity, id_field, entities: dict, old: dict, new: dict, parents: dict):
+        if old is None:
+            return self._change('added', entity, new.get(id_field), parents, record=new)
+        if new is None:
+            return self._change('removed', entity, old.get(id_field), parents, record=old)
+
+        if _digest(old) == _digest(new):
+            return
+
+        # Sections not dumped in either dump are not compared
+        omitted = set(old.get('omitted', [])) | set(new.get('omitted', []))
+        fields = {}
+        item_parents = dict(parents, **{entity: new.get(id_field)})
+
+        for field in list(new) + list(filter(lambda name: name not in new, old)):
+            if field in omitted or field == 'omitted':
+                continue
+
+            if field in entities:
+                item_entity, item_id_field, item_entities = entities.get(field)
+                self.diff_items(item_entity, item_id_field, item_entities, _items(old.get(field)),
+                                _items(new.get(field)), item_parents)
+            elif old.get(field) != new.get(field):
+                fields[field] = [old.get(field), new.get(field)]
+
+        if len(fields) > 0:
+            self._change('changed', entity, new.get(id_field), parents, fields=fields)
+
+    def diff_customers(self, old_customers, new_customers):
+        # Merge the customers of the two dumps, both in customer id order
+        old_customers = _in_id_order(old_customers)
+        new_customers = _in_id_order(new_customers)
+        old_customer = next(old_customers, None)
+        new_customer = next(new_customers, None)
+
+        while old_customer is not None or new_customer is not None:
+            if new_customer is None or (old_customer is not None and old_customer.get('id') < new_customer.get('id')):
+                self.diff_record('customer', 'id', CUSTOMER_ENTITIES, old_customer, None, {})
+                old_customer = next(old_customers, None)
+            elif old_customer is None or new_customer.get('id') < old_customer.get('id'):
+                self.diff_record('customer', 'id', CUSTOMER_ENTITIES, None, new_customer, {})
+                new_customer = next(new_customers, None)
+            else:
+                self.diff_record('customer', 'id', CUSTOMER_ENTITIES, old_customer, new_customer, {})
+                old_customer = next(old_customers, None)
+                new_customer = next(new_customers, None)
+
+    def diff_authorities(self, old_authorities, new_authorities):
+        # Few authorities, compared by id in memory
+        self.diff_items('authority', 'id', AUTHORITY_ENTITIES, list(old_authorities), list(new_authorities), {})
+
+    def diff_agera(self, old_agera: dict, new_agera: dict):
+        for field, (entity, id_field, entities) in AGERA_ENTITIES.items():
+            self.diff_items(entity, id_field, entities, old_agera.get(field, []), new_agera.get(field, []), {})
+
+    def diff(self, old_source: DumpSource, new_source: DumpSource, dump_file_names: dict) -> list:
+        # Compare the parts in both dumps, returns the parts compared
+        compared_parts = []
+
+        for part, diff_part in [('customers', self.diff_customers), ('authorities', self.diff_authorities)]:
+            old_records = old_source.records(dump_file_names.get(part))
+            new_records = new_source.records(dump_file_names.get(part))
+
+            if old_records is not None and new_records is not None:
+                diff_part(iter(old_records), iter(new_records))
+                compared_parts.append(part)
+
+        old_agera = old_source.object(dump_file_names.get('agera'))
+        new_agera = new_source.object(dump_file_names.get('agera'))
+
+        if old_agera is not None and new_agera is not None:
+            self.diff_agera(old_agera, new_agera)
+            compared_parts.append('agera')
+
+        return compared_parts
@@ -0,0 +1,88 @@
+from selenium import webdriver
+
+import aptus_http
+
+# Driver profiles, default is a plain headless browser, lean only loads what is needed to read the page HTML
+PROFILES = ['default', 'lean']
+
+# Document ready states at which a page is read, lean pages are read as soon as the HTML is parsed
+READY_STATES = {
+    'default': ['complete'],
+    'lean': ['interactive', 'complete']
+}
+
+# Resources never loaded by the lean profile, only the server rendered HTML is read
+BLOCKED_URLS = ['*.css', '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.woff', '*.woff2', '*.ttf',
+                '*.otf', '*.eot']
+
+
+def _chrome(profile):
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+
+    if profile == 'lean':
+        options.page_load_strategy = 'eager'
+        options.add_argument('--disable-extensions')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        # Profile and cache kept in memory
+        options.add_argument('--incognito')
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+    driver = webdriver.Chrome(options=options)
+
+    if profile == 'lean':
+        # Stylesheets and fonts can only be blocked through the DevTools protocol
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+
+    return driver
+
+
+def _firefox(profile):
+    options = webdriver.FirefoxOptions()
+    options.add_argument('-headless')
+
+    if profile == 'lean':
+        options.page_load_strategy = 'eager'
+        # No images, stylesheets or downloaded fonts
+        options.set_preference('permissions.default.image', 2)
+        options.set_preference('permissions.default.stylesheet', 2)
+        options.set_preference('gfx.downloadable_fonts.enabled', False)
+        options.set_preference('browser.display.use_document_fonts', 0)
+        # No extensions or GPU
+        options.set_preference('extensions.enabledScopes', 0)
+        options.set_preference('layers.acceleration.disabled', True)
+        # Cache in memory only
+        options.set_preference('browser.cache.disk.enable', False)
+        options.set_preference('browser.cache.memory.enable', True)
+
+    return webdriver.Firefox(options=options)
+
+
+def _safari(profile):
+    options = webdriver.SafariOptions()
+
+    if profile == 'lean':
+        # Safari can not block content or change its cache, only read pages earlier
+        options.page_load_strategy = 'eager'
+
+    return webdriver.Safari(options=options)
+
+
+def create_driver(browser, profile='default'):
+    # Browser driver, or the browserless HTTP session, set up for the profile
+    if profile not in PROFILES:
+        raise ValueError('Unknown browser profile: {}, expected one of {}'.format(profile, ', '.join(PROFILES)))
+
+    if browser == 'chrome':
+        return _chrome(profile)
+    elif browser == 'safari':
+        return _safari(profile)
+    elif browser == 'firefox':
+        return _firefox(profile)
+    elif browser == 'http':
+        # No browser, fetch and parse the server rendered pages directly
+        return aptus_http.HttpBrowser()
+
+    raise ValueError('Unknown browser: {}'.format(browser))
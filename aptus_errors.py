@@ -0,0 +1,58 @@
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from selenium.common.exceptions import WebDriverException
+
+
+class DumpError(Exception):
+    # A page not looking as expected when dumping an entity, with the page if it is not the current page of the
+    # session
+
+    def __init__(self, message, page=None):
+        super().__init__(message)
+        self.page = page
+
+
+# Errors an entity is retried on instead of stopping the dump: pages not as expected, browser and network errors
+DUMP_ERRORS = (DumpError, ValueError, WebDriverException, OSError)
+
+
+class ErrorLog:
+    # Entities still failing after their retries, appended to a JSON Lines errors file in the dump directory with a
+    # snapshot of the page they failed on. Shared by all sessions of a dump.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.errors_file_path = None
+        self.failures = {}
+
+    def open(self, errors_file_path: Path):
+        # Failures of a resumed dump are retried, earlier entries are kept in the file
+        self.errors_file_path = errors_file_path
+        self.failures = {}
+
+    def record(self, part, entity_id, error, attempts, url, page_source):
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'part': part,
+            'id': entity_id,
+            'error': '{}: {}'.format(type(error).__name__, error) if isinstance(error, Exception) else error,
+            'attempts': attempts,
+            'url': url,
+            'page': page_source
+        }
+
+        with self.lock:
+            self.failures.setdefault(part, []).append(entity_id)
+
+            if self.errors_file_path is not None:
+                with self.errors_file_path.open(mode='a', encoding='utf-8') as outfile:
+                    outfile.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def failed_ids(self, part) -> list:
+        return list(self.failures.get(part, []))
+
+    def count(self) -> int:
+        return sum(map(len, self.failures.values()))
@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import hashlib
+import html
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Path Aptus is served under, like a real Aptus portal
+PREFIX = '/AptusPortal'
+
+USERNAME = 'aptus'
+PASSWORD = 'aptus'
+
+# Customers have every CUSTOMER_ID_STEP id, leaving gaps like deleted customers do
+FIRST_CUSTOMER_ID = 3
+CUSTOMER_ID_STEP = 3
+
+# Customers on each page of the customer list
+CUSTOMER_PAGE_SIZE = 25
+
+# Static resources of every page, loaded by browsers but not needed to read the page
+STATIC_RESOURCES = {
+    '/Content/site.css': ('text/css', "@font-face { font-family: Aptus; src: url('aptus.woff2'); }\n"
+                                      "body { font-family: Aptus; background: url('background.png'); }\n"),
+    '/Content/aptus.woff2': ('font/woff2', 'wOF2' + ' ' * 4096),
+    '/Content/background.png': ('image/png', 'PNG' + ' ' * 8192),
+    '/Content/logo.png': ('image/png', 'PNG' + ' ' * 8192)
+}
+
+ANTI_FORGERY_TOKEN = 'fake-anti-forgery-token'
+AUTH_COOKIE = 'aptus_fake_auth'
+
+
+def _escape(value):
+    return html.escape(str(value), quote=True)
+
+
+def _value(value):
+    # Booleans are shown as Ja and Nej by Aptus
+    if value is True:
+        return 'Ja'
+    elif value is False:
+        return 'Nej'
+
+    return _escape(value)
+
+
+class FakeAptusData:
+    # Synthetic customers with keys, contracts, entry phones and notes, plus authorities and agera. The same size
+    # and seed always gives the same data.
+
+    def __init__(self, customers=100, seed=1):
+        rnd = random.Random(seed)
+
+        self.customers = {}
+        self.keys = {}
+        self.contracts = {}
+        self.entry_phones = {}
+
+        key_id = 100
+        contract_id = 500
+        entry_phone_id = 900
+
+        for number in range(customers):
+            customer_id = FIRST_CUSTOMER_ID + number * CUSTOMER_ID_STEP
+
+            key_ids = []
+            for _ in range(rnd.randint(0, 3)):
+                key_id += 1
+                self.keys[key_id] = {
+                    'Name': 'Bricka {} & co'.format(key_id),
+                    'CardLabel': 'L{}'.format(key_id),
+                    'Card': str(rnd.randint(1000, 9999)),
+                    'Code': str(rnd.randint(1000, 9999)),
+                    'Start': '2020-01-01',
+                    'Stop': '',
+                    'CreatedTime': '2020-01-01 10:00',
+                    'Blocked': rnd.random() < 0.1,
+                    'LimitedLogging': False,
+                    'Fritextf_lt_1': 'Åke <{}>'.format(key_id),
+                    'permissions': list(map(lambda port: ('Port {}'.format(port), '', '', False),
+                                            range(rnd.randint(0, 4))))
+                }
+                key_ids.append(key_id)
+
+            contract_ids = []
+            for _ in range(rnd.randint(0, 2)):
+                contract_id += 1
+                self.contracts[contract_id] = {
+                    'StartDate': '2020-01-01',
+                    'EndDate': '',
+                    'ObjectName': 'Objekt {}'.format(contract_id),
+                    'EntryPhoneCallCode': str(rnd.randint(10, 99)),
+                    'Floor': '1',
+                    'FloorText': 'ett',
+                    'ApartmentNo': str(1100 + number),
+                    'AddressName': 'Gatan {}'.format(number + 1)
+                }
+                contract_ids.append(contract_id)
+
+            customer_entry_phone_id = None
+            if rnd.random() < 0.5:
+                entry_phone_id += 1
+                customer_entry_phone_id = entry_phone_id
+                self.entry_phones[entry_phone_id] = {
+                    'ObjectName': 'Objekt',
+                    'PhoneNumber': '070{:07d}'.format(number),
+                    'FirstName1': 'Anna',
+                    'Surname1': 'Berg',
+                    'FirstName2': '',
+                    'Surname2': '',
+                    'ShowInEntryPhoneDisplay': True,
+                    'ApartmentPhonePresent': False,
+                    'names': [('Anna', 'Berg', '070{:07d}'.format(number), '12', True)]
+                }
+
+            self.customers[customer_id] = {
+                'Name': 'Kund {:05d}'.format(customer_id),
+                'Fritextf_lt_1': '',
+                'Fritextf_lt_2': 'Lgh\xa0{}'.format(1100 + number),
+                'Fritextf_lt_3': '',
+                'Fritextf_lt_4': '',
+                'IsCompany': rnd.random() < 0.1,
+                'keys': key_ids,
+                'contracts': contract_ids,
+                'entry_phone': customer_entry_phone_id,
+                'notes': [('Notering', '2020-01-01', 'admin')] * rnd.randint(0, 2)
+            }
+
+        self.authorities = {authority_id: 'Behörighet {}'.format(authority_id) for authority_id in range(1, 6)}
+        # Ageras showing overlapping articles, every article is shown on several ageras
+        self.articles = {article_id: 'Artikel {}'.format(article_id) for article_id in range(1, 5)}
+        self.ageras = {agera_id: [(agera_id - 1) % 4 + 1, agera_id % 4 + 1] for agera_id in range(1, 7)}
+        self.agera_templates = {1: 'Standard', 2: 'Entré'}
+        self.agera_areas = {1: 'Hus A', 2: 'Hus B'}
+        self.article_files = ['fil{}.png'.format(number) for number in range(3)]
+        # The same media uploaded twice under different names
+        self.article_file_contents = list(map(lambda number: b'PNG' + bytes([number % 2]) * 100000, range(3)))
+
+        # Booking calendars by booking system, with bookings on some days derived from the date
+        self.booking_systems = {1: 'Tvättstuga', 2: 'Bastu'}
+        self.booking_calendars = {1: (1, 'Tvättstuga 1'), 2: (1, 'Tvättstuga 2'), 3: (2, 'Bastu')}
+        self.booking_passes = ['07-10', '10-13', '13-16', '16-19']
+
+    def bookings(self, calendar_id, start, stop):
+        # (date, pass, customer id) of the bookings of a calendar between start and stop inclusive, the same
+        # bookings for a date every time
+        customer_ids = sorted(self.customers)
+        bookings = []
+
+        for ordinal in range(start.toordinal(), stop.toordinal() + 1):
+            for number, booking_pass in enumerate(self.booking_passes):
+                slot = ordinal * 7 + calendar_id * 3 + number
+                if slot % 5 == 0:
+                    customer_id = customer_ids[slot % len(customer_ids)] if slot % 4 != 0 else None
+                    bookings.append((datetime.date.fromordinal(ordinal), booking_pass, customer_id))
+
+        return bookings
+
+
+class FakeAptusHandler(BaseHTTPRequestHandler):
+    # Serves the Aptus pages read and written by Aptus, with the table markup the parsers expect
+
+    server_version = 'FakeAptus'
+
+    def log_message(self, message_format, *args):
+        pass
+
+    #
+    # Responses
+    #
+
+    def _send(self, body, status=200, content_type='text/html; charset=utf-8'):
+        encoded = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def _send_page(self, body):
+        self._send('<!DOCTYPE html><html><head><title>Aptus</title>'
+                   '<link rel="stylesheet" href="{prefix}/Content/site.css"></head>'
+                   '<body><img src="{prefix}/Content/logo.png" alt="Aptus">{body}</body></html>'
+                   .format(prefix=PREFIX, body=body))
+
+    def _redirect(self, path, cookie=None):
+        self.send_response(302)
+        self.send_header('Location', PREFIX + path)
+        if cookie is not None:
+            self.send_header('Set-Cookie', cookie)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    #
+    # Markup
+    #
+
+    @staticmethod
+    def _details_table(fields):
+        rows = ''.join(map(lambda field: '<tr>\n<td><label for="{name}">{name}</label></td>\n<td>\n  {value}\n</td>\n'
+                                         '</tr>'.format(name=field[0], value=_value(field[1])), fields))
+        return '<div class="detailsTableDiv"><table class="detailsTable">{}</table></div>'.format(rows)
+
+    @staticmethod
+    def _list_table(header, rows, onclick_paths=None):
+        markup = '<tr>' + ''.join(map(lambda title: '<th>{}</th>'.format(title), header)) + '</tr>'
+
+        for index, row in enumerate(rows):
+            onclick = ' onclick="document.location.href=\'{}{}\'"'.format(PREFIX, onclick_paths[index]) \
+                if onclick_paths is not None else ''
+            markup += '<tr{}>'.format(onclick) + ''.join(map(lambda cell: '<td>{}</td>'.format(cell), row)) + '</tr>'
+
+        return '<div class="listTableDiv"><table class="listTable">{}</table></div>'.format(markup)
+
+    def _named_list_table(self, names, details_path):
+        entity_ids = sorted(names)
+        return self._list_table(['Namn'], list(map(lambda entity_id: [_escape(names[entity_id])], entity_ids)),
+                                list(map(lambda entity_id: details_path.format(entity_id), entity_ids)))
+
+    @staticmethod
+    def _login_form(query):
+        return ('<form method="post" action="{}/Account/Login?{}">'
+                '<input type="hidden" name="__RequestVerificationToken" value="{}">'
+                '<input id="Username" name="Username" type="text">'
+                '<input id="Password" name="Password" type="password">'
+                '<input id="btnLogin" type="submit" value="Logga in"></form>').format(PREFIX, _escape(query),
+                                                                                     ANTI_FORGERY_TOKEN)
+
+    def _key_edit_form(self, key_id):
+        key = self.server.data.keys.get(key_id)
+        rows = ''.join(map(lambda name: '<tr><td><label for="{name}">{name}</label></td><td><input id="{name}" '
+                                        'name="{name}" type="text" value="{value}"></td></tr>'
+                           .format(name=name, value=_escape(key.get(name))),
+                           ['Name', 'Card', 'Code', 'Start', 'Stop']))
+        rows += ('<tr><td><label for="Blocked">Blocked</label></td><td><input id="Blocked" name="Blocked" '
+                 'type="checkbox" value="true"{}><input name="Blocked" type="hidden" value="false"></td></tr>'
+                 .format(' checked="checked"' if key.get('Blocked') else ''))
+
+        return ('<form method="post" action="{}/CustomerKeys/Edit/{}">'
+                '<input type="hidden" name="__RequestVerificationToken" value="{}">'
+                '<div class="detailsTableDiv"><table class="detailsTable">{}</table></div>'
+                '<input id="theSubmitButton" type="submit" value="Spara"></form>').format(PREFIX, key_id,
+                                                                                         ANTI_FORGERY_TOKEN, rows)
+
+    #
+    # Requests
+    #
+
+    def _is_logged_in(self):
+        return '{}=ok'.format(AUTH_COOKIE) in (self.headers.get('Cookie') or '')
+
+    def _route(self):
+        url = urllib.parse.urlsplit(self.path)
+
+        if not url.path.startswith(PREFIX + '/'):
+            return url, None, None, None
+
+        parts = url.path[len(PREFIX) + 1:].strip('/').split('/')
+        controller = parts[0]
+        action = parts[1] if len(parts) > 1 else 'Index'
+
+        try:
+            entity_id = int(parts[2]) if len(parts) > 2 else None
+        except ValueError:
+            entity_id = None
+
+        return url, controller, action, entity_id
+
+    def _begin(self):
+        self.server.count_request(urllib.parse.urlsplit(self.path).path[len(PREFIX):] in STATIC_RESOURCES)
+
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+    def do_POST(self):
+        self._begin()
+
+        url, controller, action, entity_id = self._route()
+        length = int(self.headers.get('Content-Length') or 0)
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode('utf-8'), keep_blank_values=True)
+
+        if form.get('__RequestVerificationToken') != [ANTI_FORGERY_TOKEN]:
+            return self._send('Invalid anti-forgery token', 400)
+
+        if controller == 'Account' and action == 'Login':
+            if form.get('Username') == [USERNAME] and form.get('Password') == [PASSWORD]:
+                return_path = urllib.parse.parse_qs(url.query).get('ReturnUrl', [PREFIX + '/'])[0]
+                return self._redirect(return_path[len(PREFIX):], '{}=ok; Path=/'.format(AUTH_COOKIE))
+
+            return self._send_page(self._login_form(url.query))
+
+        if not self._is_logged_in():
+            return self._redirect('/Account/Login')
+
+        if controller == 'CustomerKeys' and action == 'Edit' and entity_id in self.server.data.keys:
+            key = self.server.data.keys.get(entity_id)
+
+            for name in ['Name', 'Card', 'Code', 'Start', 'Stop']:
+                if name in form:
+                    key[name] = form.get(name)[0]
+            key['Blocked'] = 'true' in form.get('Blocked', [])
+
+            return self._send_page('<div class="message"><div class="messageOk">Sparat</div></div>' +
+                                   self._key_edit_form(entity_id))
+
+        self._send('Not found', 404)
+
+    def do_GET(self):
+        self._begin()
+
+        url, controller, action, entity_id = self._route()
+
+        if url.path[len(PREFIX):] in STATIC_RESOURCES:
+            content_type, content = STATIC_RESOURCES.get(url.path[len(PREFIX):])
+            return self._send(content, content_type=content_type)
+
+        if controller == 'Account' and action == 'Login':
+            return self._send_page(self._login_form(url.query))
+
+        if not self._is_logged_in():
+            return self._redirect('/Account/Login?ReturnUrl={}'.format(urllib.parse.quote(url.path)))
+
+        data = self.server.data
+        page = getattr(self, '_get_{}_{}'.format(controller, action), None) if controller is not None else None
+
+        if page is None:
+            return self._send('Not found', 404)
+
+        return page(data, url, entity_id)
+
+    #
+    # Pages
+    #
+
+    def _get_Customer_Index(self, data, url, entity_id):
+        customer_ids = sorted(data.customers)
+        page_count = (len(customer_ids) + CUSTOMER_PAGE_SIZE - 1) // CUSTOMER_PAGE_SIZE
+        page_number = int(urllib.parse.parse_qs(url.query).get('page', ['1'])[0])
+        page_customer_ids = customer_ids[(page_number - 1) * CUSTOMER_PAGE_SIZE:page_number * CUSTOMER_PAGE_SIZE]
+
+        pager = ''.join(map(lambda number: '<a href="{}/Customer/Index?page={}">{}</a>'.format(PREFIX, number, number),
+                            range(1, page_count + 1)))
+
+        self._send_page(self._list_table(['Namn'],
+                                         list(map(lambda customer_id: [_escape(data.customers[customer_id]['Name'])],
+                                                  page_customer_ids)),
+                                         list(map(lambda customer_id: '/Customer/Details/{}'.format(customer_id),
+                                                  page_customer_ids))) +
+                        '<div class="pager">{}</div>'.format(pager))
+
+    def _get_Customer_Details(self, data, url, entity_id):
+        customer = data.customers.get(entity_id)
+
+        if customer is None:
+            # Aptus redirects to the customer list for missing customers
+            return self._redirect('/Customer/Index')
+
+        self._send_page(self._details_table(list(map(lambda name: (name, customer.get(name)),
+                                                     ['Name', 'Fritextf_lt_1', 'Fritextf_lt_2', 'Fritextf_lt_3',
+                                                      'Fritextf_lt_4', 'IsCompany']))))
+
+    def _get_CustomerKeys_Index(self, data, url, entity_id):
+        key_ids = data.customers.get(entity_id, {}).get('keys', [])
+        # Listed with the fields shown in the key list of Aptus
+        self._send_page(self._list_table(['Namn', 'Kort', 'Kod', 'Start', 'Stopp', 'Spärrad'],
+                                         list(map(lambda key_id: list(map(lambda name: _value(data.keys[key_id][name]),
+                                                                          ['Name', 'Card', 'Code', 'Start', 'Stop',
+                                                                           'Blocked'])), key_ids)),
+                                         list(map(lambda key_id: '/CustomerKeys/Details/{}'.format(key_id), key_ids))))
+
+    def _get_CustomerKeys_Details(self, data, url, entity_id):
+        key = data.keys.get(entity_id)
+
+        if key is None:
+            return self._send('Not found', 404)
+
+        body = self._details_table(list(map(lambda name: (name, key.get(name)),
+                                            ['Name', 'CardLabel', 'Card', 'Code', 'Start', 'Stop', 'CreatedTime',
+                                             'Blocked', 'LimitedLogging', 'Fritextf_lt_1'])))
+        body += self._list_table(['Behörighet', 'Start', 'Stopp', 'Spärrad'],
+                                 list(map(lambda permission: [_escape(permission[0]), permission[1], permission[2],
+                                                              _value(permission[3])], key.get('permissions'))))
+        self._send_page(body)
+
+    def _get_CustomerKeys_Edit(self, data, url, entity_id):
+        if entity_id not in data.keys:
+            return self._redirect('/Customer/Index')
+
+        self._send_page(self._key_edit_form(entity_id))
+
+    def _get_CustomerContract_Index(self, data, url, entity_id):
+        contract_ids = data.customers.get(entity_id, {}).get('contracts', [])
+        self._send_page(self._list_table(['Objekt', 'Startdatum', 'Slutdatum'],
+                                         list(map(lambda contract_id:
+                                                  list(map(lambda name: _escape(data.contracts[contract_id][name]),
+                                                           ['ObjectName', 'StartDate', 'EndDate'])), contract_ids)),
+                                         list(map(lambda contract_id:
+                                                  '/CustomerContract/Details/{}'.format(contract_id), contract_ids))))
+
+    def _get_CustomerContract_Details(self, data, url, entity_id):
+        contract = data.contracts.get(entity_id)
+
+        if contract is None:
+            return self._send('Not found', 404)
+
+        self._send_page(self._details_table(list(contract.items())))
+
+    def _get_CustomerEntryPhone_Index(self, data, url, entity_id):
+        entry_phone_id = data.customers.get(entity_id, {}).get('entry_phone')
+
+        if entry_phone_id is not None:
+            return self._redirect('/CustomerEntryPhone/Details/{}'.format(entry_phone_id))
+
+        self._send_page('<p>Ingen porttelefon</p>')
+
+    def _get_CustomerEntryPhone_Details(self, data, url, entity_id):
+        entry_phone = data.entry_phones.get(entity_id)
+
+        if entry_phone is None:
+            return self._send('Not found', 404)
+
+        body = self._list_table(['Förnamn', 'Efternamn', 'Telefon', 'Kod', 'Visas'],
+                                list(map(lambda name: [_escape(name[0]), _escape(name[1]), name[2], name[3],
+                                                       _value(name[4])], entry_phone.get('names'))))
+        body += self._details_table(list(filter(lambda field: field[0] != 'names', entry_phone.items())))
+        self._send_page(body)
+
+    def _get_CustomerNote_Index(self, data, url, entity_id):
+        notes = data.customers.get(entity_id, {}).get('notes', [])
+        self._send_page(self._list_table(['Notering', 'Skapad', 'Av', ''],
+                                         list(map(lambda note: [_escape(note[0]), note[1], note[2], ''], notes))))
+
+    def _get_Authority_Index(self, data, url, entity_id):
+        authority_ids = sorted(data.authorities)
+        self._send_page(self._list_table(['Namn'],
+                                         list(map(lambda authority_id: [_escape(data.authorities[authority_id])],
+                                                  authority_ids)),
+                                         list(map(lambda authority_id: '/Authority/Details/{}'.format(authority_id),
+                                                  authority_ids))))
+
+    def _get_Authority_Details(self, data, url, entity_id):
+        if entity_id not in data.authorities:
+            return self._send('Not found', 404)
+
+        self._send_page('<div class="listTableDiv"><div><table class="listTable"><tr><td> Alltid </td></tr>'
+                        '<tr><td>Dagtid</td></tr></table></div></div>')
+
+    def _get_Agera_AgeraIndex(self, data, url, entity_id):
+        agera_ids = sorted(data.ageras)
+        self._send_page(self._list_table(['Namn'], list(map(lambda agera_id: ['Agera {}'.format(agera_id)], agera_ids)),
+                                         list(map(lambda agera_id: '/Agera/AgeraDetails/{}'.format(agera_id),
+                                                  agera_ids))))
+
+    def _get_Agera_AgeraDetails(self, data, url, entity_id):
+        article_ids = data.ageras.get(entity_id)
+
+        if article_ids is None:
+            return self._send('Not found', 404)
+
+        body = self._list_table(['Artikel'],
+                                list(map(lambda article_id: [_escape(data.articles[article_id])], article_ids)),
+                                list(map(lambda article_id: '/Agera/ArticleDetails/{}'.format(article_id),
+                                         article_ids)))
+        body += self._details_table([('LastCall', '2020-01-01 10:00'),
+                                     ('MAC', '00:11:22:33:44:{:02x}'.format(entity_id)),
+                                     ('Address', 'Gatan {}'.format(entity_id)),
+                                     ('AgeraTemplateName', data.agera_templates[entity_id % 2 + 1])])
+        self._send_page(body)
+
+    def _get_Agera_ArticleDetails(self, data, url, entity_id):
+        if entity_id not in data.articles:
+            return self._send('Not found', 404)
+
+        self._send_page(self._details_table([('Name', data.articles[entity_id]),
+                                             ('Text', 'Välkommen till {}'.format(data.articles[entity_id])),
+                                             ('ArticleFileName', data.article_files[entity_id % 3])]))
+
+    def _get_Agera_AgeraTemplateIndex(self, data, url, entity_id):
+        self._send_page(self._named_list_table(data.agera_templates, '/Agera/AgeraTemplateDetails/{}'))
+
+    def _get_Agera_AgeraTemplateDetails(self, data, url, entity_id):
+        if entity_id not in data.agera_templates:
+            return self._send('Not found', 404)
+
+        self._send_page(self._details_table([('Rows', 10 + entity_id), ('Columns', 2)]))
+
+    def _get_Agera_AreaIndex(self, data, url, entity_id):
+        self._send_page(self._named_list_table(data.agera_areas, '/Agera/AreaDetails/{}'))
+
+    def _get_Agera_AreaDetails(self, data, url, entity_id):
+        if entity_id not in data.agera_areas:
+            return self._send('Not found', 404)
+
+        self._send_page(self._details_table([('Description', 'Entréer i {}'.format(data.agera_areas[entity_id]))]))
+
+    def _get_Agera_ArticleFileIndex(self, data, url, entity_id):
+        self._send_page(self._list_table(['Namn', 'Används', 'Fil', ''],
+                                         list(map(lambda index: [_escape(data.article_files[index]), 'Ja',
+                                                                 '<a href="{}/Agera/ShowArticleFile/{}">Visa</a>'
+                                                                 .format(PREFIX, index), ''],
+                                                  range(len(data.article_files))))))
+
+    def _get_Agera_ShowArticleFile(self, data, url, entity_id):
+        if entity_id is None or entity_id >= len(data.article_files):
+            return self._send('Not found', 404)
+
+        content = data.article_file_contents[entity_id]
+        etag = '"{}"'.format(hashlib.sha256(content).hexdigest()[:16])
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _get_BookingSystem_Index(self, data, url, entity_id):
+        self._send_page(self._named_list_table(data.booking_systems, '/BookingSystem/Details/{}'))
+
+    def _get_BookingSystem_Details(self, data, url, entity_id):
+        if entity_id not in data.booking_systems:
+            return self._send('Not found', 404)
+
+        calendars = {calendar_id: calendar[1] for calendar_id, calendar in data.booking_calendars.items()
+                     if calendar[0] == entity_id}
+        self._send_page(self._named_list_table(calendars, '/BookingCalendar/Bookings/{}'))
+
+    def _get_BookingCalendar_Bookings(self, data, url, entity_id):
+        if entity_id not in data.booking_calendars:
+            return self._send('Not found', 404)
+
+        query = urllib.parse.parse_qs(url.query)
+        today = datetime.date.today()
+        start = datetime.date.fromisoformat(query.get('from', [today.isoformat()])[0])
+        stop = datetime.date.fromisoformat(query.get('to', [today.isoformat()])[0])
+
+        rows = list(map(lambda booking: [booking[0].isoformat(), booking[1],
+                                         '<a href="{}/Customer/Details/{}">{}</a>'.format(
+                                             PREFIX, booking[2], _escape(data.customers[booking[2]]['Name']))
+                                         if booking[2] is not None else 'Förvaltningen'],
+                        data.bookings(entity_id, start, stop)))
+        self._send_page(self._list_table(['Datum', 'Pass', 'Kund'], rows))
+
+
+class FakeAptusServer(ThreadingHTTPServer):
+    # Local stand-in for Aptus, serving synthetic data with an injected latency on every request
+
+    daemon_threads = True
+
+    def __init__(self, port=0, customers=100, latency=0.0, seed=1):
+        super().__init__(('127.0.0.1', port), FakeAptusHandler)
+        self.data = FakeAptusData(customers, seed)
+        self.latency = latency
+
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.static_requests = 0
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:{}{}'.format(self.server_address[1], PREFIX)
+
+    @property
+    def max_customer_id(self):
+        return FIRST_CUSTOMER_ID + (len(self.data.customers) + 1) * CUSTOMER_ID_STEP
+
+    def count_request(self, static=False):
+        with self.lock:
+            if static:
+                self.static_requests += 1
+            else:
+                self.requests += 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='aptus-fake', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Fake Aptus')
+    arg_parser.add_argument('--port', type=int, default=8080, help='Port to serve on')
+    arg_parser.add_argument('--customers', type=int, default=100, help='Number of customers')
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    args = arg_parser.parse_args()
+
+    server = FakeAptusServer(args.port, args.customers, args.latency)
+    print('Serving fake Aptus at {} (username {}, password {})'.format(server.base_url, USERNAME, PASSWORD))
+    server.serve_forever()
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+# Bytes read and written at a time when streaming a file to disk
+CHUNK_SIZE = 64 * 1024
+
+
+class FileStore:
+    # Downloaded files stored once by the SHA-256 of their content. The store is shared by all dumps, so a file
+    # already stored by an earlier dump, or under another id, is not stored again.
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = store_dir
+
+    def path(self, digest) -> Path:
+        return self.store_dir.joinpath(digest[:2], digest)
+
+    def contains(self, digest) -> bool:
+        return digest is not None and self.path(digest).is_file()
+
+    def store(self, response):
+        # Stream the response body to the store, returns the digest, size and whether it was not stored before
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        sha256 = hashlib.sha256()
+        size = 0
+
+        # Written to a temporary file in the store, only moved in place when complete
+        with tempfile.NamedTemporaryFile(dir=self.store_dir, prefix='.download-', delete=False) as outfile:
+            try:
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    outfile.write(chunk)
+            except BaseException:
+                outfile.close()
+                os.unlink(outfile.name)
+                raise
+
+        digest = sha256.hexdigest()
+        file_path = self.path(digest)
+
+        if file_path.is_file():
+            # Same content stored before
+            os.unlink(outfile.name)
+            return digest, size, False
+
+        file_path.parent.mkdir(exist_ok=True)
+        os.replace(outfile.name, file_path)
+
+        return digest, size, True
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+
+class ListFingerprints:
+    # Fingerprints of the rows of list pages (keys, contracts), by kind and id. The rows of every dump are
+    # fingerprinted for the next dump. When dumping incrementally, an entity whose row is unchanged since the
+    # previous dump reuses its details from the previous dump instead of loading its details page. Only lists
+    # showing the fields of the details pages are fingerprinted, authorities and ageras are listed by name only.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fingerprints = {}
+        self.previous_fingerprints = {}
+        self.previous_details = {}
+
+    @staticmethod
+    def fingerprint(row) -> str:
+        # Hash of what a row shows, its cells and the details page it opens
+        shown = [row.get('onclick'), list(map(lambda cell: cell.get('html').strip(), row.get('cells')))]
+        return hashlib.sha256(json.dumps(shown, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def load(self, fingerprints_file_path: Path):
+        # Fingerprints already written to the dump, when resuming it
+        if fingerprints_file_path.is_file():
+            with fingerprints_file_path.open(mode='r', encoding='utf-8') as infile:
+                self.merge(json.load(infile))
+
+    def merge(self, fingerprints: dict):
+        # Fingerprints by kind and id, of entities dumped by a previous run
+        with self.lock:
+            for kind, kind_fingerprints in fingerprints.items():
+                self.fingerprints.setdefault(kind, {}).update(kind_fingerprints)
+
+    def listed(self, record):
+        # Fingerprints of the keys and contracts of a dumped record, by kind and id, None if it has none
+        if not isinstance(record, dict):
+            return None
+
+        listed_fingerprints = {}
+
+        with self.lock:
+            for kind in ['keys', 'contracts']:
+                for entity in record.get(kind) or []:
+                    fingerprint = self.fingerprints.get(kind, {}).get(entity.get('id'))
+
+                    if fingerprint is not None:
+                        listed_fingerprints.setdefault(kind, {})[entity.get('id')] = fingerprint
+
+        return listed_fingerprints if len(listed_fingerprints) > 0 else None
+
+    def load_previous(self, fingerprints_file_path: Path, previous_details: dict):
+        # Fingerprints and details of the previous dump, details by kind and id
+        with fingerprints_file_path.open(mode='r', encoding='utf-8') as infile:
+            self.previous_fingerprints = json.load(infile)
+
+        self.previous_details = previous_details
+
+    def save(self, fingerprints_file_path: Path):
+        with self.lock:
+            with fingerprints_file_path.open(mode='w', encoding='utf-8') as outfile:
+                json.dump(self.fingerprints, outfile)
+
+    def reusable(self, kind, entity_id, row):
+        # Details of the previous dump if the row is unchanged since, else None
+        fingerprint = self.fingerprint(row)
+
+        with self.lock:
+            self.fingerprints.setdefault(kind, {})[entity_id] = fingerprint
+
+        if self.previous_fingerprints.get(kind, {}).get(entity_id) != fingerprint:
+            return None
+
+        return self.previous_details.get(kind, {}).get(entity_id)
@@ -0,0 +1,511 @@
+import http.cookiejar
+import re
+import urllib.error
+import urllib.parse
+import urllib.request
+from html.parser import HTMLParser
+
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from selenium.webdriver.common.by import By
+
+USER_AGENT = 'aptus-management'
+
+# Elements that never have content or an end tag
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+# Open elements that are implicitly closed when the key element starts
+IMPLICITLY_CLOSED = {
+    'tr': {'td', 'th', 'tr'},
+    'td': {'td', 'th'},
+    'th': {'td', 'th'},
+    'tbody': {'td', 'th', 'tr', 'tbody', 'thead'},
+    'tfoot': {'td', 'th', 'tr', 'tbody', 'thead'},
+    'li': {'li'},
+    'option': {'option'},
+    'p': {'p'},
+}
+
+# Elements whose content is serialized without escaping
+RAW_TEXT_ELEMENTS = {'script', 'style'}
+
+
+class HtmlComment:
+    def __init__(self, data):
+        self.data = data
+
+
+class HtmlElement:
+    # Parsed HTML element implementing the read-only part of the Selenium WebElement API used by Aptus,
+    # plus enough form handling to log in and submit forms.
+
+    def __init__(self, tag_name, attrs, parent, browser):
+        self.tag_name = tag_name
+        self.attrs = attrs
+        self.parent = parent
+        self.browser = browser
+        self.children = []
+
+        # Mutable form state
+        self.value = attrs.get('value') or ''
+        self.checked = 'checked' in attrs
+
+    def get_attribute(self, name):
+        if name == 'innerHTML':
+            return self.inner_html()
+        elif name == 'outerHTML':
+            return _serialize_element(self)
+        elif name == 'textContent':
+            return self.text_content()
+        elif name == 'value' and self.tag_name in ('input', 'textarea', 'select'):
+            return self.form_value()
+        elif name in ('href', 'src', 'action') and name in self.attrs:
+            return urllib.parse.urljoin(self.browser.current_url, self.attrs.get(name))
+
+        value = self.attrs.get(name)
+        if value is None and name in self.attrs:
+            # Boolean attribute
+            return 'true'
+
+        return value
+
+    @property
+    def text(self):
+        return ' '.join(self.text_content().split())
+
+    def inner_html(self):
+        return ''.join(map(lambda child: _serialize(child, self.tag_name), self.children))
+
+    def text_content(self):
+        return ''.join(map(
+            lambda child: child.text_content() if isinstance(child, HtmlElement) else child,
+            filter(lambda child: not isinstance(child, HtmlComment), self.children)))
+
+    def iter_descendants(self):
+        for child in self.children:
+            if isinstance(child, HtmlElement):
+                yield child
+                yield from child.iter_descendants()
+
+    def find_elements(self, by=By.ID, value=None):
+        selector = _selector_for(by, value)
+        return list(filter(lambda element: _matches(element, selector), self.iter_descendants()))
+
+    def find_element(self, by=By.ID, value=None):
+        elements = self.find_elements(by=by, value=value)
+
+        if len(elements) == 0:
+            raise NoSuchElementException('Unable to locate element: {}'.format(value))
+
+        return elements[0]
+
+    #
+    # Form handling
+    #
+
+    def form_value(self):
+        if self.tag_name == 'textarea':
+            return self.value if self.value != '' else self.text_content()
+        elif self.tag_name == 'select':
+            options = self.find_elements(by=By.CSS_SELECTOR, value='option')
+            selected = list(filter(lambda option: option.checked or 'selected' in option.attrs, options))
+            if len(selected) == 0:
+                selected = options[:1]
+            return selected[0].option_value() if len(selected) > 0 else ''
+
+        return self.value
+
+    def option_value(self):
+        if 'value' in self.attrs:
+            return self.attrs.get('value')
+        return self.text
+
+    def clear(self):
+        self.value = ''
+
+    def send_keys(self, *values):
+        self.value += ''.join(values)
+
+    def click(self):
+        input_type = (self.attrs.get('type') or '').lower()
+
+        if self.tag_name == 'input' and input_type in ('checkbox', 'radio'):
+            self.checked = not self.checked if input_type == 'checkbox' else True
+        elif (self.tag_name == 'input' and input_type in ('submit', 'image')) or \
+                (self.tag_name == 'button' and input_type not in ('button', 'reset')):
+            form = self.form()
+            if form is None:
+                raise WebDriverException('Submit element is not part of a form')
+            self.browser.submit(form, self)
+        elif self.tag_name == 'a' and 'href' in self.attrs:
+            self.browser.get(self.get_attribute('href'))
+        else:
+            raise WebDriverException('HttpBrowser can not run JavaScript click handlers')
+
+    def form(self):
+        if 'form' in self.attrs:
+            return self.browser.document.find_element(by=By.ID, value=self.attrs.get('form'))
+
+        element = self.parent
+        while element is not None and element.tag_name != 'form':
+            element = element.parent
+
+        return element
+
+    def form_data(self, submitter=None):
+        data = []
+
+        for element in self.iter_descendants():
+            name = element.attrs.get('name')
+            if name is None or 'disabled' in element.attrs:
+                continue
+
+            input_type = (element.attrs.get('type') or 'text').lower()
+
+            if element.tag_name == 'input':
+                if input_type in ('submit', 'image', 'button', 'reset'):
+                    if element is submitter:
+                        data.append((name, element.value))
+                elif input_type in ('checkbox', 'radio'):
+                    if element.checked:
+                        data.append((name, element.value or 'on'))
+                elif input_type != 'file':
+                    data.append((name, element.value))
+            elif element.tag_name == 'button':
+                if element is submitter:
+                    data.append((name, element.value))
+            elif element.tag_name in ('select', 'textarea'):
+                data.append((name, element.form_value()))
+
+        return data
+
+
+class HtmlDocument(HtmlElement):
+    def __init__(self, browser):
+        super().__init__('#document', {}, None, browser)
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self, document):
+        super().__init__(convert_charrefs=True)
+        self.document = document
+        self.stack = [document]
+
+    def _current(self):
+        return self.stack[-1]
+
+    def _push(self, tag, attrs):
+        element = HtmlElement(tag, attrs, self._current(), self.document.browser)
+        self._current().children.append(element)
+        self.stack.append(element)
+        return element
+
+    def handle_starttag(self, tag, attrs):
+        closed = IMPLICITLY_CLOSED.get(tag, set())
+        while len(self.stack) > 1 and self._current().tag_name in closed:
+            self.stack.pop()
+
+        # Browsers put table rows in an implicit tbody
+        if tag == 'tr' and self._current().tag_name == 'table':
+            self._push('tbody', {})
+
+        self._push(tag, dict(map(lambda attr: (attr[0], attr[1] if attr[1] is not None else ''), attrs)))
+
+        if tag in VOID_ELEMENTS:
+            self.stack.pop()
+
+    def handle_startendtag(self, tag, attrs):
+        # A self-closing slash is ignored on non-void elements, like browsers do
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag_name == tag:
+                del self.stack[index:]
+                return
+
+    def handle_data(self, data):
+        children = self._current().children
+        if len(children) > 0 and isinstance(children[-1], str):
+            children[-1] += data
+        else:
+            children.append(data)
+
+    def handle_comment(self, data):
+        self._current().children.append(HtmlComment(data))
+
+
+def parse_html(html: str, browser) -> HtmlDocument:
+    document = HtmlDocument(browser)
+    builder = _TreeBuilder(document)
+    builder.feed(html)
+    builder.close()
+    return document
+
+
+#
+# Serialization, following the browser innerHTML rules
+#
+
+def _escape_text(text):
+    return text.replace('&', '&amp;').replace('\xa0', '&nbsp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _escape_attribute(value):
+    return value.replace('&', '&amp;').replace('\xa0', '&nbsp;').replace('"', '&quot;')
+
+
+def _serialize_element(element):
+    attributes = ''.join(map(lambda item: ' {}="{}"'.format(item[0], _escape_attribute(item[1])),
+                             element.attrs.items()))
+    start_tag = '<{}{}>'.format(element.tag_name, attributes)
+
+    if element.tag_name in VOID_ELEMENTS:
+        return start_tag
+
+    return '{}{}</{}>'.format(start_tag, element.inner_html(), element.tag_name)
+
+
+def _serialize(node, parent_tag):
+    if isinstance(node, HtmlElement):
+        return _serialize_element(node)
+    elif isinstance(node, HtmlComment):
+        return '<!--{}-->'.format(node.data)
+    elif parent_tag in RAW_TEXT_ELEMENTS:
+        return node
+
+    return _escape_text(node)
+
+
+#
+# CSS selectors, supporting type, class and id selectors with child and descendant combinators
+#
+
+_COMPOUND_PATTERN = re.compile(r'([a-zA-Z0-9*]*)((?:[.#][\w-]+)*)')
+
+
+def _parse_compound(compound):
+    match = _COMPOUND_PATTERN.fullmatch(compound)
+    if match is None:
+        raise WebDriverException('Unsupported CSS selector: {}'.format(compound))
+
+    tag = match.group(1).lower() if match.group(1) not in ('', '*') else None
+    parts = re.findall(r'[.#][\w-]+', match.group(2))
+
+    return {
+        'tag': tag,
+        'ids': list(map(lambda part: part[1:], filter(lambda part: part.startswith('#'), parts))),
+        'classes': list(map(lambda part: part[1:], filter(lambda part: part.startswith('.'), parts)))
+    }
+
+
+def _parse_selector(selector):
+    tokens = selector.replace('>', ' > ').split()
+
+    # List of (combinator, compound) pairs, combinator relating the compound to the previous one
+    parts = []
+    combinator = ' '
+    for token in tokens:
+        if token == '>':
+            combinator = '>'
+        else:
+            parts.append((combinator, _parse_compound(token)))
+            combinator = ' '
+
+    return parts
+
+
+def _selector_for(by, value):
+    if by == By.CSS_SELECTOR:
+        return _parse_selector(value)
+    elif by == By.ID:
+        return [(' ', {'tag': None, 'ids': [value], 'classes': []})]
+    elif by == By.TAG_NAME:
+        return [(' ', {'tag': value.lower(), 'ids': [], 'classes': []})]
+    elif by == By.CLASS_NAME:
+        return [(' ', {'tag': None, 'ids': [], 'classes': [value]})]
+
+    raise WebDriverException('HttpBrowser does not support locating elements by {}'.format(by))
+
+
+def _matches_compound(element, compound):
+    if not isinstance(element, HtmlElement) or isinstance(element, HtmlDocument):
+        return False
+    if compound.get('tag') is not None and element.tag_name != compound.get('tag'):
+        return False
+    if any(map(lambda element_id: element.attrs.get('id') != element_id, compound.get('ids'))):
+        return False
+
+    classes = (element.attrs.get('class') or '').split()
+    return all(map(lambda name: name in classes, compound.get('classes')))
+
+
+def _matches(element, selector, index=None):
+    if index is None:
+        index = len(selector) - 1
+
+    combinator, compound = selector[index]
+
+    if not _matches_compound(element, compound):
+        return False
+    if index == 0:
+        return True
+
+    if combinator == '>':
+        return _matches(element.parent, selector, index - 1)
+
+    ancestor = element.parent
+    while ancestor is not None:
+        if _matches(ancestor, selector, index - 1):
+            return True
+        ancestor = ancestor.parent
+
+    return False
+
+
+def _snapshot_cell(td):
+    labels = td.find_elements(by=By.CSS_SELECTOR, value='label')
+    links = td.find_elements(by=By.CSS_SELECTOR, value='a')
+
+    return {
+        'html': td.inner_html(),
+        'label': labels[0].attrs.get('for') if len(labels) > 0 else None,
+        'href': links[0].get_attribute('href') if len(links) > 0 else None
+    }
+
+
+def _snapshot_row(tr):
+    return {
+        'onclick': tr.attrs.get('onclick'),
+        'cells': list(map(_snapshot_cell, tr.find_elements(by=By.CSS_SELECTOR, value='td')))
+    }
+
+
+class HttpBrowser:
+    # Browserless stand-in for a Selenium WebDriver. Pages are fetched with a plain HTTP session keeping the
+    # cookie jar, and parsed into HtmlElement trees.
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self.cookie_jar = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookie_jar))
+
+        self.current_url = None
+        self.page_source = ''
+        self.document = parse_html('', self)
+
+    def new_page(self):
+        # Browser sharing the session cookies with a page of its own, for loading pages in parallel threads
+        page = HttpBrowser(self.timeout)
+        page.cookie_jar = self.cookie_jar
+        page.opener = self.opener
+
+        return page
+
+    def fetch(self, url, data=None):
+        if data is not None:
+            data = urllib.parse.urlencode(data).encode('utf-8')
+
+        request = urllib.request.Request(url, data=data, headers={'User-Agent': USER_AGENT})
+
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return response.geturl(), self._decode(response)
+        except urllib.error.HTTPError as error:
+            # Error pages are still shown by a browser, so treat them as pages
+            with error:
+                return error.geturl(), self._decode(error)
+
+    def open_file(self, url, headers=None):
+        # Response of a file to be read in chunks by the caller, without loading it as the current page.
+        # A not modified response to conditional headers is returned with status 304 instead of raised.
+        request = urllib.request.Request(url, headers=dict(headers or {}, **{'User-Agent': USER_AGENT}))
+
+        try:
+            return self.opener.open(request, timeout=self.timeout)
+        except urllib.error.HTTPError as error:
+            if error.code == 304:
+                return error
+            raise
+
+    @staticmethod
+    def _decode(response):
+        charset = response.headers.get_content_charset() or 'utf-8'
+        return response.read().decode(charset, errors='replace')
+
+    def load(self, url, html):
+        self.current_url = url
+        self.page_source = html
+        self.document = parse_html(html, self)
+
+    def get(self, url):
+        self.load(*self.fetch(url))
+
+    def submit(self, form, submitter=None):
+        action = form.get_attribute('action') or self.current_url
+        data = form.form_data(submitter)
+
+        if (form.attrs.get('method') or 'get').lower() == 'post':
+            self.load(*self.fetch(action, data))
+        else:
+            action = action.split('#')[0].split('?')[0]
+            self.get('{}?{}'.format(action, urllib.parse.urlencode(data)))
+
+    def find_elements(self, by=By.ID, value=None):
+        return self.document.find_elements(by=by, value=value)
+
+    def find_element(self, by=By.ID, value=None):
+        return self.document.find_element(by=by, value=value)
+
+    def snapshot_tables(self, selectors):
+        # Same structure as Aptus TABLE_SNAPSHOT_SCRIPT returns from a browser
+        return list(map(lambda selector: list(map(_snapshot_row, self.find_elements(by=By.CSS_SELECTOR,
+                                                                                     value=selector))),
+                        selectors))
+
+    def snapshot_links(self):
+        return list(map(lambda link: link.get_attribute('href'),
+                        filter(lambda link: 'href' in link.attrs, self.find_elements(by=By.TAG_NAME, value='a'))))
+
+    def snapshot_form(self, element_id):
+        # Same structure as Aptus FORM_SNAPSHOT_SCRIPT returns from a browser
+        form = self.find_element(by=By.ID, value=element_id).form()
+
+        if form is None:
+            raise WebDriverException('Element is not part of a form')
+
+        return {
+            'action': form.get_attribute('action') or self.current_url,
+            'method': (form.attrs.get('method') or 'get').lower(),
+            'fields': list(map(list, form.form_data()))
+        }
+
+    def get_cookies(self):
+        # Same fields as WebDriver get_cookies
+        return list(map(lambda cookie: {
+            'name': cookie.name,
+            'value': cookie.value,
+            'domain': cookie.domain,
+            'path': cookie.path,
+            'secure': cookie.secure,
+            'httpOnly': cookie.has_nonstandard_attr('HttpOnly'),
+            'expiry': cookie.expires
+        }, self.cookie_jar))
+
+    def add_cookie(self, cookie):
+        domain = cookie.get('domain') or urllib.parse.urlsplit(self.current_url).hostname
+        rest = {'HttpOnly': None} if cookie.get('httpOnly') else {}
+
+        self.cookie_jar.set_cookie(http.cookiejar.Cookie(
+            0, cookie.get('name'), cookie.get('value'), None, False, domain, domain.startswith('.'),
+            domain.startswith('.'), cookie.get('path') or '/', True, bool(cookie.get('secure')), cookie.get('expiry'),
+            cookie.get('expiry') is None, None, None, rest))
+
+    def delete_all_cookies(self):
+        self.cookie_jar.clear()
+
+    def implicitly_wait(self, time_to_wait):
+        # Pages are fully loaded when fetched, nothing to wait for
+        pass
+
+    def quit(self):
+        self.opener.close()
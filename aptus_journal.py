@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+
+class DumpJournal:
+    # Checkpoint journal in a dump directory. Every finished entity is appended to the journal of its part as soon
+    # as it is done, so an interrupted dump can be resumed without dumping it again. Only the offsets of the entities
+    # are kept in memory, the entities are read back from the journal when writing the final dump files. The list
+    # fingerprints of the keys and contracts of an entity are kept with it, for resuming an incremental dump.
+
+    def __init__(self, dump_dir: Path):
+        self.journal_dir = dump_dir.joinpath('journal')
+        self.lock = threading.Lock()
+        self.completed_entities = {}
+        self.completed_fingerprints = {}
+
+    def _journal_file_path(self, part) -> Path:
+        return self.journal_dir.joinpath('{}.jsonl'.format(part))
+
+    def load(self, part) -> dict:
+        # Journal offsets of entities completed by previous runs, by id
+        completed = {}
+        fingerprints = {}
+        journal_file_path = self._journal_file_path(part)
+
+        if journal_file_path.is_file():
+            with journal_file_path.open(mode='rb') as infile:
+                offset = 0
+                for line in infile:
+                    try:
+                        entry = json.loads(line)
+                        completed[entry.get('id')] = offset
+
+                        for kind, kind_fingerprints in (entry.get('fingerprints') or {}).items():
+                            fingerprints.setdefault(kind, {}).update(kind_fingerprints)
+                    except ValueError:
+                        # Line cut short by an interruption
+                        pass
+                    offset += len(line)
+
+            if offset > 0 and not line.endswith(b'\n'):
+                # Terminate the line cut short so new entries start on a line of their own
+                with journal_file_path.open(mode='ab') as outfile:
+                    outfile.write(b'\n')
+
+        self.completed_entities[part] = completed
+        self.completed_fingerprints[part] = fingerprints
+
+        if len(completed) > 0:
+            print('Resuming {}, {} already done'.format(part, len(completed)))
+
+        return completed
+
+    def is_completed(self, part, entity_id) -> bool:
+        return entity_id in self.completed_entities.get(part, {})
+
+    def completed(self, part, entity_id):
+        offset = self.completed_entities.get(part, {}).get(entity_id)
+
+        with self._journal_file_path(part).open(mode='rb') as infile:
+            infile.seek(offset)
+            return json.loads(infile.readline()).get('data')
+
+    def fingerprints(self, part) -> dict:
+        # List fingerprints recorded with the entities completed by previous runs, by kind and id
+        return self.completed_fingerprints.get(part, {})
+
+    def record(self, part, entity_id, data, fingerprints=None):
+        entry = {'id': entity_id, 'data': data}
+        if fingerprints is not None:
+            entry['fingerprints'] = fingerprints
+
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+
+        with self.lock:
+            self.journal_dir.mkdir(exist_ok=True)
+
+            with self._journal_file_path(part).open(mode='ab') as outfile:
+                offset = outfile.tell()
+                outfile.write(line.encode('utf-8'))
+                outfile.flush()
+                os.fsync(outfile.fileno())
+
+            self.completed_entities.setdefault(part, {})[entity_id] = offset
+
+    def finish(self, part):
+        # Part written to its final file, journal no longer needed
+        with self.lock:
+            self._journal_file_path(part).unlink(missing_ok=True)
+            self.completed_entities.pop(part, None)
+
+            if self.journal_dir.is_dir() and not any(self.journal_dir.iterdir()):
+                shutil.rmtree(self.journal_dir)
+
+    def is_part_finished(self, part, final_file_path: Path) -> bool:
+        return final_file_path.is_file() and not self._journal_file_path(part).is_file()
@@ -0,0 +1,136 @@
+import functools
+import inspect
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Prefix of the exported Prometheus metric names
+PROMETHEUS_PREFIX = 'aptus'
+
+
+class Metrics:
+    # Thread safe counters and timers for a run
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.timers = {}
+        self.start_time = time.monotonic()
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            timer = self.timers.setdefault(name, {'count': 0, 'seconds': 0.0})
+            timer['count'] += 1
+            timer['seconds'] += seconds
+
+    @contextmanager
+    def timer(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.monotonic() - start)
+
+    def counter(self, name):
+        return self.counters.get(name, 0)
+
+    def count(self, name):
+        return self.timers.get(name, {}).get('count', 0)
+
+    def seconds(self, name):
+        return self.timers.get(name, {}).get('seconds', 0.0)
+
+    def elapsed(self):
+        return time.monotonic() - self.start_time
+
+    def rate(self, name):
+        # Timed calls per second of the run
+        elapsed_seconds = self.elapsed()
+        return self.count(name) / elapsed_seconds if elapsed_seconds > 0 else 0.0
+
+    def merge(self, other):
+        with other.lock:
+            counters = dict(other.counters)
+            timers = {name: dict(timer) for name, timer in other.timers.items()}
+
+        with self.lock:
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+            for name, other_timer in timers.items():
+                timer = self.timers.setdefault(name, {'count': 0, 'seconds': 0.0})
+                timer['count'] += other_timer.get('count')
+                timer['seconds'] += other_timer.get('seconds')
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+            timers = {name: dict(timer) for name, timer in self.timers.items()}
+
+        elapsed_seconds = self.elapsed()
+
+        for timer in timers.values():
+            timer['perSecond'] = timer.get('count') / elapsed_seconds if elapsed_seconds > 0 else 0.0
+
+        return {
+            'elapsedSeconds': elapsed_seconds,
+            'counters': dict(sorted(counters.items())),
+            'timers': dict(sorted(timers.items()))
+        }
+
+    def to_prometheus(self) -> str:
+        metrics = self.to_dict()
+        lines = [
+            '# TYPE {}_run_seconds gauge'.format(PROMETHEUS_PREFIX),
+            '{}_run_seconds {}'.format(PROMETHEUS_PREFIX, metrics.get('elapsedSeconds'))
+        ]
+
+        for name, value in metrics.get('counters').items():
+            metric_name = '{}_{}_total'.format(PROMETHEUS_PREFIX, re.sub(r'[^a-zA-Z0-9_]', '_', name))
+            lines.append('# TYPE {} counter'.format(metric_name))
+            lines.append('{} {}'.format(metric_name, value))
+
+        for suffix, field in [('seconds_total', 'seconds'), ('calls_total', 'count')]:
+            metric_name = '{}_timer_{}'.format(PROMETHEUS_PREFIX, suffix)
+            lines.append('# TYPE {} counter'.format(metric_name))
+
+            for name, timer in metrics.get('timers').items():
+                lines.append('{}{{timer="{}"}} {}'.format(metric_name, name, timer.get(field)))
+
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: Path):
+        with path.open(mode='w', encoding='utf-8') as outfile:
+            json.dump(self.to_dict(), outfile, indent=2)
+
+    def write_prometheus(self, path: Path):
+        with path.open(mode='w', encoding='utf-8') as outfile:
+            outfile.write(self.to_prometheus())
+
+
+def timed(name):
+    # Times every call of a method, or coroutine method, of an object with metrics
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def timed_coroutine(self, *args, **kwargs):
+                with self.metrics.timer(name):
+                    return await method(self, *args, **kwargs)
+
+            return timed_coroutine
+
+        @functools.wraps(method)
+        def timed_method(self, *args, **kwargs):
+            with self.metrics.timer(name):
+                return method(self, *args, **kwargs)
+
+        return timed_method
+
+    return decorator
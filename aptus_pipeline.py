@@ -0,0 +1,179 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import aptus_errors
+import aptus_metrics
+
+
+class CustomerPipeline:
+    # Dumps customers without a browser, fetching the independent pages of a customer, and of different customers,
+    # concurrently with at most concurrency pages in flight. Pages are fetched in threads and parsed on the event
+    # loop as they arrive, giving the same customers as Aptus.dump_customer.
+
+    def __init__(self, apt, concurrency):
+        self.apt = apt
+        self.metrics = apt.metrics
+        self.concurrency = concurrency
+
+        self.fetch_slots = None
+        self.login_lock = None
+        self.logins = 0
+
+    async def _login(self, logins_seen):
+        async with self.login_lock:
+            if self.logins == logins_seen:
+                # Not logged in again by another page meanwhile
+                await asyncio.to_thread(self.apt.open_path, 'Customer/Index')
+                self.logins += 1
+
+    async def fetch(self, path):
+        # Page at path, logging in again when redirected to the login page
+        for attempt in range(2):
+            logins_seen = self.logins
+
+            async with self.fetch_slots:
+                page = await asyncio.to_thread(self.apt.open_page, path)
+
+            if not self.apt.is_login_page(page.current_url):
+                return page
+
+            await self._login(logins_seen)
+
+        raise aptus_errors.DumpError('Could not open {}, redirected to login page'.format(path), page)
+
+    @aptus_metrics.timed('dump_key')
+    async def dump_key(self, key_id):
+        page = await self.fetch('CustomerKeys/Details/{id}'.format(id=key_id))
+        return self.parse(page, lambda: self.apt.parse_key(key_id, self.apt.read_tables('list', 'details', page=page)))
+
+    @aptus_metrics.timed('dump_contract')
+    async def dump_contract(self, contract_id):
+        page = await self.fetch('CustomerContract/Details/{id}'.format(id=contract_id))
+        return self.parse(page, lambda: self.apt.parse_contract(contract_id, self.apt.read_tables('details',
+                                                                                                   page=page)))
+
+    @aptus_metrics.timed('dump_customer')
+    async def dump_customer(self, customer_id):
+        customer_details_path = 'Customer/Details/{id}'.format(id=customer_id)
+        details_page = await self.fetch(customer_details_path)
+
+        if not details_page.current_url.endswith(customer_details_path):
+            # Customer does not exist if we have been redirected to other page
+            print('Customer ID: {} does not exist'.format(customer_id))
+            return None
+
+        print('Customer ID: {}'.format(customer_id))
+
+        # Subpages of the selected sections only depend on the customer id
+        entry_phone_index_path = 'CustomerEntryPhone/Index/{id}'.format(id=customer_id)
+        keys_page, contracts_page, entry_phone_page, notes_page = await asyncio.gather(
+            self.fetch_section('keys', 'CustomerKeys/Index/{id}'.format(id=customer_id)),
+            self.fetch_section('contracts', 'CustomerContract/Index/{id}'.format(id=customer_id)),
+            self.fetch_section('entryPhone', entry_phone_index_path),
+            self.fetch_section('notes', 'CustomerNote/Index/{id}'.format(id=customer_id)))
+
+        key_rows = []
+        if keys_page is not None:
+            key_rows = self.apt.parse_onclick_rows(self.apt.read_tables('list', page=keys_page).get('list'),
+                                                   'CustomerKeys/Details')
+            print('Keys: {}'.format(len(key_rows)))
+
+        contract_rows = []
+        if contracts_page is not None:
+            contract_rows = self.apt.parse_onclick_rows(self.apt.read_tables('list', page=contracts_page).get('list'),
+                                                        'CustomerContract/Details')
+            print('Contracts: {}'.format(len(contract_rows)))
+
+        # Keys and contracts fetched concurrently, kept in page order
+        keys, contracts = await asyncio.gather(
+            asyncio.gather(*map(lambda key_row: self.dump_listed('keys', *key_row, self.dump_key), key_rows)),
+            asyncio.gather(*map(lambda contract_row: self.dump_listed('contracts', *contract_row, self.dump_contract),
+                                contract_rows)))
+
+        sections = {
+            'details': lambda: self.parse(details_page, lambda: self.apt.dump_customer_details(
+                self.apt.read_tables('details', page=details_page))),
+            'keys': lambda: list(keys),
+            'contracts': lambda: list(contracts),
+            'entryPhone': lambda: self.parse_entry_phone(entry_phone_index_path, entry_phone_page),
+            'notes': lambda: self.parse(notes_page, lambda: self.apt.parse_notes(
+                self.apt.read_tables('list', page=notes_page)))
+        }
+
+        return self.apt.assemble_customer(customer_id, sections)
+
+    async def dump_listed(self, kind, entity_id, row, dump):
+        # Details reused from the previous dump, or dumped from the details page
+        details = self.apt.reusable_details(kind, entity_id, row)
+
+        return details if details is not None else await dump(entity_id)
+
+    async def fetch_section(self, section, path):
+        # Page of a section, None if the section is not selected
+        if section not in self.apt.customer_sections:
+            return None
+
+        return await self.fetch(path)
+
+    def parse_entry_phone(self, entry_phone_index_path, entry_phone_page):
+        if entry_phone_page.current_url.endswith(entry_phone_index_path):
+            # Customer does not have entry phone if we are still at the index page
+            print('Does not have entry phone')
+            return None
+
+        return self.parse(entry_phone_page, lambda: self.apt.parse_entry_phone(
+            entry_phone_page.current_url, self.apt.read_tables('list', 'details', page=entry_phone_page)))
+
+    @staticmethod
+    def parse(page, parse):
+        # Page parsed, a page failing to parse is kept with the error for the errors file
+        try:
+            return parse()
+        except (aptus_errors.DumpError, ValueError) as error:
+            error.page = page
+            raise
+
+    async def dump_retrying(self, customer_id):
+        # Customer dumped, retried after a backoff doubling with every attempt with its pages fetched again.
+        # Raises the error of the last attempt.
+        for attempt in range(1, self.apt.dump_attempts + 1):
+            try:
+                return await self.dump_customer(customer_id)
+            except aptus_errors.DUMP_ERRORS as error:
+                if attempt == self.apt.dump_attempts:
+                    raise
+
+                self.apt.logger.error('Error dumping customers ID: {}, attempt {}, {}'.format(customer_id, attempt,
+                                                                                             error))
+                print('- Retrying customers ID: {}'.format(customer_id))
+                self.metrics.increment('dump_retries')
+
+                await asyncio.sleep(self.apt.dump_retry_backoff * 2 ** (attempt - 1))
+
+    async def _run(self, customer_ids, on_customer):
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(self.concurrency,
+                                                                           thread_name_prefix='aptus-pipeline'))
+        self.fetch_slots = asyncio.Semaphore(self.concurrency)
+        self.login_lock = asyncio.Lock()
+
+        # Customers taken from a shared iterator, as many in progress as pages in flight
+        pending_customer_ids = iter(customer_ids)
+
+        async def work():
+            for customer_id in pending_customer_ids:
+                try:
+                    customer = await self.dump_retrying(customer_id)
+                except aptus_errors.DUMP_ERRORS as error:
+                    # Recorded in the errors file, the other customers are still dumped. Pages are fetched apart from
+                    # the session, only a page kept with the error is recorded.
+                    self.apt.record_error('customers', customer_id, error, on_session_page=False)
+                    continue
+
+                on_customer(customer_id, customer)
+
+        await asyncio.gather(*map(lambda _: work(), range(self.concurrency)))
+
+    def run(self, customer_ids, on_customer):
+        # Dump the customers, calling on_customer with the id and customer (None if missing) as each is done.
+        # Customers failing for good are not passed to on_customer.
+        asyncio.run(self._run(customer_ids, on_customer))
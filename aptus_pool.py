@@ -0,0 +1,122 @@
+import logging
+import queue
+import threading
+import time
+
+
+class RateLimiter:
+    # Spaces requests evenly to at most rate per second, shared by all sessions
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class WorkerPool:
+    # Runs tasks for items from a shared queue on a number of workers, each with its own Aptus session.
+    # A task failing with one of the retried errors is retried on a fresh session, after a backoff doubling with
+    # every attempt, other errors fail the item right away. A worker crashing only loses its own session, remaining
+    # items are still picked up by the other workers.
+
+    def __init__(self, spawn, workers, max_attempts=2, backoff=0.0, metrics=None, retry_errors=(Exception,)):
+        self.spawn = spawn
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.retry_errors = retry_errors
+        self.metrics = metrics
+
+        self.logger = logging.getLogger(__name__)
+
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.results = {}
+        self.failures = {}
+        self.attempts = {}
+
+    def _new_session(self, worker_number):
+        try:
+            return self.spawn()
+        except Exception as error:
+            self.logger.error('Worker {} could not start a session: {}'.format(worker_number, error))
+            return None
+
+    def _close_session(self, session):
+        if self.metrics is not None:
+            self.metrics.merge(session.metrics)
+
+        try:
+            session.quit()
+        except Exception:
+            # Session already closed when aborted
+            pass
+
+    def _fail(self, item, error):
+        with self.lock:
+            attempts = self.attempts.get(item, 0) + 1
+            self.attempts[item] = attempts
+            retry = attempts < self.max_attempts and isinstance(error, self.retry_errors)
+
+        if retry:
+            if self.backoff > 0:
+                time.sleep(self.backoff * 2 ** (attempts - 1))
+            self.queue.put(item)
+        else:
+            with self.lock:
+                self.failures[item] = str(error)
+
+    def _work(self, worker_number, task):
+        session = self._new_session(worker_number)
+
+        while session is not None:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                result = task(session, item)
+            except Exception as error:
+                self.logger.error('Worker {} failed on {}: {}'.format(worker_number, item, error))
+                self._fail(item, error)
+
+                # Session state is unknown after a failure, continue on a fresh one
+                self._close_session(session)
+                session = self._new_session(worker_number)
+                continue
+
+            with self.lock:
+                self.results[item] = result
+
+        if session is not None:
+            self._close_session(session)
+
+    def run(self, items, task) -> dict:
+        for item in items:
+            self.queue.put(item)
+
+        threads = list(map(lambda worker_number: threading.Thread(target=self._work, args=(worker_number, task),
+                                                                  name='aptus-worker-{}'.format(worker_number)),
+                           range(self.workers)))
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        # Items left when every worker has crashed
+        while not self.queue.empty():
+            self.failures[self.queue.get_nowait()] = 'No worker left to run task'
+
+        return self.results
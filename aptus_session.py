@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Cookie fields accepted by WebDriver add_cookie
+COOKIE_FIELDS = ['name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry', 'sameSite']
+
+# Saves from parallel workers in the same process
+_lock = threading.Lock()
+
+
+class SessionStore:
+    # Authenticated session cookies saved to a file, reused by later runs and parallel workers until they expire
+
+    def __init__(self, session_file_path: Path, base_url, username, max_age):
+        self.session_file_path = session_file_path
+        self.base_url = base_url
+        self.username = username
+        self.max_age = max_age
+
+    def load(self):
+        # Saved time and cookies of a valid session, or None
+        with _lock:
+            if not self.session_file_path.is_file():
+                return None
+
+            try:
+                with self.session_file_path.open(mode='r', encoding='utf-8') as infile:
+                    session = json.load(infile)
+            except ValueError:
+                return None
+
+        if session.get('baseUrl') != self.base_url or session.get('username') != self.username:
+            return None
+
+        now = time.time()
+        saved_time = session.get('savedTime', 0)
+
+        if now - saved_time >= self.max_age:
+            return None
+
+        cookies = session.get('cookies', [])
+
+        if any(map(lambda cookie: cookie.get('expiry') is not None and cookie.get('expiry') <= now, cookies)):
+            return None
+
+        return saved_time, cookies
+
+    def save(self, cookies):
+        session = {
+            'baseUrl': self.base_url,
+            'username': self.username,
+            'savedTime': time.time(),
+            'cookies': list(map(lambda cookie: {field: cookie.get(field) for field in COOKIE_FIELDS if
+                                                cookie.get(field) is not None}, cookies))
+        }
+
+        with _lock:
+            temporary_path = self.session_file_path.with_name(self.session_file_path.name + '.tmp')
+
+            # Cookies give access to Aptus, only readable by the user
+            file_descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(file_descriptor, mode='w', encoding='utf-8') as outfile:
+                json.dump(session, outfile)
+
+            temporary_path.replace(self.session_file_path)
+
+        return session.get('savedTime')
+
+    def clear(self):
+        with _lock:
+            self.session_file_path.unlink(missing_ok=True)
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import aptus_writers
+
+# Dump files stored record by record, with the fields of a record holding records of their own. Other dump files
+# are stored whole.
+RECORD_FILES = {
+    'customer_dump': ['keys', 'contracts'],
+    'authorities_dump': []
+}
+
+# Dump files holding an object, with the fields holding arrays stored record by record
+OBJECT_FILES = {
+    'agera_dump': ['articles', 'ageras', 'templates', 'areas', 'article_files']
+}
+
+# Dump files snapshotted when present in a dump directory
+SNAPSHOT_FILE_NAMES = ['agera_dump.json', 'authorities_dump.json', 'authorities_dump.jsonl', 'customer_dump.json',
+                       'customer_dump.jsonl', 'customer_ids.json', 'bookings_dump.json']
+
+
+def _encode(record) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class SnapshotStore:
+    # Dumps stored as small manifests of content hashes. Every customer, key, contract, authority and agera record
+    # is stored once by the SHA-256 of its content, so a record unchanged since an earlier dump takes no space.
+    # A stored dump is written back to the same files, byte for byte, on demand.
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = store_dir
+        self.objects_dir = store_dir.joinpath('objects')
+        self.manifests_dir = store_dir.joinpath('manifests')
+
+        self.stored_objects = 0
+        self.reused_objects = 0
+
+    def _object_path(self, digest) -> Path:
+        return self.objects_dir.joinpath(digest[:2], digest)
+
+    def _manifest_path(self, name) -> Path:
+        return self.manifests_dir.joinpath('{}.json'.format(name))
+
+    def _put(self, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(digest)
+
+        if object_path.is_file():
+            self.reused_objects += 1
+            return digest
+
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Written to a temporary file, only moved in place when complete
+        with tempfile.NamedTemporaryFile(dir=object_path.parent, prefix='.object-', delete=False) as outfile:
+            outfile.write(content)
+
+        os.replace(outfile.name, object_path)
+        self.stored_objects += 1
+
+        return digest
+
+    def _get(self, digest) -> bytes:
+        return self._object_path(digest).read_bytes()
+
+    def _put_record(self, record: dict, nested_fields: list) -> str:
+        # Records in the nested fields are stored on their own and replaced by their hashes
+        stored_record = dict(record)
+
+        for field in nested_fields:
+            if isinstance(record.get(field), list):
+                stored_record[field] = list(map(lambda nested_record: self._put(_encode(nested_record)),
+                                                record.get(field)))
+
+        return self._put(_encode(stored_record))
+
+    def _get_record(self, digest, nested_fields: list) -> dict:
+        record = json.loads(self._get(digest))
+
+        for field in nested_fields:
+            if isinstance(record.get(field), list):
+                record[field] = list(map(lambda nested_digest: json.loads(self._get(nested_digest)),
+                                         record.get(field)))
+
+        return record
+
+    def names(self) -> list:
+        # Names of the stored dumps, oldest first
+        if not self.manifests_dir.is_dir():
+            return []
+
+        return sorted(map(lambda path: path.stem, self.manifests_dir.glob('*.json')))
+
+    def contains(self, name) -> bool:
+        return self._manifest_path(name).is_file()
+
+    def store(self, dump_dir: Path) -> Path:
+        # Store the dump files of a dump directory under the name of the directory, returns the manifest path
+        files = {}
+
+        for file_name in SNAPSHOT_FILE_NAMES:
+            dump_file_path = dump_dir.joinpath(file_name)
+
+            if not dump_file_path.is_file():
+                continue
+
+            stem = dump_file_path.stem
+
+            if stem in RECORD_FILES:
+                files[file_name] = {
+                    'records': list(map(lambda record: self._put_record(record, RECORD_FILES.get(stem)),
+                                        aptus_writers.iter_dump_records(dump_file_path)))
+                }
+            elif stem in OBJECT_FILES:
+                with dump_file_path.open(mode='r', encoding='utf-8') as infile:
+                    dump_object = json.load(infile)
+
+                files[file_name] = {
+                    'object': self._put_record(dump_object, OBJECT_FILES.get(stem))
+                }
+            else:
+                files[file_name] = {
+                    'file': self._put(dump_file_path.read_bytes())
+                }
+
+        manifest = {
+            'name': dump_dir.name,
+            'files': files
+        }
+
+        # Manifest written last, a dump is only stored once all its objects are
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = self._manifest_path(dump_dir.name)
+
+        with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', dir=self.manifests_dir, prefix='.manifest-',
+                                         delete=False) as outfile:
+            json.dump(manifest, outfile)
+
+        os.replace(outfile.name, manifest_path)
+
+        return manifest_path
+
+    def restore(self, name, dump_dir: Path) -> list:
+        # Write the files of a stored dump to a dump directory, returns their paths
+        with self._manifest_path(name).open(mode='r', encoding='utf-8') as infile:
+            manifest = json.load(infile)
+
+        dump_dir.mkdir(parents=True, exist_ok=True)
+        dump_file_paths = []
+
+        for file_name, stored_file in manifest.get('files').items():
+            dump_file_path = dump_dir.joinpath(file_name)
+            stem = dump_file_path.stem
+
+            if 'records' in stored_file:
+                with aptus_writers.open_array_writer(dump_file_path) as writer:
+                    for digest in stored_file.get('records'):
+                        writer.write(self._get_record(digest, RECORD_FILES.get(stem)))
+            elif 'object' in stored_file:
+                dump_object = self._get_record(stored_file.get('object'), OBJECT_FILES.get(stem))
+
+                with aptus_writers.open_object_writer(dump_file_path) as writer:
+                    for field, value in dump_object.items():
+                        writer.write(field, value)
+            else:
+                dump_file_path.write_bytes(self._get(stored_file.get('file')))
+
+            dump_file_paths.append(dump_file_path)
+
+        return dump_file_paths
+
+    def _stored_file(self, name, dump_file_name):
+        # Stored file of a dump, written as JSON or JSON Lines
+        with self._manifest_path(name).open(mode='r', encoding='utf-8') as infile:
+            files = json.load(infile).get('files')
+
+        for file_name in [dump_file_name, str(Path(dump_file_name).with_suffix('.jsonl'))]:
+            if file_name in files:
+                return Path(file_name).stem, files.get(file_name)
+
+        return None, None
+
+    def records(self, name, dump_file_name):
+        # Records of an array dump file of a stored dump, read one at a time, None if not stored
+        stem, stored_file = self._stored_file(name, dump_file_name)
+
+        if stored_file is None or 'records' not in stored_file:
+            return None
+
+        return map(lambda digest: self._get_record(digest, RECORD_FILES.get(stem)), stored_file.get('records'))
+
+    def object(self, name, dump_file_name):
+        # Object of an object dump file of a stored dump, None if not stored
+        stem, stored_file = self._stored_file(name, dump_file_name)
+
+        if stored_file is None or 'object' not in stored_file:
+            return None
+
+        return self._get_record(stored_file.get('object'), OBJECT_FILES.get(stem))
+
+    def prune(self, dump_dir: Path, superseded_stems=None) -> list:
+        # Delete the dump files of a dump directory stored in its manifest, only the ones with a stem in
+        # superseded_stems if given, returns their paths
+        with self._manifest_path(dump_dir.name).open(mode='r', encoding='utf-8') as infile:
+            manifest = json.load(infile)
+
+        pruned_file_paths = []
+
+        for file_name in manifest.get('files'):
+            dump_file_path = dump_dir.joinpath(file_name)
+
+            if superseded_stems is not None and dump_file_path.stem not in superseded_stems:
+                continue
+
+            if dump_file_path.is_file():
+                dump_file_path.unlink()
+                pruned_file_paths.append(dump_file_path)
+
+        return pruned_file_paths
@@ -0,0 +1,277 @@
+import json
+import sqlite3
+from pathlib import Path
+
+import aptus_writers
+
+# Normalized tables of a dump, ids are the Aptus ids. Fields of a dump record become columns in snake case.
+SCHEMA = '''
+CREATE TABLE customers (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    free_text1 TEXT,
+    free_text2 TEXT,
+    free_text3 TEXT,
+    free_text4 TEXT,
+    is_company INTEGER
+);
+CREATE TABLE keys (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    name TEXT,
+    card_label TEXT,
+    card TEXT,
+    code TEXT,
+    start TEXT,
+    stop TEXT,
+    created_time TEXT,
+    blocked INTEGER,
+    limited_logging INTEGER,
+    free_text1 TEXT
+);
+CREATE TABLE permissions (
+    key_id INTEGER NOT NULL REFERENCES keys (id),
+    permission TEXT,
+    start TEXT,
+    stop TEXT,
+    blocked INTEGER
+);
+CREATE TABLE contracts (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    start_date TEXT,
+    end_date TEXT,
+    object_name TEXT,
+    entry_phone_call_code TEXT,
+    floor TEXT,
+    floor_text TEXT,
+    apartment_no TEXT,
+    address_name TEXT
+);
+CREATE TABLE entry_phones (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    object_name TEXT,
+    phone_number TEXT,
+    first_name1 TEXT,
+    surname1 TEXT,
+    first_name2 TEXT,
+    surname2 TEXT,
+    show_in_entry_phone_display INTEGER,
+    apartment_phone_present INTEGER
+);
+CREATE TABLE entry_phone_names (
+    entry_phone_id INTEGER NOT NULL REFERENCES entry_phones (id),
+    first_name TEXT,
+    surname TEXT,
+    phone_number TEXT,
+    call_code TEXT,
+    show INTEGER
+);
+CREATE TABLE notes (
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    note TEXT,
+    created_time TEXT,
+    operator TEXT
+);
+CREATE TABLE authorities (
+    id INTEGER PRIMARY KEY,
+    name TEXT
+);
+CREATE TABLE authority_timezones (
+    authority_id INTEGER NOT NULL REFERENCES authorities (id),
+    timezone TEXT
+);
+CREATE TABLE ageras (
+    id INTEGER PRIMARY KEY,
+    last_call TEXT,
+    mac TEXT,
+    address TEXT,
+    agera_template_name TEXT,
+    agera_template_id INTEGER
+);
+CREATE TABLE agera_articles (
+    agera_id INTEGER NOT NULL REFERENCES ageras (id),
+    article_id INTEGER NOT NULL
+);
+CREATE TABLE agera_entities (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT,
+    fields TEXT,
+    PRIMARY KEY (kind, id)
+);
+CREATE TABLE article_files (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    being_used INTEGER,
+    sha256 TEXT,
+    size INTEGER
+);
+CREATE TABLE booking_calendars (
+    id INTEGER PRIMARY KEY,
+    system_id INTEGER,
+    name TEXT
+);
+CREATE TABLE bookings (
+    calendar_id INTEGER NOT NULL REFERENCES booking_calendars (id),
+    date TEXT,
+    pass TEXT,
+    customer_id INTEGER
+);
+'''
+
+# Created after loading, which is faster than maintaining them while inserting
+INDEXES = '''
+CREATE INDEX keys_card ON keys (card);
+CREATE INDEX keys_code ON keys (code);
+CREATE INDEX keys_customer_id ON keys (customer_id);
+CREATE INDEX customers_name ON customers (name);
+CREATE INDEX permissions_key_id ON permissions (key_id);
+CREATE INDEX contracts_customer_id ON contracts (customer_id);
+CREATE INDEX entry_phones_customer_id ON entry_phones (customer_id);
+CREATE INDEX entry_phone_names_entry_phone_id ON entry_phone_names (entry_phone_id);
+CREATE INDEX notes_customer_id ON notes (customer_id);
+CREATE INDEX authority_timezones_authority_id ON authority_timezones (authority_id);
+CREATE INDEX agera_articles_agera_id ON agera_articles (agera_id);
+CREATE INDEX agera_articles_article_id ON agera_articles (article_id);
+CREATE INDEX bookings_calendar_id_date ON bookings (calendar_id, date);
+CREATE INDEX bookings_customer_id ON bookings (customer_id);
+'''
+
+# Columns of the tables loaded from dump records, by dump field
+CUSTOMER_COLUMNS = ['name', 'freeText1', 'freeText2', 'freeText3', 'freeText4', 'isCompany']
+KEY_COLUMNS = ['name', 'cardLabel', 'card', 'code', 'start', 'stop', 'createdTime', 'blocked', 'limitedLogging',
+               'freeText1']
+PERMISSION_COLUMNS = ['permission', 'start', 'stop', 'blocked']
+CONTRACT_COLUMNS = ['startDate', 'endDate', 'objectName', 'entryPhoneCallCode', 'floor', 'floorText', 'apartmentNo',
+                    'addressName']
+ENTRY_PHONE_COLUMNS = ['objectName', 'phoneNumber', 'firstName1', 'surname1', 'firstName2', 'surname2',
+                       'showInEntryPhoneDisplay', 'apartmentPhonePresent']
+ENTRY_PHONE_NAME_COLUMNS = ['firstName', 'surname', 'phoneNumber', 'callCode', 'show']
+NOTE_COLUMNS = ['note', 'createdTime', 'operator']
+AGERA_COLUMNS = ['lastCall', 'mac', 'address', 'ageraTemplateName', 'ageraTemplateId']
+ARTICLE_FILE_COLUMNS = ['name', 'being_used', 'sha256', 'size']
+
+
+def _values(record: dict, fields: list) -> tuple:
+    return tuple(map(record.get, fields))
+
+
+def _insert(connection, table, columns: int, rows):
+    connection.executemany('INSERT INTO {} VALUES ({})'.format(table, ', '.join(['?'] * columns)), rows)
+
+
+def _export_customer(connection, customer: dict):
+    customer_id = customer.get('id')
+    _insert(connection, 'customers', 7, [(customer_id,) + _values(customer.get('details') or {}, CUSTOMER_COLUMNS)])
+
+    # Sections not dumped are missing
+    for key in customer.get('keys') or []:
+        _insert(connection, 'keys', 12, [(key.get('id'), customer_id) + _values(key, KEY_COLUMNS)])
+        _insert(connection, 'permissions', 5, map(lambda permission: (key.get('id'),) +
+                                                  _values(permission, PERMISSION_COLUMNS), key.get('permissions')))
+
+    _insert(connection, 'contracts', 10, map(lambda contract: (contract.get('id'), customer_id) +
+                                             _values(contract, CONTRACT_COLUMNS), customer.get('contracts') or []))
+
+    entry_phone = customer.get('entryPhone')
+    if entry_phone is not None:
+        _insert(connection, 'entry_phones', 10,
+                [(entry_phone.get('id'), customer_id) + _values(entry_phone, ENTRY_PHONE_COLUMNS)])
+        _insert(connection, 'entry_phone_names', 6,
+                map(lambda name: (entry_phone.get('id'),) + _values(name, ENTRY_PHONE_NAME_COLUMNS),
+                    entry_phone.get('entryPhoneNames')))
+
+    _insert(connection, 'notes', 4, map(lambda note: (customer_id,) + _values(note, NOTE_COLUMNS),
+                                        customer.get('notes') or []))
+
+
+def _export_authority(connection, authority: dict):
+    _insert(connection, 'authorities', 2, [(authority.get('id'), authority.get('name'))])
+    _insert(connection, 'authority_timezones', 2, map(lambda timezone: (authority.get('id'), timezone),
+                                                      authority.get('timezones')))
+
+
+def _export_agera(connection, agera_dump: dict):
+    for agera in agera_dump.get('ageras'):
+        _insert(connection, 'ageras', 6, [(agera.get('id'),) + _values(agera, AGERA_COLUMNS)])
+        _insert(connection, 'agera_articles', 2, map(lambda article: (agera.get('id'), article.get('id')),
+                                                     agera.get('articles')))
+
+    # Articles, templates and areas with the fields of their details pages as JSON
+    for kind in ['articles', 'templates', 'areas']:
+        _insert(connection, 'agera_entities', 4,
+                map(lambda entity: (kind, entity.get('id'), entity.get('name'),
+                                    json.dumps({field: value for field, value in entity.items()
+                                                if field not in ('id', 'name')}, ensure_ascii=False)),
+                    agera_dump.get(kind, [])))
+
+    _insert(connection, 'article_files', 5, map(lambda article_file: (article_file.get('id'),) +
+                                                _values(article_file, ARTICLE_FILE_COLUMNS),
+                                                agera_dump.get('article_files')))
+
+
+def _export_bookings(connection, bookings_dump: dict):
+    _insert(connection, 'booking_calendars', 3, map(lambda calendar: _values(calendar, ['id', 'systemId', 'name']),
+                                                    bookings_dump.get('calendars', [])))
+    _insert(connection, 'bookings', 4, map(lambda booking: _values(booking, ['calendarId', 'date', 'pass',
+                                                                             'customerId']),
+                                           bookings_dump.get('bookings')))
+
+
+def _find_dump_file(dump_dir: Path, dump_file_name):
+    # Dump file written as JSON, or as JSON Lines
+    for dump_file_path in [dump_dir.joinpath(dump_file_name), dump_dir.joinpath(dump_file_name).with_suffix('.jsonl')]:
+        if dump_file_path.is_file():
+            return dump_file_path
+
+    return None
+
+
+def export_dump(dump_dir: Path, database_path: Path, dump_file_names: dict) -> dict:
+    # Load the dump files of the parts found in the dump directory into a new SQLite database, returns the number
+    # of records of every table. Records are streamed from the dump files, the database replaces any previous one
+    # when complete.
+    temporary_path = database_path.with_name(database_path.name + '.tmp')
+    temporary_path.unlink(missing_ok=True)
+
+    connection = sqlite3.connect(temporary_path)
+
+    try:
+        # A new database is simply written again if interrupted
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.executescript(SCHEMA)
+
+        for part, export_record in [('customers', _export_customer), ('authorities', _export_authority)]:
+            dump_file_path = _find_dump_file(dump_dir, dump_file_names.get(part))
+
+            if dump_file_path is not None:
+                print('Exporting {}'.format(dump_file_path))
+
+                for record in aptus_writers.iter_dump_records(dump_file_path):
+                    export_record(connection, record)
+
+        for part, export_object in [('agera', _export_agera), ('bookings', _export_bookings)]:
+            dump_file_path = _find_dump_file(dump_dir, dump_file_names.get(part))
+
+            if dump_file_path is not None:
+                print('Exporting {}'.format(dump_file_path))
+
+                with dump_file_path.open(mode='r', encoding='utf-8') as infile:
+                    export_object(connection, json.load(infile))
+
+        connection.executescript(INDEXES)
+        connection.commit()
+
+        tables = list(map(lambda row: row[0], connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY rowid")))
+        counts = {table: connection.execute('SELECT count(*) FROM {}'.format(table)).fetchone()[0]
+                  for table in tables}
+    finally:
+        connection.close()
+
+    temporary_path.replace(database_path)
+
+    return counts
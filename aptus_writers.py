@@ -0,0 +1,167 @@
+import json
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def _dumps(value, indent_level):
+    # Same as json.dumps with indent 2, nested at indent_level
+    return json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n' + '  ' * indent_level)
+
+
+class JsonArrayWriter:
+    # Writes a JSON array one item at a time, byte for byte the same as json.dumps(items, indent=2,
+    # ensure_ascii=False) of the whole array
+
+    def __init__(self, outfile, indent_level=0):
+        self.outfile = outfile
+        self.indent_level = indent_level
+        self.count = 0
+
+    def write(self, item):
+        separator = '[\n' if self.count == 0 else ',\n'
+        indent = '  ' * (self.indent_level + 1)
+        self.outfile.write(separator + indent + _dumps(item, self.indent_level + 1))
+        self.count += 1
+
+    def close(self):
+        if self.count == 0:
+            self.outfile.write('[]')
+        else:
+            self.outfile.write('\n' + '  ' * self.indent_level + ']')
+
+
+class JsonObjectWriter:
+    # Writes a JSON object one value at a time, byte for byte the same as json.dumps(object, indent=2,
+    # ensure_ascii=False), array values can be streamed item by item
+
+    def __init__(self, outfile, indent_level=0):
+        self.outfile = outfile
+        self.indent_level = indent_level
+        self.count = 0
+
+    def _write_key(self, key):
+        separator = '{\n' if self.count == 0 else ',\n'
+        indent = '  ' * (self.indent_level + 1)
+        self.outfile.write(separator + indent + json.dumps(key, ensure_ascii=False) + ': ')
+        self.count += 1
+
+    def write(self, key, value):
+        self._write_key(key)
+        self.outfile.write(_dumps(value, self.indent_level + 1))
+
+    def array(self, key) -> JsonArrayWriter:
+        self._write_key(key)
+        return JsonArrayWriter(self.outfile, self.indent_level + 1)
+
+    def close(self):
+        if self.count == 0:
+            self.outfile.write('{}')
+        else:
+            self.outfile.write('\n' + '  ' * self.indent_level + '}')
+
+
+class JsonLinesWriter:
+    # Writes one JSON document per line
+
+    def __init__(self, outfile):
+        self.outfile = outfile
+
+    def write(self, item):
+        self.outfile.write(json.dumps(item, ensure_ascii=False) + '\n')
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def _open_atomic(path: Path):
+    # Written to a temporary file, only replacing the final file when complete
+    temporary_path = path.with_name(path.name + '.tmp')
+
+    with temporary_path.open(mode='w', encoding='utf-8') as outfile:
+        yield outfile
+
+    temporary_path.replace(path)
+
+
+@contextmanager
+def open_array_writer(path: Path):
+    with _open_atomic(path) as outfile:
+        writer = JsonLinesWriter(outfile) if path.suffix == '.jsonl' else JsonArrayWriter(outfile)
+        yield writer
+        writer.close()
+
+
+@contextmanager
+def open_object_writer(path: Path):
+    with _open_atomic(path) as outfile:
+        writer = JsonObjectWriter(outfile)
+        yield writer
+        writer.close()
+
+
+def iter_json_array(infile, chunk_size=1 << 16):
+    # Items of a JSON array, parsed incrementally without reading the whole file
+    decoder = json.JSONDecoder()
+    buffer = infile.read(chunk_size).lstrip()
+    eof = False
+
+    if not buffer.startswith('['):
+        raise ValueError('Expected a JSON array')
+
+    position = 1
+
+    while True:
+        # Skip whitespace and separators
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+
+        if position < len(buffer) and buffer[position] == ']':
+            return
+
+        item = None
+        decoded = False
+        end = len(buffer)
+
+        if position < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                decoded = True
+            except ValueError:
+                end = len(buffer)
+
+        # An item is complete once followed by a separator or the end of the array, a number cut at the end of the
+        # buffer decodes short
+        following = end
+        while following < len(buffer) and buffer[following] in ' \t\r\n':
+            following += 1
+
+        complete = decoded and following < len(buffer) and buffer[following] in ',]'
+
+        if not complete and not eof:
+            # Item may continue in the next chunk
+            chunk = infile.read(chunk_size)
+            eof = chunk == ''
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        if not complete and (position == len(buffer) or (decoded and following == len(buffer))):
+            raise ValueError('Unexpected end of JSON array')
+
+        if not complete:
+            raise ValueError('Invalid JSON array item')
+
+        position = end
+        yield item
+
+
+def iter_dump_records(path: Path):
+    # Records of a dump file, JSON array or JSON Lines
+    with path.open(mode='r', encoding='utf-8') as infile:
+        if path.suffix == '.jsonl':
+            for line in infile:
+                if line.strip() != '':
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(infile)
@@ -1,6 +1,55 @@
+# chrome, firefox, safari or http (no browser)
 BROWSER = 'firefox'
+# default, or lean to only load the page HTML (no images, stylesheets or fonts, read pages as soon as parsed)
+BROWSER_PROFILE = 'default'
 APTUS_BASE_URL = ''
 APTUS_USERNAME = ''
 APTUS_PASSWORD = ''
 APTUS_MIN_CUSTOMER_ID = 0
 APTUS_MAX_CUSTOMER_ID = 1000
+
+# Number of parallel browsers/sessions used for dumping customers, ageras and booking windows
+DUMP_WORKERS = 1
+
+# Pages fetched at once when dumping customers with BROWSER = 'http' and one worker, 1 to fetch one at a time
+PIPELINE_CONCURRENCY = 1
+
+# Format of the customer and authority dump files, json (array) or jsonl (JSON Lines)
+DUMP_FORMAT = 'json'
+
+# File the login session is saved to, reused by later runs and workers until SESSION_MAX_AGE seconds old
+SESSION_FILE = '.aptus_session.json'
+SESSION_MAX_AGE = 1200
+
+# Dates of the bookings dumped (YYYY-MM-DD), None for a year back and a year ahead of today
+BOOKINGS_START = None
+BOOKINGS_STOP = None
+
+# Days of a booking calendar fetched per page
+BOOKING_WINDOW_DAYS = 31
+
+# Agera article files downloaded at once into ./dumps/files, 0 to not download them
+DOWNLOAD_CONCURRENCY = 4
+
+# Store every finished dump in ./dumps/snapshots by content hash, keeping full files of the latest dump only
+SNAPSHOT_DUMPS = False
+
+# Only load the details of keys and contracts whose list rows changed since the previous dump, authorities and
+# ageras are always loaded
+INCREMENTAL_DUMPS = False
+
+# Attempts for a customer whose pages fail, and the customers failing for good before a dump exits with an error
+DUMP_ATTEMPTS = 3
+MAX_DUMP_FAILURES = 10
+
+# Record every page loaded to PAGE_CACHE_FILE, or replay the pages from it without the network, None to not cache
+# pages. Recorded pages are kept for PAGE_CACHE_TTL seconds.
+PAGE_CACHE_MODE = None
+PAGE_CACHE_FILE = 'dumps/pages.sqlite'
+PAGE_CACHE_TTL = 30 * 24 * 60 * 60
+
+# Parallel sessions for updating keys with aptus-manage.py
+UPDATE_WORKERS = 1
+
+# Maximum requests per second to Aptus for all sessions together, None for no limit
+REQUEST_RATE = None